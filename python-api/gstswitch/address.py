@@ -0,0 +1,218 @@
+"""
+address handles the DBus addresses gst-switch-srv listens on.
+Besides tcp, the server can listen on a unix domain socket, either a file
+(unix:path=) or a Linux abstract socket (unix:abstract=). These avoid
+the TCP stack and authenticate by the peer credentials instead of
+DBUS_COOKIE_SHA1, which makes them the faster choice for controllers
+running on the same host.
+http://dbus.freedesktop.org/doc/dbus-specification.html#addresses
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import errno
+import os
+import re
+import socket
+import stat
+from six.moves.urllib.parse import quote, unquote
+
+from gi.repository import GLib
+
+__all__ = ["check_address", "parse_address", "format_address",
+           "unix_address", "local_address", "free_port_address",
+           "read_listening_address",
+           "remove_stale_socket", "LISTENING_PATTERN", ]
+
+# The line the server logs once it accepts connections
+LISTENING_PATTERN = re.compile(r'Controller is listening at: (\S+)')
+
+# Size of sun_path in struct sockaddr_un, including the terminating
+# zero byte of a path or the leading zero byte of an abstract name
+UNIX_PATH_MAX = 108
+
+# Characters which need no escaping in a DBus address value
+_OPTIONALLY_ESCAPED = str('-_/\\.*')
+
+
+def parse_address(address):
+    """Split a DBus address into its entries
+
+    :param address: The address, e.g. 'unix:path=/tmp/gstswitch'
+    :returns: List of (transport, dict of key to unescaped value)
+    :raises ValueError: An entry lacks the transport or a key/value pair
+    has no '='
+    """
+    entries = []
+    for entry in address.split(';'):
+        if not entry:
+            continue
+        transport, colon, pairs = entry.partition(':')
+        if not colon or not transport:
+            raise ValueError("Address must follow specifications mentioned"
+                             " at http://dbus.freedesktop.org/doc/"
+                             "dbus-specification.html#addresses")
+        options = {}
+        for pair in pairs.split(',') if pairs else ():
+            key, equals, value = pair.partition('=')
+            if not equals:
+                raise ValueError("Address entry '{0}' has no value for "
+                                 "key '{1}'".format(entry, key))
+            options[key] = unquote(value)
+        entries.append((transport, options))
+    return entries
+
+
+def format_address(entries):
+    """Join entries into a DBus address, the reverse of parse_address
+
+    :param entries: List of (transport, dict of key to unescaped value)
+    :returns: The escaped address, the keys of an entry sorted
+    """
+    return ';'.join(
+        '{0}:{1}'.format(transport, ','.join(
+            '{0}={1}'.format(key, quote(options[key].encode('utf-8'),
+                                        safe=_OPTIONALLY_ESCAPED))
+            for key in sorted(options)))
+        for transport, options in entries)
+
+
+def _check_unix(options):
+    """Non-public function: Validate the options of a unix entry"""
+    names = [key for key in ('path', 'abstract') if key in options]
+    if len(names) > 1:
+        raise ValueError('A unix address takes either path or abstract, '
+                         'not both')
+    for name in names:
+        value = options[name]
+        if not value:
+            raise ValueError("The {0} of a unix address cannot be blank"
+                             .format(name))
+        if len(value.encode('utf-8')) >= UNIX_PATH_MAX:
+            raise ValueError("The {0} of a unix address must be shorter "
+                             "than {1} bytes, it is '{2}'"
+                             .format(name, UNIX_PATH_MAX, value))
+
+
+def check_address(address):
+    """Validate a DBus address
+
+    Every address needs a transport, unix:path= and unix:abstract= are
+    checked further since the server and the client must agree on them.
+    Everything else is left to GDBus when connecting.
+
+    :param address: The address
+    :returns: The address as str
+    :raises ValueError: Address is blank or invalid
+    """
+    if not address:
+        raise ValueError("Address '{0}' cannot be blank".format(address))
+    adr = str(address)
+    if adr.find(':') <= 0:
+        raise ValueError("Address must follow specifications mentioned"
+                         " at http://dbus.freedesktop.org/doc/"
+                         "dbus-specification.html#addresses")
+    try:
+        entries = parse_address(adr)
+    except ValueError:
+        # malformed entries are reported by GDBus when connecting
+        return adr
+    for transport, options in entries:
+        if transport == 'unix':
+            _check_unix(options)
+    return adr
+
+
+def unix_address(path=None, abstract=None):
+    """Build the address of a unix domain socket
+
+    :param path: Path of the socket file
+    :param abstract: Name of a Linux abstract socket
+    :returns: The escaped address
+    :raises ValueError: Neither or both are given, or the name is too long
+    """
+    if (path is None) == (abstract is None):
+        raise ValueError('Pass either path or abstract')
+    key, value = ('path', path) if path is not None \
+        else ('abstract', abstract)
+    address = 'unix:{0}={1}'.format(
+        key, quote(value.encode('utf-8'), safe=_OPTIONALLY_ESCAPED))
+    return check_address(address)
+
+
+def local_address(name='gstswitch'):
+    """The address of a socket file named name in the user's runtime
+    directory, e.g. /run/user/1000/gstswitch. Only the user can connect
+    to it, which makes it a good choice for a server controlled from the
+    same host.
+
+    :param name: Name of the socket file
+    :returns: The address
+    """
+    return unix_address(path=os.path.join(GLib.get_user_runtime_dir(),
+                                          name))
+
+
+def free_port_address(address):
+    """The address with the port of its tcp entries set to 0, which lets
+    the server pick a free port. The address it picked is learned from
+    its log, see read_listening_address. Other transports are kept.
+
+    :param address: The address
+    :returns: The address with port 0
+    :raises ValueError: Address is invalid
+    """
+    entries = parse_address(check_address(address))
+    if not any(transport == 'tcp' for transport, _ in entries):
+        return address
+    for transport, options in entries:
+        if transport == 'tcp':
+            options['port'] = '0'
+    return check_address(format_address(entries))
+
+
+def read_listening_address(log):
+    """Find the address a server reported in its log
+
+    gst-switch-srv logs the address clients connect to once it is
+    listening, which is the only way to learn it for addresses chosen by
+    the server, like unix:tmpdir=
+
+    :param log: The text the server logged
+    :returns: The last address found, None if there is none
+    """
+    found = LISTENING_PATTERN.findall(log)
+    return found[-1] if found else None
+
+
+def remove_stale_socket(address):
+    """Remove the socket file of a unix:path= address when no server is
+    listening on it any more, e.g. after a crash. A server refuses to
+    listen on an existing file.
+
+    :param address: The address the server is going to listen on
+    :returns: True if a file was removed
+    """
+    try:
+        entries = parse_address(address)
+    except ValueError:
+        return False
+    for transport, options in entries:
+        path = options.get('path')
+        if transport != 'unix' or not path:
+            continue
+        try:
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                continue
+        except OSError:
+            continue
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except socket.error as error:
+            if error.errno == errno.ECONNREFUSED:
+                os.unlink(path)
+                return True
+        finally:
+            sock.close()
+    return False
@@ -0,0 +1,172 @@
+"""
+aio calls the remote methods of a Controller without blocking, with a
+callback or as asyncio coroutines.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from gi.repository import Gio
+from .exception import ConnectionReturnError
+from .mainloop import MainLoopThread
+from .state import ServerState
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+__all__ = ["AsyncioFacade", "AsyncMixin", "call_future", ]
+
+
+def call_future(controller, method_name, args, loop=None, timeout=None):
+    """Call a remote method without blocking and return an asyncio.Future
+    for its result, see Controller.future
+
+    :param controller: The Controller to call on
+    :param method_name: One of Controller.REMOTE_METHODS
+    :param args: Sequence of arguments for the remote method
+    :param loop: The asyncio event loop of the Future,
+    defaults to the current event loop
+    :param timeout: Timeout in msec, defaults to the Controller's
+    :returns: asyncio.Future, cancelling it cancels the remote call
+    :raises RuntimeError: asyncio is not available
+    """
+    if asyncio is None:
+        raise RuntimeError('asyncio is not available')
+    loop = loop or asyncio.get_event_loop()
+    future = asyncio.Future(loop=loop)
+    cancellable = Gio.Cancellable()
+
+    def cancel(done_future):
+        """Abort the remote call when the Future got cancelled"""
+        if done_future.cancelled():
+            cancellable.cancel()
+
+    future.add_done_callback(cancel)
+
+    def done(result, error):
+        """Resolve the Future inside its event loop"""
+        loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    controller.call_async(method_name, args, done, timeout, cancellable)
+    return future
+
+
+def _resolve(future, result, error):
+    """Non-public function: Set the outcome of a Future from call_future"""
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class AsyncioFacade(object):
+
+    """asyncio-compatible view on a Controller, available as Controller.aio.
+    Every remote method returns an asyncio.Future instead of blocking:
+
+        port = await controller.aio.get_compose_port()
+        ok = await controller.aio.switch(Controller.VIDEO_CHANNEL_A, port)
+
+    :param controller: The Controller the calls are made on
+    """
+
+    def __init__(self, controller):
+        super(AsyncioFacade, self).__init__()
+        self._controller = controller
+
+    def __getattr__(self, name):
+        if name not in self._controller.REMOTE_METHODS:
+            raise AttributeError(name)
+        controller = self._controller
+
+        def method(*args, **kwargs):
+            """Start the remote call, returns an asyncio.Future"""
+            return controller.future(name, *args, **kwargs)
+        method.__name__ = str(name)
+        return method
+
+
+class AsyncMixin(object):
+
+    """Methods of the Controller calling remote methods without blocking,
+    see call_async and future
+    """
+
+    def call_async(self, method_name, args, callback,
+                   timeout=None, cancellable=None):
+        """Call a remote method without blocking.
+        The call is started from a MainLoopThread (self.main_loop_thread,
+        by default the shared one), which also dispatches callback.
+
+        :param method_name: One of REMOTE_METHODS
+        :param args: Sequence of arguments for the remote method
+        :param callback: Called as callback(result, error), result is
+        unpacked like the return value of the blocking method, error is
+        None or the exception which occurred
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: None
+        """
+        if method_name not in self.REMOTE_METHODS:
+            raise ValueError("Unknown remote method '{0}'"
+                             .format(method_name))
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        connection = self._bound_connection()
+        if self.main_loop_thread is None:
+            self.main_loop_thread = MainLoopThread.shared()
+
+        def done(result, error):
+            """Unpack the result and hand it to callback"""
+            if error is None:
+                try:
+                    result = self._unpack_reply(method_name, result)
+                except ConnectionReturnError as unpack_error:
+                    result, error = None, unpack_error
+            callback(result, error)
+
+        method = getattr(connection, method_name + '_async')
+        self.main_loop_thread.invoke(
+            method, *(tuple(args) + (done, timeout, cancellable)))
+
+    def future(self, method_name, *args, **kwargs):
+        """Call a remote method without blocking and return an
+        asyncio.Future for its result, see call_async.
+
+        :param method_name: One of REMOTE_METHODS
+        :param args: Arguments for the remote method
+        :param loop: The asyncio event loop of the Future,
+        defaults to the current event loop
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :returns: asyncio.Future, cancelling it cancels the remote call
+        """
+        loop = kwargs.pop('loop', None)
+        timeout = kwargs.pop('timeout', None)
+        if kwargs:
+            raise TypeError("Unexpected arguments {0}".format(list(kwargs)))
+        return call_future(self, method_name, args, loop, timeout)
+
+    def _unpack_reply(self, method_name, reply):
+        """Non-public method: Unpack a GVariant reply the same way the
+        blocking methods do
+        """
+        try:
+            values = reply.unpack()
+        except AttributeError:
+            raise ConnectionReturnError('Connection returned invalid values. '
+                                        'Should return a GVariant tuple')
+        if method_name == 'get_preview_ports':
+            return self.parse_preview_ports(values[0])
+        if method_name == 'get_preview_port_info':
+            return self.make_preview_ports(values[0])
+        if method_name == 'get_state':
+            return ServerState.from_dict(values[0])
+        if not values:
+            return None
+        if len(values) > 1:
+            return values
+        return values[0]
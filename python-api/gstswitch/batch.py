@@ -0,0 +1,42 @@
+"""
+batch collects switch, set_composite_mode and adjust_pip calls, which
+Controller.batch() then applies together in a single remote call.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+__all__ = ["Batch", ]
+
+
+class Batch(object):
+
+    """Collects the operations of Controller.batch().
+    After the batch has been applied, results holds the result of every
+    operation in the order they were added.
+    """
+
+    def __init__(self):
+        super(Batch, self).__init__()
+        self.operations = []
+        self.results = None
+
+    def switch(self, channel, port):
+        """Switch the channel to the target port, see Controller.switch"""
+        self.operations.append(('switch', (channel, port)))
+
+    def set_composite_mode(self, mode):
+        """Set the composite mode, see Controller.set_composite_mode
+
+        :raises ValueError: mode is not supported
+        """
+        if mode not in range(0, 4):
+            raise ValueError("Composite mode {0} is not supported"
+                             .format(mode))
+        self.operations.append(('set_composite_mode', (mode,)))
+
+    def adjust_pip(self, xpos, ypos, width, height):
+        """Change the PIP position and size, see Controller.adjust_pip"""
+        self.operations.append(('adjust_pip', (xpos, ypos, width, height)))
+
+    def __len__(self):
+        return len(self.operations)
@@ -0,0 +1,220 @@
+"""
+completions tells when the requests of a gst-switch-srv took effect.
+switch, set_composite_mode and adjust_pip return before the server rebuilt
+its pipelines. Once it did, the server sends switch_completed,
+transition_completed or pip_adjusted with the id it gave the request,
+the monotonic times the request was made and completed, and whether it
+succeeded, which allows measuring the latency of every request.
+switch_request, set_composite_mode_request and adjust_pip_request reply
+the id as well, so a client can tell which signal belongs to its request.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from collections import namedtuple
+
+__all__ = ["CompletionMixin", "SwitchCompleted", "PipAdjusted",
+           "TransitionCompleted", "COMPLETIONS", ]
+
+
+class _Completion(object):
+
+    """Non-public class: The timing of a completed request"""
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        """Seconds from the request to its completion"""
+        # pylint: disable=no-member
+        return (self.end - self.start) / 1e6
+
+
+class SwitchCompleted(_Completion, namedtuple(
+        'SwitchCompleted',
+        ('request', 'channel', 'port', 'start', 'end', 'ok'))):
+
+    """Arguments of the switch_completed signal
+
+        request - The id the server gave the switch request
+        channel - The channel switched, one of VIDEO_CHANNEL_*
+        port    - The port switched to
+        start   - Monotonic time of the request in microseconds
+        end     - Monotonic time both new streams were online or
+                  the switch failed, in microseconds
+        ok      - True if the streams were switched
+    """
+    __slots__ = ()
+
+
+class PipAdjusted(_Completion, namedtuple(
+        'PipAdjusted',
+        ('request', 'x', 'y', 'width', 'height', 'start', 'end', 'ok'))):
+
+    """Arguments of the pip_adjusted signal
+
+        request - The id the server gave the adjust_pip request
+        x, y    - The position of the PIP
+        width   - The width of the PIP
+        height  - The height of the PIP
+        start   - Monotonic time of the request in microseconds
+        end     - Monotonic time the composite applied the PIP,
+                  in microseconds
+        ok      - True if the PIP was applied
+    """
+    __slots__ = ()
+
+
+class TransitionCompleted(_Completion, namedtuple(
+        'TransitionCompleted',
+        ('request', 'mode', 'start', 'end', 'ok'))):
+
+    """Arguments of the transition_completed signal
+
+        request - The id the server gave the set_composite_mode request
+        mode    - The requested mode, one of COMPOSITE_*
+        start   - Monotonic time of the request in microseconds
+        end     - Monotonic time the mode was online or the request
+                  failed, in microseconds
+        ok      - True if the mode is online
+    """
+    __slots__ = ()
+
+
+# The completion signals and the tuples of their arguments
+COMPLETIONS = {
+    'switch_completed': SwitchCompleted,
+    'pip_adjusted': PipAdjusted,
+    'transition_completed': TransitionCompleted,
+}
+
+
+def _tuple_callback(make, callback):
+    """Non-public function: Wrap callback to take the arguments of a
+    signal as one tuple built by make"""
+    def forward(*args):
+        """Pass the arguments as one tuple"""
+        callback(make(*args))
+    return forward
+
+
+class CompletionMixin(object):
+
+    """Methods of the Controller registering Callbacks for the completion
+    signals. The Callbacks take the arguments of the signal, or with
+    as_tuple a single SwitchCompleted, PipAdjusted or TransitionCompleted.
+    Both times are taken from the monotonic clock of the server's host,
+    so they compare with GLib.get_monotonic_time() on the same host only.
+    """
+
+    def switch_request(self, channel, port, timeout=None, cancellable=None):
+        """Switch the channel to the target port, see switch, and get the
+        id the server gave the request
+
+        :param channel: The channel to be switched, see switch
+        :param port: The target port number
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple (ok, request), request is carried by the
+        switch_completed signal of the switch
+        """
+        connection = self._bound_connection()
+        return self._unpack_reply('switch_request', connection.switch_request(
+            channel, port, timeout=timeout, cancellable=cancellable))
+
+    def set_composite_mode_request(self, mode, timeout=None,
+                                   cancellable=None):
+        """Set the composite mode, see set_composite_mode, and get the id
+        the server gave the request
+
+        :param mode: new composite mode
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple (ok, request), request is carried by the
+        transition_completed signal of the change
+        """
+        connection = self._bound_connection()
+        return self._unpack_reply(
+            'set_composite_mode_request',
+            connection.set_composite_mode_request(
+                mode, timeout=timeout, cancellable=cancellable))
+
+    def adjust_pip_request(self, xpos, ypos, width, height,
+                           timeout=None, cancellable=None):
+        """Change the PIP position and size, see adjust_pip, and get the id
+        the server gave the request
+
+        :param xpos: the x position of the PIP
+        :param ypos: the y position of the PIP
+        :param width: the width of the PIP
+        :param height: the height of the PIP
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple (result, request), result as returned by
+        adjust_pip, request is carried by the pip_adjusted signal of the
+        change
+        """
+        connection = self._bound_connection()
+        return self._unpack_reply('adjust_pip_request',
+                                  connection.adjust_pip_request(
+                                      xpos, ypos, width, height,
+                                      timeout=timeout,
+                                      cancellable=cancellable))
+
+    def _subscribe_completion(self, signal_name, callback, as_tuple):
+        """Non-public method: Subscribe callback to a completion signal"""
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+        if as_tuple:
+            callback = _tuple_callback(COMPLETIONS[signal_name], callback)
+        return self.subscribe(signal_name, callback)
+
+    def on_switch_completed(self, callback, as_tuple=False):
+        """Register a Callback for the switch_completed Signal
+        which is fired, when the streams of a switch are online.
+
+        The Callback takes the following Arguments:
+            int request  - The id the server gave the switch request
+            int channel  - The channel switched
+            int port     - The port switched to
+            int start    - Monotonic time of the request in microseconds
+            int end      - Monotonic time of the completion
+            bool ok      - True if the streams were switched
+
+        :param as_tuple: Call the Callback with a SwitchCompleted
+        """
+        return self._subscribe_completion('switch_completed', callback,
+                                          as_tuple)
+
+    def on_pip_adjusted(self, callback, as_tuple=False):
+        """Register a Callback for the pip_adjusted Signal
+        which is fired, when the composite applied a PIP adjustment.
+
+        The Callback takes the following Arguments:
+            int request  - The id the server gave the adjust_pip request
+            int x, y     - The position of the PIP
+            int w, h     - The size of the PIP
+            int start    - Monotonic time of the request in microseconds
+            int end      - Monotonic time of the completion
+            bool ok      - True if the PIP was applied
+
+        :param as_tuple: Call the Callback with a PipAdjusted
+        """
+        return self._subscribe_completion('pip_adjusted', callback,
+                                          as_tuple)
+
+    def on_transition_completed(self, callback, as_tuple=False):
+        """Register a Callback for the transition_completed Signal
+        which is fired, when a new Composition-Mode is online or the
+        server refused to change it.
+
+        The Callback takes the following Arguments:
+            int request  - The id the server gave the request
+            int mode     - The requested Mode
+            int start    - Monotonic time of the request in microseconds
+            int end      - Monotonic time of the completion
+            bool ok      - True if the Mode is online
+
+        :param as_tuple: Call the Callback with a TransitionCompleted
+        """
+        return self._subscribe_completion('transition_completed', callback,
+                                          as_tuple)
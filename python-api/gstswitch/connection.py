@@ -7,10 +7,14 @@ from __future__ import absolute_import, print_function, unicode_literals
 
 
 from gi.repository import Gio, GLib
-from .exception import ConnectionError
-import sys
+from .address import check_address
+from .exception import (ConnectionError, ConnectionTimeoutError,
+                        ConnectionUnknownMethodError)
+from .introspection import (IntrospectionCache, parse_methods,
+                            INTROSPECTABLE_INTERFACE)
+from .methods import RemoteMethod
 
-__all__ = ["Connection", ]
+__all__ = ["Connection", "RemoteMethod", ]
 
 
 class Connection(object):
@@ -20,29 +24,76 @@ class Connection(object):
 
     :default bus-address: tcp:host=127.0.0.1,port=5000
 
-    :param: None
+    :param introspect: Build the remote methods from the introspection
+    data of the server when connecting, see load_methods. True caches the
+    data in the default IntrospectionCache, or pass one to use instead.
     """
     CONNECTION_FLAGS = Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT
 
+    # Signatures of the arguments and the reply of every remote method,
+    # as declared in tools/gstswitchcontrollerintrospection.c
+    METHODS = {
+        'get_compose_port': ('()', '(i)'),
+        'get_encode_port': ('()', '(i)'),
+        'get_audio_port': ('()', '(i)'),
+        'get_preview_ports': ('()', '(s)'),
+        'get_preview_port_info': ('()', '(a(iii))'),
+        'set_composite_mode': ('(i)', '(b)'),
+        'set_composite_mode_request': ('(i)', '(bu)'),
+        'get_composite_mode': ('()', '(i)'),
+        'get_state': ('()', '(a{sv})'),
+        'get_version': ('()', '(s)'),
+        'set_encode_mode': ('(i)', '(b)'),
+        'new_record': ('()', '(b)'),
+        'adjust_pip': ('(iiii)', '(u)'),
+        'adjust_pip_request': ('(iiii)', '(uu)'),
+        'switch': ('(ii)', '(b)'),
+        'switch_request': ('(ii)', '(bu)'),
+        'batch': ('(a(sv))', '(av)'),
+        'click_video': ('(iiii)', '(b)'),
+        'mark_face': ('(a(iiii))', '()'),
+        'mark_tracking': ('(a(iiii))', '()'),
+    }
+
+    REMOTE_METHODS = dict(
+        (name, RemoteMethod(name, *signatures))
+        for name, signatures in METHODS.items())
+
+    # Methods which can be applied within one batch and their signatures
+    BATCH_METHODS = {
+        'switch': '(ii)',
+        'set_composite_mode': '(i)',
+        'adjust_pip': '(iiii)',
+    }
+
     def __init__(
             self,
             address="tcp:host=127.0.0.1,port=5000",
             bus_name='us.timvideos.gstswitch.SwitchController',
             object_path="/us/timvideos/gstswitch/SwitchController",
             default_interface=("us.timvideos.gstswitch."
-                               "SwitchControllerInterface")):
+                               "SwitchControllerInterface"),
+            default_timeout=-1,
+            introspect=False):
 
         super(Connection, self).__init__()
         self.connection = None
+        self.methods = self.REMOTE_METHODS
+        self.server_version = None
+        self.introspect = introspect
+        self.signal_subscriptions = {}
+        self.callbacks_closed = []
         self._address = None
         self._bus_name = None
         self._object_path = None
         self._default_interface = None
+        self._default_timeout = None
 
         self.address = address
         self.bus_name = bus_name
         self.object_path = object_path
         self.default_interface = default_interface
+        self.default_timeout = default_timeout
 
     @property
     def address(self):
@@ -55,16 +106,7 @@ class Connection(object):
         """Set the Address
         http://dbus.freedesktop.org/doc/dbus-specification.html#addresses
         """
-        if not address:
-            raise ValueError("Address '{0}' cannot be blank")
-        else:
-            adr = str(address)
-            if adr.find(':') > 0:
-                self._address = adr
-            else:
-                raise ValueError("Address must follow specifications mentioned"
-                                 " at http://dbus.freedesktop.org/doc/"
-                                 "dbus-specification.html#addresses")
+        self._address = check_address(address)
 
     @property
     def bus_name(self):
@@ -133,6 +175,31 @@ class Connection(object):
                                  "doc/dbus-specification.html"
                                  "#message-protocol-names-interface")
 
+    @property
+    def default_timeout(self):
+        """Get the default timeout of remote method calls in msec"""
+        return self._default_timeout
+
+    @default_timeout.setter
+    def default_timeout(self, default_timeout):
+        """Set the default timeout of remote method calls in msec.
+        -1 uses the default timeout of GLib (25 seconds), 0 or None
+        waits forever.
+        :raises ValueError: Timeout must be an integer >= -1
+        """
+        if default_timeout is None:
+            default_timeout = GLib.MAXINT
+        try:
+            timeout = int(default_timeout)
+        except (TypeError, ValueError):
+            raise ValueError("default_timeout must be an integer, not '{0}'"
+                             .format(default_timeout))
+        if timeout < -1:
+            raise ValueError("default_timeout must be >= -1")
+        if timeout == 0:
+            timeout = GLib.MAXINT
+        self._default_timeout = timeout
+
     def connect_dbus(self):
         """Make a new connection using the parameters belonging to the class
         to the gst-switch-srv over dbus.
@@ -149,240 +216,474 @@ class Connection(object):
                 None,
                 None)
             self.connection = connection
+            connection.connect('closed', self.cb_closed)
         except GLib.GError as error:
             message = error.message
             new_message = "{1} ({0})".format(message, self.address)
             raise ConnectionError(new_message)
 
-    def signal_subscribe(self, signal_handler):
-        """Subscribe to Signals on the bus"""
+        if self.introspect:
+            cache = self.introspect
+            if not isinstance(cache, IntrospectionCache):
+                cache = IntrospectionCache()
+            self.load_methods(cache)
+
+    def load_methods(self, cache=None):
+        """Replace the built-in table of remote methods with the methods
+        the gst-switch-srv declares in its introspection data. Calls of
+        methods the server does not have and calls with wrong arguments
+        then fail without a round trip, and methods unknown to this
+        client can be called through invoke or as attributes.
+
+        :param cache: IntrospectionCache to look the data up in first,
+        keyed by the version reported by get_version
+        :returns: Nothing
+        :raises ConnectionError: The introspection data is not available
+        """
+        try:
+            self.server_version = self.get_version()[0]
+        except ConnectionError:
+            # servers without get_version are introspected every time
+            self.server_version = None
+
+        xml = None
+        if cache is not None and self.server_version is not None:
+            xml = cache.load(self.server_version)
+        try:
+            methods = parse_methods(xml, self.default_interface) \
+                if xml is not None else None
+        except ValueError:
+            methods = None
+        if methods is None:
+            xml = self._call_sync('Introspect', None, '(s)',
+                                  interface_name=INTROSPECTABLE_INTERFACE)[0]
+            try:
+                methods = parse_methods(xml, self.default_interface)
+            except ValueError as error:
+                raise ConnectionError('{0}: Introspect'.format(error))
+            if cache is not None and self.server_version is not None:
+                cache.store(self.server_version, xml)
+
+        known = self.REMOTE_METHODS
+        self.methods = dict(
+            (name, known[name] if name in known and
+             (known[name].in_signature, known[name].out_signature) ==
+             signatures else RemoteMethod(name, *signatures))
+            for name, signatures in methods.items())
+
+    def __getattr__(self, name):
+        """Remote methods which are only known from the introspection
+        data are available as attributes, like the built-in ones:
+        name(*args, timeout=None, cancellable=None).
+        The non-blocking variant of every remote method is generated here
+        too: name_async(*args, callback, timeout=None, cancellable=None),
+        see invoke_async
+        """
+        methods = self.__dict__.get('methods', {})
+        if name.endswith('_async') and name[:-6] in methods:
+            n_args = methods[name[:-6]].n_args
+
+            def call_async(*args, **kwargs):
+                """Call the remote method without blocking"""
+                # pylint: disable=star-args
+                return self.invoke_async(name[:-6], args[:n_args],
+                                         *args[n_args:], **kwargs)
+            call_async.__name__ = str(name)
+            return call_async
+        if name in methods:
+            def call(*args, **kwargs):
+                """Call the remote method"""
+                return self.invoke(name, args, **kwargs)
+            return call
+        raise AttributeError(name)
+
+    def is_connected(self):
+        """Test if the connection is established and has not been closed,
+        either locally or by the gst-switch-srv
+
+        :returns: True if remote methods can be called
+        """
+        if self.connection is None:
+            return False
+        return not self.connection.is_closed()
+
+    def disconnect_dbus(self):
+        """Close the connection to the gst-switch-srv, if there is one.
+        Callbacks registered with on_closed are called once the connection
+        has actually been closed.
+
+        :returns: Nothing
+        """
+        connection = self.connection
+        if connection is None:
+            return
+        for subscription in self.signal_subscriptions.values():
+            connection.signal_unsubscribe(subscription)
+        self.signal_subscriptions.clear()
+        if not connection.is_closed():
+            connection.close(None, None, None)
+
+    def cb_closed(self, connection, remote_peer_vanished, error):
+        """Private Callback connected to the closed signal of the
+        Gio.DBusConnection. Calls all callbacks registered with on_closed.
+        """
+        for callback in self.callbacks_closed:
+            callback(self, remote_peer_vanished)
+
+    def on_closed(self, callback):
+        """Register a Callback which is called when the connection has been
+        closed, either locally or because the gst-switch-srv went away.
+
+        The Callback takes the following Arguments:
+            Connection connection     - This Connection
+            bool remote_peer_vanished - True if the Server closed
+                                        the connection
+        """
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        self.callbacks_closed.append(callback)
+
+    def signal_subscribe(self, signal_handler, member=None):
+        """Subscribe to Signals on the bus.
+        One subscription is held per member, subscribing again replaces the
+        previous signal_handler of that member.
+
+        :param signal_handler: Called for every matching signal, see Gio's
+        DBusConnection.signal_subscribe
+        :param member: Name of the signal to subscribe, None subscribes all
+        signals of the interface
+        :returns: Nothing
+        """
         if not callable(signal_handler):
             raise ValueError('Provided signal_handler is not callable')
 
+        self.signal_unsubscribe(member)
+
         try:
-            self.connection.signal_subscribe(
-                None,  # sender
-                self.default_interface,
-                None,  # member
-                self.object_path,
-                None,  # arg0
-                Gio.DBusSignalFlags.NONE,
-                signal_handler,
-                None)  # user_data
+            self.signal_subscriptions[member] = (
+                self.connection.signal_subscribe(
+                    None,  # sender
+                    self.default_interface,
+                    member,
+                    self.object_path,
+                    None,  # arg0
+                    Gio.DBusSignalFlags.NONE,
+                    signal_handler,
+                    None))  # user_data
         except GLib.GError as error:
             message = error.message
             new_message = "{1} ({0})".format(message, self.address)
             raise ConnectionError(new_message)
 
-    def get_compose_port(self):
-        """get_compose_port(out i port);
-        Calls get_compose_port remotely
+    def signal_unsubscribe(self, member=None):
+        """Remove the subscription made by signal_subscribe for member
 
-        :param: None
-        :returns: tuple with first element compose port number
+        :param member: Name of the signal, None for the subscription of all
+        signals
+        :returns: Nothing
+        """
+        subscription = self.signal_subscriptions.pop(member, None)
+        if subscription is not None:
+            self.connection.signal_unsubscribe(subscription)
+
+    def _call_sync(self, method_name, args, reply_type,
+                   timeout=None, cancellable=None, interface_name=None):
+        """Non-public method: Call a remote method and wait for the reply
+
+        :param method_name: The name of the remote method
+        :param args: GLib.Variant tuple with the arguments or None
+        :param reply_type: The GLib.VariantType or type-string of the
+        expected reply
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :param interface_name: Interface of the method, defaults to
+        default_interface
+        :returns: The GVariant tuple returned
+        :raises ConnectionTimeoutError: No reply within the timeout
+        :raises ConnectionError: The call failed or was cancelled
         """
+        if timeout is None:
+            timeout = self.default_timeout
+        if not isinstance(reply_type, GLib.VariantType):
+            reply_type = GLib.VariantType.new(reply_type)
         try:
-            args = None
-            connection = self.connection
-            port = connection.call_sync(
+            return self.connection.call_sync(
                 self.bus_name,
                 self.object_path,
-                self.default_interface,
-                'get_compose_port',
-                args, GLib.VariantType.new("(i)"),
+                interface_name or self.default_interface,
+                method_name,
+                args,
+                reply_type,
                 Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return port
+                timeout,
+                cancellable)
         except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "get_compose_port")
-            raise ConnectionError(new_message)
+            raise self.convert_error(error, method_name)
+
+    @staticmethod
+    def convert_error(error, method_name):
+        """Convert a GLib.GError raised by a remote call into the matching
+        exception from gstswitch.exception
+
+        :param error: The GLib.GError
+        :param method_name: The name of the remote method
+        :returns: ConnectionTimeoutError, ConnectionUnknownMethodError or
+        ConnectionError
+        """
+        message = error.message
+        new_message = "{0}: {1}".format(message, method_name)
+        if error.matches(Gio.io_error_quark(), Gio.IOErrorEnum.TIMED_OUT):
+            return ConnectionTimeoutError(new_message)
+        if error.matches(Gio.dbus_error_quark(),
+                         Gio.DBusError.UNKNOWN_METHOD):
+            return ConnectionUnknownMethodError(new_message)
+        return ConnectionError(new_message)
+
+    def call_async(self, method_name, args, reply_type, callback,
+                   timeout=None, cancellable=None):
+        """Call a remote method without blocking.
+        The call is started from the thread-default MainContext of the caller
+        and callback is dispatched from that MainContext once the reply
+        arrived, so a GLib MainLoop must be running on it.
+
+        :param method_name: The name of the remote method
+        :param args: GLib.Variant tuple with the arguments or None
+        :param reply_type: The GLib.VariantType or type-string of the
+        expected reply
+        :param callback: Called as callback(result, error) with either the
+        GVariant tuple returned or a ConnectionError
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: Nothing
+        """
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+        if timeout is None:
+            timeout = self.default_timeout
+        if not isinstance(reply_type, GLib.VariantType):
+            reply_type = GLib.VariantType.new(reply_type)
+
+        def finish(connection, result, _):
+            """Complete the call and hand the outcome to callback"""
+            try:
+                value = connection.call_finish(result)
+            except GLib.GError as error:
+                callback(None, self.convert_error(error, method_name))
+                return
+            callback(value, None)
+
+        self.connection.call(
+            self.bus_name,
+            self.object_path,
+            self.default_interface,
+            method_name,
+            args,
+            reply_type,
+            Gio.DBusCallFlags.NONE,
+            timeout,
+            cancellable,
+            finish,
+            None)
+
+    def remote_method(self, method_name):
+        """Get the RemoteMethod describing method_name
+
+        :raises ValueError: There is no such remote method
+        """
+        try:
+            return self.methods[method_name]
+        except KeyError:
+            raise ValueError("Unknown remote method '{0}'"
+                             .format(method_name))
+
+    def invoke(self, method_name, args=(), timeout=None, cancellable=None):
+        """Call a remote method by name, packing args as declared in
+        METHODS, and wait for the reply
+
+        :param method_name: One of methods, by default METHODS
+        :param args: Sequence of the arguments of the remote method
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: The GVariant tuple returned
+        :raises ValueError: There is no such remote method
+        :raises TypeError: The arguments do not match the method
+        """
+        method = self.remote_method(method_name)
+        return self._call_sync(method_name, method.pack(args),
+                               method.reply_type, timeout, cancellable)
+
+    def invoke_async(self, method_name, args, callback,
+                     timeout=None, cancellable=None):
+        """Call a remote method by name without blocking, see invoke and
+        call_async
+
+        :param method_name: One of methods, by default METHODS
+        :param args: Sequence of the arguments of the remote method
+        :param callback: Called as callback(result, error)
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: Nothing
+        :raises ValueError: There is no such remote method
+        """
+        method = self.remote_method(method_name)
+        self.call_async(method_name, method.pack(args), method.reply_type,
+                        callback, timeout, cancellable)
+
+    def send(self, method_name, args=(), flush=False):
+        """Call a remote method without waiting for, or even asking for,
+        a reply. The message is marked NO_REPLY_EXPECTED and queued on
+        the connection, so the call costs no round trip. Errors on the
+        server are not reported. For methods which reply with nothing
+        useful, like mark_face.
+
+        :param method_name: One of methods, by default METHODS
+        :param args: Sequence of the arguments of the remote method
+        :param flush: Block until the message was written to the socket
+        :returns: Nothing
+        :raises ValueError: There is no such remote method
+        :raises TypeError: The arguments do not match the method
+        :raises ConnectionError: The connection is closed
+        """
+        method = self.remote_method(method_name)
+        body = method.pack(args)
+        message = Gio.DBusMessage.new_method_call(
+            self.bus_name, self.object_path, self.default_interface,
+            method_name)
+        if body is not None:
+            message.set_body(body)
+        message.set_flags(Gio.DBusMessageFlags.NO_REPLY_EXPECTED)
+        try:
+            self.connection.send_message(message,
+                                         Gio.DBusSendMessageFlags.NONE)
+            if flush:
+                self.connection.flush_sync(None)
+        except GLib.GError as error:
+            raise self.convert_error(error, method_name)
+
+    def get_compose_port(self, timeout=None, cancellable=None):
+        """get_compose_port(out i port);
+        Calls get_compose_port remotely
 
-    def get_encode_port(self):
+        :param: None
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element compose port number
+        """
+        return self.invoke('get_compose_port', (), timeout, cancellable)
+
+    def get_encode_port(self, timeout=None, cancellable=None):
         """get_encode_port(out i port);
         Calls get_encode_port remotely
 
         :param: None
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element encode port number
         """
-        try:
-            args = None
-            connection = self.connection
-            port = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'get_encode_port',
-                args,
-                GLib.VariantType.new("(i)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return port
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "get_encode_port")
-            raise ConnectionError(new_message)
+        return self.invoke('get_encode_port', (), timeout, cancellable)
 
-    def get_audio_port(self):
+    def get_audio_port(self, timeout=None, cancellable=None):
         """get_audio_port(out i port);
         Calls get_audio_port remotely
 
         :param: None
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple wit first element audio port number
         """
-        try:
-            args = None
-            connection = self.connection
-            port = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'get_audio_port',
-                args,
-                GLib.VariantType.new("(i)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return port
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "get_audio_port")
-            raise ConnectionError(new_message)
+        return self.invoke('get_audio_port', (), timeout, cancellable)
 
-    def get_preview_ports(self):
+    def get_preview_ports(self, timeout=None, cancellable=None):
         """get_preview_ports(out s ports);
         Calls get_preview_ports remotely
 
         :param: None
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element a string in the form of
         '[(3002, 1, 7), (3003, 1, 8)]'
         """
-        try:
-            args = None
-            connection = self.connection
-            ports = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'get_preview_ports',
-                args,
-                GLib.VariantType.new("(s)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return ports
-        except GLib.GError as error:
-            error = sys.exc_info()[1]
-            message = error.message
-            new_message = "{0}: {1}".format(message, "get_preview_ports")
-            raise ConnectionError(new_message)
+        return self.invoke('get_preview_ports', (), timeout, cancellable)
 
-    def set_composite_mode(self, mode):
+    def get_preview_port_info(self, timeout=None, cancellable=None):
+        """get_preview_port_info(out a(iii) ports);
+        Calls get_preview_port_info remotely
+
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element a list of
+        (port, serve, type) tuples
+        """
+        return self.invoke('get_preview_port_info', (), timeout, cancellable)
+
+    def set_composite_mode(self, mode, timeout=None, cancellable=None):
         """set_composite_mode(in  i channel,
                                 out b result);
         Calls set_composite_mode remotely
 
         :param mode: new composite mode
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element True if requested
         """
-        try:
-            args = GLib.Variant('(i)', (mode,))
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'set_composite_mode',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE, -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "set_composite_mode")
-            raise ConnectionError(new_message)
+        return self.invoke('set_composite_mode', (mode,), timeout, cancellable)
 
-    def get_composite_mode(self):
+    def get_composite_mode(self, timeout=None, cancellable=None):
         """get_composite_mode(out b result);
         Calls get_composite_mode remotely
 
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element being the current compsition mode
         """
-        try:
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'get_composite_mode',
-                None,
-                GLib.VariantType.new("(i)"),
-                Gio.DBusCallFlags.NONE, -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "get_composite_mode")
-            raise ConnectionError(new_message)
+        return self.invoke('get_composite_mode', (), timeout, cancellable)
+
+    def get_state(self, timeout=None, cancellable=None):
+        """get_state(out a{sv} state);
+        Calls get_state remotely
+
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element a dict describing the state
+        """
+        return self.invoke('get_state', (), timeout, cancellable)
+
+    def get_version(self, timeout=None, cancellable=None):
+        """get_version(out s version);
+        Calls get_version remotely
 
-    def set_encode_mode(self, channel):
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element the version of the server
+        """
+        return self.invoke('get_version', (), timeout, cancellable)
+
+    def set_encode_mode(self, channel, timeout=None, cancellable=None):
         """set_encode_mode(in  i channel,
                             out b result);
         Calls set_encode_mode remotely
         **Does not do anything**
 
         :param: channel
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element True if requested
         """
-        try:
-            args = GLib.Variant('(i)', (channel,))
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'set_encode_mode',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "set_encode_mode")
-            raise ConnectionError(new_message)
+        return self.invoke('set_encode_mode', (channel,), timeout, cancellable)
 
-    def new_record(self):
+    def new_record(self, timeout=None, cancellable=None):
         """new_record(out b result);
         Calls new_record remotely
 
-        :param: None:
-        returns: tuple with first element True if requested
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element True if requested
         """
-        try:
-            args = None
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'new_record',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "new_record")
-            raise ConnectionError(new_message)
+        return self.invoke('new_record', (), timeout, cancellable)
 
-    def adjust_pip(self, xpos, ypos, width, height):
+    def adjust_pip(self, xpos, ypos, width, height,
+                   timeout=None, cancellable=None):
         """adjust_pip(in i dx,
                            in  i dy,
                            in  i dw,
@@ -394,29 +695,15 @@ class Connection(object):
         :param ypos: the Y position of the PIP
         :param width: the width of the PIP
         :param height: the height of the PIP
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element as result -
         PIP has been changed succefully
         """
-        try:
-            args = GLib.Variant('(iiii)', (xpos, ypos, width, height,))
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'adjust_pip',
-                args,
-                GLib.VariantType.new("(u)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "adjust_pip")
-            raise ConnectionError(new_message)
+        return self.invoke('adjust_pip', (xpos, ypos, width, height),
+                           timeout, cancellable)
 
-    def switch(self, channel, port):
+    def switch(self, channel, port, timeout=None, cancellable=None):
         """switch(in  i channel,
                        in  i port,
                        out b result);
@@ -424,28 +711,14 @@ class Connection(object):
 
         :param channel: The channel to be switched, 'A', 'B', 'a'
         :param port: The target port number
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element True if requested
         """
-        try:
-            args = GLib.Variant('(ii)', (channel, port,))
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'switch',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "switch")
-            raise ConnectionError(new_message)
+        return self.invoke('switch', (channel, port), timeout, cancellable)
 
-    def click_video(self, xpos, ypos, width, height):
+    def click_video(self, xpos, ypos, width, height,
+                    timeout=None, cancellable=None):
         """click_video(in  i x,
                             in  i y,
                             in  i fw,
@@ -457,75 +730,77 @@ class Connection(object):
         :param ypos:
         :param width:
         :param height:
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: tuple with first element True if requested
         """
-        try:
-            args = GLib.Variant('(iiii)', (xpos, ypos, width, height,))
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'click_video',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "click_video")
-            raise ConnectionError(new_message)
+        return self.invoke('click_video', (xpos, ypos, width, height),
+                           timeout, cancellable)
 
-    def mark_face(self, faces):
+    def mark_face(self, faces, timeout=None, cancellable=None):
         """mark_face(in  a(iiii) faces);
         Calls mark_face remotely
 
-        :param faces: tuple having four elements
-        :returns: tuple with first element True if requested
+        :param faces: list of tuples having four elements, or a buffer
+        of int32, see markers.pack_markers
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: empty tuple
         """
-        try:
-            args = GLib.Variant('a(iiii)', faces)
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'mark_face',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "mark_face")
-            raise ConnectionError(new_message)
+        return self.invoke('mark_face', (faces,), timeout, cancellable)
 
-    def mark_tracking(self, faces):
+    def mark_tracking(self, faces, timeout=None, cancellable=None):
         """mark_tracking(in  a(iiii) faces);
         Calls mark_tracking remotely
 
-        :param faces: tuple having four elements
-        :returns: tuple with first element True if requested
+        :param faces: list of tuples having four elements, or a buffer
+        of int32, see markers.pack_markers
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: empty tuple
         """
-        try:
-            args = GLib.Variant('a(iiii)', faces)
-            connection = self.connection
-            result = connection.call_sync(
-                self.bus_name,
-                self.object_path,
-                self.default_interface,
-                'mark_tracking',
-                args,
-                GLib.VariantType.new("(b)"),
-                Gio.DBusCallFlags.NONE,
-                -1,
-                None)
-            return result
-        except GLib.GError as error:
-            message = error.message
-            new_message = "{0}: {1}".format(message, "mark_tracking")
-            raise ConnectionError(new_message)
+        return self.invoke('mark_tracking', (faces,), timeout, cancellable)
+
+    def batch(self, operations, timeout=None, cancellable=None):
+        """batch(in  a(sv) operations,
+                      out av results);
+        Calls batch remotely
+
+        :param operations: Sequence of (method name, arguments) tuples,
+        see BATCH_METHODS for the supported methods
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: tuple with first element the list of results
+        """
+        return self._call_sync('batch', self.pack_batch(operations),
+                               self.REMOTE_METHODS['batch'].reply_type,
+                               timeout, cancellable)
+
+    @classmethod
+    def pack_batch(cls, operations):
+        """Pack the operations of a batch into a GVariant tuple
+
+        :param operations: Sequence of (method name, arguments) tuples
+        :returns: GLib.Variant typed (a(sv))
+        :raises ValueError: A method can not be batched
+        """
+        packed = []
+        for method_name, args in operations:
+            if method_name not in cls.BATCH_METHODS:
+                raise ValueError("Method '{0}' can not be batched"
+                                 .format(method_name))
+            packed.append((method_name,
+                           cls.REMOTE_METHODS[method_name].pack(args)))
+        return GLib.Variant('(a(sv))', (packed,))
+
+    def batch_async(self, operations, callback,
+                    timeout=None, cancellable=None):
+        """Calls batch remotely without blocking, see call_async
+
+        :param callback: Called as callback(result, error)
+        :param timeout: Timeout in msec, defaults to default_timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        """
+        self.call_async('batch', self.pack_batch(operations),
+                        self.REMOTE_METHODS['batch'].reply_type, callback,
+                        timeout, cancellable)
@@ -7,18 +7,51 @@ which can be used to invoke the remote methods.
 from __future__ import absolute_import, print_function, unicode_literals
 
 import ast
+import threading
+from contextlib import contextmanager
+from time import sleep
+from .address import check_address
+from .completions import CompletionMixin
 from .connection import Connection
-from .exception import ConnectionReturnError
+from .exception import ConnectionError, ConnectionReturnError
+from .aio import AsyncioFacade, AsyncMixin
+from .batch import Batch
+from .events import EventStream
+from .mainloop import MainLoopThread
+from .markers import MarkerMixin
+from .signals import SignalDispatcher
+from .state import ControllerState, PreviewPort, ServerState
+from .waiting import WaitMixin
 
-__all__ = ["Controller", ]
+__all__ = ["Controller", "Batch", "PreviewPort", "ServerState", ]
 
 
-class Controller(object):
+class Controller(WaitMixin, CompletionMixin, MarkerMixin, AsyncMixin):
 
     """A Class to control all interactions with the gst-switch-srv over dbus.
     Provides the interface for higher level interactions
 
-    :param: None
+    :param address: DBus address of the server, a unix:path= or
+    unix:abstract= socket is faster than tcp on the same host, see
+    Server.controller to connect to the address the server reports
+    :param timeout: Default timeout of remote method calls in msec,
+    -1 uses the GLib default of 25 seconds, 0 or None waits forever
+    :param threaded: Give the Controller a MainLoopThread of its own, which
+    makes the connection and dispatches all signals and asynchronous
+    replies. Signal callbacks are then called without the caller running
+    a GLib MainLoop. A MainLoopThread can be passed to share it between
+    several Controllers.
+    :param introspect: Check calls against the introspection data of the
+    server, see Connection
+
+    The wait_for_* methods wait for the server to reach a state, see
+    WaitMixin. The on_*_completed methods report when requests took
+    effect, see CompletionMixin. Markers are set and followed with
+    MarkerMixin, call_async and future do not block, see AsyncMixin.
+
+    All methods can be called from several threads at once. Connecting
+    and changing the signal subscriptions is serialized, remote method
+    calls run concurrently on the shared connection.
     """
     COMPOSITE_NONE = 0
     COMPOSITE_PIP = 1
@@ -27,6 +60,21 @@ class Controller(object):
     VIDEO_CHANNEL_A = ord('A')
     VIDEO_CHANNEL_B = ord('B')
     AUDIO_CHANNEL = ord('a')
+    SERVE_NOTHING = 0
+    SERVE_VIDEO_STREAM = 1
+    SERVE_AUDIO_STREAM = 2
+
+    RECONNECT_ATTEMPTS = 5
+    RECONNECT_BACKOFF = 0.05
+    RECONNECT_BACKOFF_MAX = 1.0
+
+    REMOTE_METHODS = tuple(sorted(Connection.METHODS))
+
+    SIGNALS = (
+        'preview_port_added', 'preview_port_removed', 'new_mode_online',
+        'show_face_marker', 'show_track_marker', 'select_face',
+        'switch_completed', 'pip_adjusted', 'transition_completed',
+    )
 
     def __init__(
             self,
@@ -34,7 +82,10 @@ class Controller(object):
             bus_name='us.timvideos.gstswitch.SwitchController',
             object_path="/us/timvideos/gstswitch/SwitchController",
             default_interface=(
-                "us.timvideos.gstswitch.SwitchControllerInterface")
+                "us.timvideos.gstswitch.SwitchControllerInterface"),
+            timeout=-1,
+            threaded=False,
+            introspect=False
     ):
 
         super(Controller, self).__init__()
@@ -44,18 +95,31 @@ class Controller(object):
         self._object_path = None
         self._default_interface = None
         self.connection = None
+        self.main_loop_thread = None
+        self.threaded = bool(threaded)
+        self._lock = threading.RLock()
+        self._connect_lock = threading.Lock()
+        self.state = None
+        self.aio = AsyncioFacade(self)
 
         self.address = address
         self.bus_name = bus_name
         self.object_path = object_path
         self.default_interface = default_interface
+        self.timeout = timeout
+        self.introspect = introspect
+        if isinstance(threaded, MainLoopThread):
+            self.main_loop_thread = threaded
+        elif threaded:
+            self.main_loop_thread = MainLoopThread(name='gstswitch-controller')
 
-        self.callbacks_preview_port_added = []
-        self.callbacks_preview_port_removed = []
-        self.callbacks_new_mode_online = []
-        self.callbacks_show_face_marker = []
-        self.callbacks_show_track_marker = []
-        self.callbacks_select_face = []
+        self.signals = SignalDispatcher(self.SIGNALS, self._serialized)
+
+    @property
+    def callbacks(self):
+        """The Callbacks of every Signal, a dict of lists by Signal name,
+        see SignalDispatcher"""
+        return self.signals.callbacks
 
     @property
     def address(self):
@@ -69,16 +133,7 @@ class Controller(object):
         """Set the Address
         http://dbus.freedesktop.org/doc/dbus-specification.html#addresses
         """
-        if not address:
-            raise ValueError("Address '{0}' cannot be blank")
-        else:
-            adr = str(address)
-            if adr.find(':') > 0:
-                self._address = adr
-            else:
-                raise ValueError("Address must follow specifications mentioned"
-                                 " at http://dbus.freedesktop.org/doc/"
-                                 "dbus-specification.html#addresses")
+        self._address = check_address(address)
 
     @property
     def bus_name(self):
@@ -150,21 +205,155 @@ class Controller(object):
                                  "doc/dbus-specification.html"
                                  "#message-protocol-names-interface")
 
-    def establish_connection(self):
-        """Establishes a fresh connection to the dbus
-        Connection stored as self.connection
+    def establish_connection(self, force=False):
+        """Establishes a connection to the dbus, unless there already is one
+        which is still open. The connection is stored as self.connection and
+        reused by all following method calls.
 
-        :param: None
+        When a previously established connection has been closed, a new one is
+        made, retrying RECONNECT_ATTEMPTS times with an exponential backoff
+        starting at RECONNECT_BACKOFF seconds.
+
+        In threaded mode the connection is made in the calling thread, so a
+        server which is slow to answer does not stall the MainLoopThread,
+        and its signals are subscribed inside the MainLoopThread, so they
+        are dispatched there.
+
+        :param force: Always make a fresh connection
         :returns: None
+        :raises ConnectionError: The connection could not be established
         """
-        self.connection = Connection(
+        if not force and self.is_connected():
+            return
+        if self.threaded and not self.main_loop_thread.is_loop_thread():
+            with self._connect_lock:
+                self._establish_connection(force)
+        else:
+            self._serialized(self._establish_connection, force)
+
+    def _establish_connection(self, force):
+        """Non-public method: Connect, see establish_connection"""
+        if not force and self.is_connected():
+            return
+
+        reconnect = self.connection is not None
+        connection = Connection(
             address=self.address,
             bus_name=self.bus_name,
             object_path=self.object_path,
-            default_interface=self.default_interface)
+            default_interface=self.default_interface,
+            default_timeout=self.timeout,
+            introspect=self.introspect)
+
+        if reconnect:
+            self._connect_with_backoff(connection, self.RECONNECT_ATTEMPTS)
+        else:
+            self._connect_with_backoff(connection, 1)
+        self._serialized(self._bind_connection, connection)
+
+    def _bind_connection(self, connection):
+        """Non-public method: Replace the connection by a newly made one and
+        subscribe the signals on it
+        """
+        self._close()
+        self.signals.bind(connection, self.cb_signal_handler)
+        self.connection = connection
+        if self.state is not None:
+            self.state.invalidate()
+
+    def _connect_with_backoff(self, connection, attempts):
+        """Non-public method: Connect to the dbus, retrying up to attempts
+        times and doubling the delay between two tries
+        """
+        delay = self.RECONNECT_BACKOFF
+        for attempt in range(attempts):
+            try:
+                connection.connect_dbus()
+                return
+            except ConnectionError:
+                if attempt + 1 >= attempts:
+                    raise
+                sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_BACKOFF_MAX)
+
+    def _bound_connection(self):
+        """Non-public method: Establish a connection and get it, read once
+        under the lock so a concurrent close cannot take it away between
+        connecting and the remote call
+
+        :returns: The Connection
+        :raises ConnectionError: The connection could not be established
+        or was closed meanwhile
+        """
+        self.establish_connection()
+        with self._lock:
+            connection = self.connection
+        if connection is None:
+            raise ConnectionError('The connection was closed')
+        return connection
+
+    def is_connected(self):
+        """Test if there is an open connection to the gst-switch-srv
+
+        :returns: True if the connection can be reused
+        """
+        if self.connection is None:
+            return False
+        return self.connection.is_connected()
 
-        self.connection.connect_dbus()
-        self.connection.signal_subscribe(self.cb_signal_handler)
+    def close(self):
+        """Close the connection to the gst-switch-srv, if there is one.
+        The next method call will establish a new connection.
+
+        :returns: None
+        """
+        self._serialized(self._close)
+
+    def _close(self):
+        """Non-public method: Close the connection, see close"""
+        if self.connection is not None:
+            self.connection.disconnect_dbus()
+        self.connection = None
+        self.signals.unbind()
+
+    def _serialized(self, function, *args):
+        """Non-public method: Call function holding the lock, in threaded
+        mode from inside the MainLoopThread. The lock is never held while
+        waiting for the thread, so callbacks running there can call back
+        into the Controller.
+        """
+        def call():
+            """Run function under the lock"""
+            with self._lock:
+                return function(*args)
+
+        if self.threaded:
+            return self.main_loop_thread.invoke_sync(call)
+        return call()
+
+    def enable_state_cache(self):
+        """Keep a local copy of the ports and the composite mode, which is
+        updated by the signals of the server and fetched again after every
+        reconnect. Reading from it does not need a round trip over dbus:
+
+            state = controller.enable_state_cache()
+            print(state.composite_mode, state.preview_ports)
+
+        :returns: The ControllerState, also available as self.state
+        """
+        if self.state is None:
+            self.state = ControllerState(self)
+            self.state.attach()
+        return self.state
+
+    def disable_state_cache(self):
+        """Stop keeping a local copy of the state of the server
+
+        :returns: None
+        """
+        if self.state is not None:
+            self.state.detach()
+        self.state = None
 
     def cb_signal_handler(self, connection, sender_name, object_path,
                           interface_name, signal_name, parameters, user_data):
@@ -174,32 +363,71 @@ class Controller(object):
         For params see Gio-Docs: <https://lazka.github.io/pgi-docs/#Gio-2.0/
         classes/DBusConnection.html#Gio.DBusConnection.signal_subscribe>
         """
-        try:
-            callbacks = getattr(self, 'callbacks_'+signal_name)
-            if not isinstance(callbacks, list):
-                raise AttributeError()
-
-            unpack = parameters.unpack()
-            for callback in callbacks:
-                # We're passing the values unpacked from the GVariant as-is
-                # to the callback. The auther of the callback is responsible
-                # to make sure that it's arguments match with the DBus Signal
-                # Specification for the particular Signal he's subscribing for
-                # Disable pylint-warning because we know what we're doing here.
+        self.signals.dispatch(signal_name, parameters)
+
+    def subscribe(self, signal_name, callback, max_rate=None, delta=False,
+                  decode=None):
+        """Register a Callback for a Signal, see the on_* methods.
+        Signals are only subscribed on the connection while they have at
+        least one Callback, so unused Signals never reach Python.
+
+        High-frequency Signals like show_face_marker can be limited to
+        max_rate calls per second, the latest Signal wins. With delta,
+        the Callback of a marker Signal gets the added and removed
+        markers instead of all of them, see CoalescedCallback.
+
+        :param signal_name: One of SIGNALS
+        :param callback: Called with the arguments of every signal
+        :param max_rate: Maximum number of calls per second, None for
+        no limit
+        :param delta: Call the Callback with the lists of added and
+        removed entries of the first argument
+        :param decode: Get the arguments from decode(parameters) instead
+        of unpacking the GVariant, see DecodingCallback
+        :returns: SignalSubscription, its unsubscribe method removes the
+        Callback again
+        """
+        return self.signals.subscribe(signal_name, callback,
+                                      max_rate=max_rate, delta=delta,
+                                      decode=decode)
+
+    def events(self, signal_names=None, maxsize=1000,
+               policy='drop-oldest'):
+        """Read Signals as a stream of Events instead of registering a
+        Callback for each, see events.EventStream:
+
+            with controller.events(policy='coalesce') as events:
+                for event in events:
+                    print(event.name, event.args)
+
+        :param signal_names: The Signals to stream, defaults to SIGNALS
+        :param maxsize: Number of Events queued at most
+        :param policy: What happens when the queue is full, one of
+        'drop-oldest', 'coalesce' and 'block'
+        :returns: EventStream, closing it ends the subscriptions
+        """
+        return EventStream(self, signal_names, maxsize, policy)
 
-                # pylint: disable=star-args
-                callback(*unpack)
+    def unsubscribe(self, subscription):
+        """Remove a Callback registered with subscribe or one of the
+        on_* methods
 
-        except AttributeError:
-            pass
+        :param subscription: The SignalSubscription returned on registration
+        :returns: True if the Callback was registered
+        """
+        return self.signals.unsubscribe(subscription)
 
-    def get_compose_port(self):
+    def get_compose_port(self, timeout=None, cancellable=None):
         """Get the compose port number
 
         :param: None
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: compose port number
         """
-        conn = self.connection.get_compose_port()
+        connection = self._bound_connection()
+        conn = connection.get_compose_port(
+            timeout=timeout, cancellable=cancellable)
         try:
             compose_port = conn.unpack()[0]
             return compose_port
@@ -207,13 +435,17 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values.'
                                         'Should return a GVariant tuple')
 
-    def get_encode_port(self):
+    def get_encode_port(self, timeout=None, cancellable=None):
         """Get the encode port number
 
         :param: None
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: encode port number
         """
-        conn = self.connection.get_encode_port()
+        connection = self._bound_connection()
+        conn = connection.get_encode_port(
+            timeout=timeout, cancellable=cancellable)
         try:
             encode_port = conn.unpack()[0]
             return encode_port
@@ -221,13 +453,17 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values.'
                                         ' Should return a GVariant tuple')
 
-    def get_audio_port(self):
+    def get_audio_port(self, timeout=None, cancellable=None):
         """Get the audio port number
 
         :param: None
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: audio port number
         """
-        conn = self.connection.get_audio_port()
+        connection = self._bound_connection()
+        conn = connection.get_audio_port(
+            timeout=timeout, cancellable=cancellable)
         try:
             audio_port = conn.unpack()[0]
             return audio_port
@@ -235,13 +471,17 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values. '
                                         'Should return a GVariant tuple')
 
-    def get_preview_ports(self):
+    def get_preview_ports(self, timeout=None, cancellable=None):
         """Get all the preview ports
 
         :param: None
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: list of all preview ports
         """
-        conn = self.connection.get_preview_ports()
+        connection = self._bound_connection()
+        conn = connection.get_preview_ports(
+            timeout=timeout, cancellable=cancellable)
         try:
             res = conn.unpack()[0]
             preview_ports = self.parse_preview_ports(res)
@@ -250,7 +490,26 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values. '
                                         'Should return a GVariant tuple')
 
-    def set_composite_mode(self, mode):
+    def get_preview_port_info(self, timeout=None, cancellable=None):
+        """Get all the preview ports together with the type of material
+        they serve. Unlike get_preview_ports the reply does not need
+        to be parsed.
+
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: list of PreviewPort
+        """
+        connection = self._bound_connection()
+        conn = connection.get_preview_port_info(
+            timeout=timeout, cancellable=cancellable)
+        try:
+            res = conn.unpack()[0]
+        except AttributeError:
+            raise ConnectionReturnError('Connection returned invalid values. '
+                                        'Should return a GVariant tuple')
+        return self.make_preview_ports(res)
+
+    def set_composite_mode(self, mode, timeout=None, cancellable=None):
         """Set the current composite mode.
         Modes allowed are:
          - COMPOSITE_NONE
@@ -259,14 +518,17 @@ class Controller(object):
          - COMPOSITE_DUAL_EQUAL
 
         :param mode: new composite mode
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: True when requested
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         # only modes from 0 to 3 are supported
         res = None
         if mode in range(0, 4):
             try:
-                conn = self.connection.set_composite_mode(mode)
+                conn = connection.set_composite_mode(
+                    mode, timeout=timeout, cancellable=cancellable)
                 res = conn.unpack()[0]
             except AttributeError:
                 raise ConnectionReturnError('Connection returned invalid '
@@ -277,7 +539,7 @@ class Controller(object):
             # raise some Exception
         return res
 
-    def get_composite_mode(self):
+    def get_composite_mode(self, timeout=None, cancellable=None):
         """Set the current composite mode.
         Modes allowed are:
          - COMPOSITE_NONE
@@ -285,13 +547,16 @@ class Controller(object):
          - COMPOSITE_DUAL_PREVIEW
          - COMPOSITE_DUAL_EQUAL
 
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: The current composition mode
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         # only modes from 0 to 3 are supported
         res = None
         try:
-            conn = self.connection.get_composite_mode()
+            conn = connection.get_composite_mode(
+                timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
             if res in range(0, 4):
                 print("Current composite mode is %u" % (res))
@@ -301,16 +566,48 @@ class Controller(object):
                                         'GVariant tuple')
         return res
 
-    def set_encode_mode(self, channel):
+    def get_state(self, timeout=None, cancellable=None):
+        """Get a snapshot of the whole state of the server in one call
+
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: ServerState
+        """
+        connection = self._bound_connection()
+        conn = connection.get_state(
+            timeout=timeout, cancellable=cancellable)
+        try:
+            res = conn.unpack()[0]
+        except AttributeError:
+            raise ConnectionReturnError('Connection returned invalid values. '
+                                        'Should return a GVariant tuple')
+        return ServerState.from_dict(res)
+
+    def get_version(self, timeout=None, cancellable=None):
+        """Get the version of the gst-switch-srv
+
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: The version string
+        """
+        connection = self._bound_connection()
+        conn = connection.get_version(
+            timeout=timeout, cancellable=cancellable)
+        return self._unpack_reply('get_version', conn)
+
+    def set_encode_mode(self, channel, timeout=None, cancellable=None):
         """Set the encode mode
         WARNING: THIS DOES NOT WORK.
 
         :param: channel
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: True when requested
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         try:
-            conn = self.connection.set_encode_mode(channel)
+            conn = connection.set_encode_mode(
+                channel, timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
             if res is not True:
                 # raise some exception
@@ -320,14 +617,17 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values. '
                                         'Should return a GVariant tuple')
 
-    def new_record(self):
+    def new_record(self, timeout=None, cancellable=None):
         """Start a new recording
 
         :param: None
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         try:
-            conn = self.connection.new_record()
+            conn = connection.new_record(
+                timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
             if res is not True:
                 # raise some exception
@@ -337,18 +637,23 @@ class Controller(object):
                                         'Should return a GVariant tuple')
         return res
 
-    def adjust_pip(self, xpos, ypos, width, height):
+    def adjust_pip(self, xpos, ypos, width, height,
+                   timeout=None, cancellable=None):
         """Change the PIP position and size
 
         :param xpos: the x position of the PIP
         :param ypos: the y position of the PIP
         :param width: the width of the PIP
         :param height: the height of the PIP
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: result - PIP has been changed succefully
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         try:
-            conn = self.connection.adjust_pip(xpos, ypos, width, height)
+            conn = connection.adjust_pip(
+                xpos, ypos, width, height,
+                timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
         except AttributeError:
             raise ConnectionReturnError('Connection returned invalid values. '
@@ -356,7 +661,7 @@ class Controller(object):
         # to-do - parse
         return res
 
-    def switch(self, channel, port):
+    def switch(self, channel, port, timeout=None, cancellable=None):
         """Switch the channel to the target port
 
         :param channel: The channel to be switched:
@@ -364,11 +669,14 @@ class Controller(object):
             VIDEO_CHANNEL_B
             AUDIO_CHANNEL
         :param port: The target port number
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: True when requested
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         try:
-            conn = self.connection.switch(channel, port)
+            conn = connection.switch(
+                channel, port, timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
             if res is not True:
                 # raise some exception
@@ -378,18 +686,23 @@ class Controller(object):
             raise ConnectionReturnError('Connection returned invalid values. '
                                         'Should return a GVariant tuple')
 
-    def click_video(self, xpos, ypos, width, height):
+    def click_video(self, xpos, ypos, width, height,
+                    timeout=None, cancellable=None):
         """User click on the video
 
         :param xpos:
         :param ypos:
         :param width:
         :param height:
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
         :returns: True when requested
         """
-        self.establish_connection()
+        connection = self._bound_connection()
         try:
-            conn = self.connection.click_video(xpos, ypos, width, height)
+            conn = connection.click_video(
+                xpos, ypos, width, height,
+                timeout=timeout, cancellable=cancellable)
             res = conn.unpack()[0]
             if res is not True:
                 # raise some exception
@@ -399,24 +712,50 @@ class Controller(object):
                                         'Should return a GVariant tuple')
         return res
 
-    def mark_face(self, faces):
-        """Mark faces
-
-        :param faces: tuple having four elements
-        :returns: True when requested
+    @contextmanager
+    def batch(self, timeout=None, cancellable=None):
+        """Collect switch, set_composite_mode and adjust_pip calls and
+        apply them together in a single remote call when the with-block
+        ends. The server applies the whole batch at once, so no
+        intermediate state gets rendered. When the block raises, nothing
+        is sent.
+
+            with controller.batch() as batch:
+                batch.switch(Controller.VIDEO_CHANNEL_A, 3003)
+                batch.switch(Controller.VIDEO_CHANNEL_B, 3004)
+                batch.set_composite_mode(Controller.COMPOSITE_PIP)
+            print(batch.results)
+
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: A Batch, its results are set after the block ended
         """
-        # faces is list of a tuple of four elements
-        self.establish_connection()
-        self.connection.mark_face(faces)
-
-    def mark_tracking(self, faces):
-        """Mark tracking
-
-        :param faces: tuple having four elements
-        :returns: True when requested
+        batch = Batch()
+        yield batch
+        batch.results = self.apply_batch(batch.operations,
+                                         timeout=timeout,
+                                         cancellable=cancellable)
+
+    def apply_batch(self, operations, timeout=None, cancellable=None):
+        """Apply a list of operations in a single remote call
+
+        :param operations: Sequence of (method name, arguments) tuples,
+        see Connection.BATCH_METHODS for the supported methods
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: list with the result of every operation
         """
-        self.establish_connection()
-        self.connection.mark_tracking(faces)
+        operations = list(operations)
+        if not operations:
+            return []
+        connection = self._bound_connection()
+        conn = connection.batch(
+            operations, timeout=timeout, cancellable=cancellable)
+        try:
+            return list(conn.unpack()[0])
+        except AttributeError:
+            raise ConnectionReturnError('Connection returned invalid values. '
+                                        'Should return a GVariant tuple')
 
     @classmethod
     def parse_preview_ports(cls, res):
@@ -433,6 +772,11 @@ class Controller(object):
             preview_ports.append(int(tupl[0]))
         return preview_ports
 
+    @classmethod
+    def make_preview_ports(cls, res):
+        """Turns a list of (port, serve, type) tuples into PreviewPorts"""
+        return [PreviewPort._make(tupl) for tupl in res]
+
     def on_preview_port_added(self, callback):
         """Register a Callback for the preview_port_added Signal
         which is fired, when a new Video or Audio-Source is connected
@@ -452,7 +796,7 @@ class Controller(object):
         if not callable(callback):
             raise ValueError('Provided argument callback is not callable')
 
-        self.callbacks_preview_port_added.append(callback)
+        return self.subscribe('preview_port_added', callback)
 
     def on_preview_port_removed(self, callback):
         """Register a Callback for the preview_port_removed Signal
@@ -473,7 +817,7 @@ class Controller(object):
         if not callable(callback):
             raise ValueError('Provided argument callback is not callable')
 
-        self.callbacks_preview_port_removed.append(callback)
+        return self.subscribe('preview_port_removed', callback)
 
     def on_new_mode_online(self, callback):
         """Register a Callback for the new_mode_online Signal
@@ -490,37 +834,7 @@ class Controller(object):
         if not callable(callback):
             raise ValueError('Provided argument callback is not callable')
 
-        self.callbacks_new_mode_online.append(callback)
-
-    def on_show_face_marker(self, callback):
-        """Register a Callback for the show_face_marker Signal
-        which is fired, when a Client has successfully set a face-marker
-        by calling mark_face.
-
-        The Callback takes the following Argument:
-            array faces  - An Array of Tuples of 4 ints, each specifying
-                           x, y, w, and h of a tracked region
-        """
-
-        if not callable(callback):
-            raise ValueError('Provided argument callback is not callable')
-
-        self.callbacks_show_face_marker.append(callback)
-
-    def on_show_track_marker(self, callback):
-        """Register a Callback for the show_track_marker Signal
-        which is fired, when a Client has successfully set a track-marker
-        by calling mark_tracking.
-
-        The Callback takes the following Argument:
-            array faces  - An Array of Tuples of 4 ints, each specifying
-                           x, y, w, and h of a tracked region
-        """
-
-        if not callable(callback):
-            raise ValueError('Provided argument callback is not callable')
-
-        self.callbacks_show_track_marker.append(callback)
+        return self.subscribe('new_mode_online', callback)
 
     def on_select_face(self, callback):
         """Register a Callback for the select_face Signal
@@ -535,4 +849,4 @@ class Controller(object):
         if not callable(callback):
             raise ValueError('Provided argument callback is not callable')
 
-        self.callbacks_select_face.append(callback)
+        return self.subscribe('select_face', callback)
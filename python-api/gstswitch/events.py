@@ -0,0 +1,282 @@
+"""
+events delivers the signals of the gst-switch-srv as a stream of Events.
+Instead of registering one callback per signal, a consumer reads the
+signals from a bounded, thread-safe queue: one by one, in batches, or
+with async for.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from collections import deque, namedtuple
+from gi.repository import GLib
+from six.moves import builtins
+from six.moves.queue import Empty
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+__all__ = ["Event", "EventStream", "POLICIES", ]
+
+# What put does when the queue is full, see EventStream
+POLICIES = ('drop-oldest', 'coalesce', 'block')
+
+_StopAsyncIteration = getattr(builtins, 'StopAsyncIteration', StopIteration)
+
+
+class Event(namedtuple('Event', ('name', 'args'))):
+
+    """A signal of the gst-switch-srv
+
+        name - The name of the signal, one of Controller.SIGNALS
+        args - Tuple of the unpacked arguments of the signal
+    """
+    __slots__ = ()
+
+
+class EventStream(object):
+
+    """Bounded queue of the signals of a Controller, see Controller.events.
+    It is an iterator, ending once the stream is closed and drained, and
+    an asynchronous iterator:
+
+        with controller.events(policy='coalesce') as events:
+            for event in events:
+                print(event.name, event.args)
+
+        async for event in controller.events():
+            ...
+
+    What happens when the queue holds maxsize events depends on policy:
+
+        drop-oldest - The oldest queued event is dropped, the default
+        coalesce    - A queued event of the same signal is replaced by
+                      the new one, otherwise the oldest is dropped. The
+                      consumer sees the latest state of every signal.
+        block       - The signal is held back until the consumer made
+                      room, which stalls the thread dispatching signals
+                      and with it all other signals and asynchronous
+                      replies of the Controller
+
+    The signals are dispatched by the MainLoopThread of a threaded
+    Controller. Otherwise reading from the stream runs the GLib
+    MainContext of the thread which created the stream, unless another
+    thread runs it. async for needs a threaded Controller.
+
+    :param controller: The Controller whose signals are streamed
+    :param signal_names: The signals to stream, defaults to all
+    :param maxsize: Number of events held at most
+    :param policy: One of POLICIES
+    :raises ValueError: Invalid maxsize or policy
+    """
+
+    def __init__(self, controller, signal_names=None, maxsize=1000,
+                 policy='drop-oldest'):
+        super(EventStream, self).__init__()
+        if policy not in POLICIES:
+            raise ValueError("policy must be one of {0}, not '{1}'"
+                             .format(POLICIES, policy))
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.policy = policy
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._waiters = []
+        self._pumping = None
+        self._context = None
+        if not controller.threaded:
+            self._context = GLib.MainContext.ref_thread_default()
+        names = controller.SIGNALS if signal_names is None else signal_names
+        self._subscriptions = []
+        try:
+            for name in names:
+                self._subscriptions.append(
+                    controller.subscribe(name, self._forward(name)))
+        except ValueError:
+            self.close()
+            raise
+
+    def _forward(self, name):
+        """Non-public method: The callback queueing the signal name"""
+        def forward(*args):
+            """Queue the signal"""
+            self.put(Event(name, args))
+        return forward
+
+    def put(self, event):
+        """Queue an event, applying the policy when the queue is full.
+        Called for every signal, events put after close are ignored.
+
+        :param event: The Event
+        :returns: Nothing
+        """
+        with self._condition:
+            if self._closed:
+                return
+            if self.policy == 'coalesce':
+                self._remove(event.name)
+            if len(self._events) >= self.maxsize:
+                if self.policy != 'block':
+                    self._events.popleft()
+                    self.dropped += 1
+                elif self._pumping != threading.current_thread():
+                    # the consumer is not this thread, wait for it
+                    while len(self._events) >= self.maxsize and \
+                            not self._closed:
+                        self._condition.wait()
+                    if self._closed:
+                        return
+            self._events.append(event)
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future, loop)
+
+    def _remove(self, name):
+        """Non-public method: Drop the queued event of signal name"""
+        for index, queued in enumerate(self._events):
+            if queued.name == name:
+                del self._events[index]
+                self.dropped += 1
+                return
+
+    def qsize(self):
+        """Number of queued events"""
+        with self._condition:
+            return len(self._events)
+
+    def get(self, timeout=None):
+        """Remove and return the next event
+
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: The Event
+        :raises Empty: No event within timeout, or the stream is closed
+        and drained
+        """
+        events = self.get_batch(1, timeout)
+        if not events:
+            raise Empty()
+        return events[0]
+
+    def get_batch(self, max_items=None, timeout=None):
+        """Remove and return the queued events, waiting for at least one
+
+        :param max_items: Number of events returned at most, None for all
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: List of Event, empty when there were none within
+        timeout or the stream is closed and drained
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = GLib.get_monotonic_time() + timeout * 1e6
+        while True:
+            with self._condition:
+                if self._events or self._closed:
+                    count = len(self._events)
+                    if max_items is not None:
+                        count = min(count, max_items)
+                    events = [self._events.popleft() for _ in range(count)]
+                    self._condition.notify_all()
+                    return events
+                remaining = None
+                if deadline is not None:
+                    remaining = (deadline - GLib.get_monotonic_time()) / 1e6
+                    if remaining <= 0:
+                        return []
+                if self._context is None or not self._context.acquire():
+                    self._condition.wait(remaining)
+                    continue
+                self._pumping = threading.current_thread()
+            self._pump(remaining)
+
+    def _pump(self, remaining):
+        """Non-public method: Run one iteration of the acquired MainContext,
+        dispatching signals into the queue
+        """
+        source = None
+        try:
+            if remaining is not None:
+                source = GLib.timeout_source_new(int(remaining * 1000) + 1)
+                source.set_callback(lambda *_: False)
+                source.attach(self._context)
+            self._context.iteration(True)
+        finally:
+            if source is not None:
+                source.destroy()
+            with self._condition:
+                self._pumping = None
+            self._context.release()
+
+    def close(self):
+        """Stop streaming. Queued events can still be read, afterwards
+        iterating ends.
+
+        :returns: Nothing
+        """
+        # release a producer waiting for room first, unsubscribing may
+        # need the thread it blocks
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.unsubscribe()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future, loop)
+        if self._context is not None:
+            self._context.wakeup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        events = self.get_batch(1)
+        if not events:
+            raise StopIteration()
+        return events[0]
+
+    next = __next__
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        """Get an asyncio.Future resolving to the next event"""
+        if asyncio is None:
+            raise RuntimeError('asyncio is not available')
+        loop = asyncio.get_event_loop()
+        future = asyncio.Future(loop=loop)
+        self._wake(future, loop)
+        return future
+
+    def _wake(self, future, loop):
+        """Non-public method: Resolve future with the next event, or wait
+        for one. Runs inside the event loop of future.
+        """
+        if future.done():
+            return
+        with self._condition:
+            if self._events:
+                event = self._events.popleft()
+                self._condition.notify_all()
+            elif self._closed:
+                event = None
+            else:
+                self._waiters.append((loop, future))
+                return
+        if event is None:
+            future.set_exception(_StopAsyncIteration())
+        else:
+            future.set_result(event)
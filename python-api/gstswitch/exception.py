@@ -8,7 +8,9 @@ import six
 
 __all__ = [
     'BaseError', 'PathError', 'ServerProcessError', 'ConnectionError',
-    'ConnectionReturnError', 'RangeError', 'InvalidIndexError',
+    'ConnectionTimeoutError', 'ConnectionUnknownMethodError',
+    'ConnectionReturnError', 'RangeError',
+    'InvalidIndexError', 'PoolError', 'WaitTimeoutError',
 ]
 
 
@@ -42,6 +44,19 @@ else:
     from builtins import ConnectionError
 
 
+class ConnectionTimeoutError(ConnectionError):
+
+    """docstring for ConnectionTimeoutError"""
+    pass
+
+
+class ConnectionUnknownMethodError(ConnectionError):
+
+    """Raised when the server does not have the remote method called,
+    e.g. because it is older than the client"""
+    pass
+
+
 class ConnectionReturnError(BaseError):
 
     """docstring for ConnectionReturnError"""
@@ -58,3 +73,20 @@ class InvalidIndexError(BaseError):
 
     """docstring for InvalidIndexError"""
     pass
+
+
+class PoolError(BaseError):
+
+    """Raised by PoolResults.raise_errors, errors maps the names of the
+    failed servers to their exception"""
+
+    def __init__(self, errors):
+        super(PoolError, self).__init__(
+            'Failed on {0}'.format(', '.join(sorted(errors))))
+        self.errors = errors
+
+
+class WaitTimeoutError(BaseError):
+
+    """Raised when the server did not reach the awaited state in time"""
+    pass
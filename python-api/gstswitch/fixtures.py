@@ -0,0 +1,276 @@
+"""
+fixtures runs many isolated gst-switch-srv instances for tests. The
+ServerPool starts them concurrently, each on free ports with a directory
+of its own for its log and recordings, and lends them to one test at a
+time. A returned server is reset and lent again, so most tests skip the
+start of a server. It is only restarted when it exited or when a test
+left behind what a reset cannot undo, like connected sources.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from time import time
+
+from .exception import (BaseError, ConnectionError, PoolError,
+                        WaitTimeoutError)
+from .server import Isolation, Server
+from .serverlog import LogOptions
+
+__all__ = ["ServerPool", ]
+
+
+class ServerPool(object):
+
+    """A pool of isolated servers for tests, e.g. in a conftest.py:
+
+        @pytest.fixture(scope='session')
+        def server_pool(request):
+            pool = ServerPool(path=PATH, video_format='debug')
+            pool.start()
+            request.addfinalizer(pool.stop)
+            return pool
+
+        @pytest.yield_fixture
+        def server(server_pool):
+            with server_pool.server() as serv:
+                yield serv
+
+    Tests connect with serv.controller() and feed sources with
+    helpers.TestSources.for_server(serv), since every server listens on
+    ports of its own.
+
+    When a server is returned, its composite mode and PIP are set back to
+    the ones it started with. A server which exited, still has sources
+    connected after reset_timeout or records into another file is
+    restarted instead.
+
+    :param size: Number of servers, defaults to the number of CPUs
+    :param path: Path where the executable gst-switch-srv is located,
+    see Server
+    :param directory: Directory for the directories of the servers,
+    defaults to a temporary one which stop removes
+    :param timeout: Seconds to wait for a server to start, see Server.run
+    :param reset_timeout: Seconds to wait for the reset of a server
+    :param kwargs: Further arguments for every Server, e.g. video_format
+    """
+
+    KILL_TIMEOUT = 5.0
+
+    def __init__(self, size=None, path=None, directory=None, timeout=None,
+                 reset_timeout=5.0, **kwargs):
+        super(ServerPool, self).__init__()
+        if size is None:
+            size = multiprocessing.cpu_count()
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self._own_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='gstswitch-')
+        self.timeout = timeout
+        self.reset_timeout = reset_timeout
+        self.reuses = 0
+        self.restarts = 0
+        self.servers = OrderedDict()
+        kwargs.setdefault('controller_address', 'tcp:host=127.0.0.1,port=0')
+        for index in range(size):
+            name = 'server-{0}'.format(index)
+            server_dir = os.path.join(self.directory, name)
+            if not os.path.isdir(server_dir):
+                os.makedirs(server_dir)
+            self.servers[name] = Server(
+                path=path,
+                isolation=Isolation(free_ports=True, working_dir=server_dir),
+                log_options=LogOptions(
+                    path=os.path.join(server_dir, 'server.log')),
+                **kwargs)
+        self._names = dict((id(server), name)
+                           for name, server in self.servers.items())
+        self._baselines = {}
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self.servers)
+
+    def __iter__(self):
+        return iter(self.servers)
+
+    def __getitem__(self, name):
+        return self.servers[name]
+
+    def start(self):
+        """Start all servers concurrently and wait until they are ready
+
+        :returns: Nothing
+        :raises PoolError: A server did not start, all are stopped then
+        """
+        errors = {}
+        lock = threading.Lock()
+
+        def start(name):
+            """Start one server, keep its error"""
+            try:
+                self._start(name)
+            except Exception as error:  # pylint: disable=broad-except
+                with lock:
+                    errors[name] = error
+
+        threads = [threading.Thread(target=start, args=(name,),
+                                    name='gstswitch-pool-' + name)
+                   for name in self.servers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            self.stop()
+            raise PoolError(errors)
+        with self._condition:
+            self._idle.extend(self.servers)
+            self._condition.notify_all()
+
+    def stop(self):
+        """Stop all servers and remove the temporary directory
+
+        :returns: Nothing
+        """
+        with self._condition:
+            self._idle.clear()
+        for server in self.servers.values():
+            server.stop(self.KILL_TIMEOUT)
+        if self._own_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def acquire(self, timeout=None, fresh=False):
+        """Take a server, waiting until one is returned if all are lent
+
+        :param timeout: Seconds to wait at most, None waits forever
+        :param fresh: Restart the server first, for tests which need one
+        which never served a test
+        :returns: The running Server
+        :raises WaitTimeoutError: No server was returned within timeout
+        """
+        deadline = None if timeout is None else time() + timeout
+        with self._condition:
+            while not self._idle:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        raise WaitTimeoutError(
+                            'No server of the pool is free after {0} '
+                            'seconds'.format(timeout))
+                self._condition.wait(remaining)
+            name = self._idle.popleft()
+        server = self.servers[name]
+        try:
+            if fresh or server.proc is None or \
+                    server.proc.poll() is not None:
+                self._restart(name)
+        except Exception:
+            self._put_back(name)
+            raise
+        return server
+
+    def release(self, server, restart=False):
+        """Return a server taken with acquire, which is reset or restarted
+
+        :param server: The Server
+        :param restart: Always restart the server
+        :returns: Nothing
+        :raises ValueError: The server is not one of the pool
+        """
+        name = self._names.get(id(server))
+        if name is None:
+            raise ValueError('The server is not one of the pool')
+        try:
+            if restart or not self._reset(name):
+                self._restart(name)
+            else:
+                with self._condition:
+                    self.reuses += 1
+        finally:
+            self._put_back(name)
+
+    @contextmanager
+    def server(self, timeout=None, fresh=False):
+        """Lend a server for the with block, see acquire and release
+
+        :param timeout: Seconds to wait for a free server
+        :param fresh: Restart the server first
+        """
+        server = self.acquire(timeout, fresh)
+        try:
+            yield server
+        finally:
+            self.release(server)
+
+    def _put_back(self, name):
+        """Non-public method: Make the server available to acquire"""
+        with self._condition:
+            self._idle.append(name)
+            self._condition.notify()
+
+    def _start(self, name):
+        """Non-public method: Run a server and remember the state it
+        starts with, which reset restores"""
+        server = self.servers[name]
+        server.run(timeout=self.timeout)
+        controller = server.controller()
+        try:
+            self._baselines[name] = controller.get_state()
+        finally:
+            controller.close()
+
+    def _restart(self, name):
+        """Non-public method: Stop a server and start it again"""
+        with self._condition:
+            self.restarts += 1
+        self.servers[name].stop(self.KILL_TIMEOUT)
+        self._start(name)
+
+    def _reset(self, name):
+        """Non-public method: Restore the state a server started with
+
+        :returns: False if it needs a restart instead
+        """
+        server = self.servers[name]
+        if server.proc is None or server.proc.poll() is not None:
+            return False
+        baseline = self._baselines[name]
+        try:
+            controller = server.controller(
+                timeout=int(self.reset_timeout * 1000))
+        except BaseError:
+            return False
+        try:
+            # sources the test stopped take a moment to disconnect
+            controller.wait_until(
+                ('preview_port_removed',),
+                lambda _: controller.get_state().inputs <= baseline.inputs,
+                self.reset_timeout)
+            state = controller.get_state()
+            if state.record_filename != baseline.record_filename:
+                return False
+            if state.composite_mode != baseline.composite_mode:
+                controller.set_composite_mode(baseline.composite_mode)
+                controller.wait_for_mode(baseline.composite_mode,
+                                         self.reset_timeout)
+                # a new mode brings a PIP of its own
+                state = controller.get_state()
+            if baseline.pip is not None and state.pip != baseline.pip:
+                # adjust_pip moves and resizes by the given amounts
+                controller.adjust_pip(*[
+                    wanted - current
+                    for wanted, current in zip(baseline.pip, state.pip)])
+        except (BaseError, ConnectionError, ValueError):
+            return False
+        finally:
+            controller.close()
+        return True
@@ -36,6 +36,18 @@ class TestSources(object):
         if audio_port:
             self.audio_port = audio_port
 
+    @classmethod
+    def for_server(cls, server):
+        """Create test sources feeding into a running server, on the
+        ports it is listening on. Those are picked by the server when it
+        was started with Isolation(free_ports=True).
+
+        :param server: The running Server
+        :returns: TestSources
+        """
+        return cls(video_port=server.bound_video_port,
+                   audio_port=server.bound_audio_port)
+
     @property
     def video_port(self):
         """Get the video port"""
@@ -239,6 +251,23 @@ class PreviewSinks(object):
 
         self.preview_port = preview_port
 
+    @classmethod
+    def for_server(cls, server, preview_port=None):
+        """Create a preview sink of a running server
+
+        :param server: The running Server
+        :param preview_port: The port to preview, defaults to the compose
+        port of the server
+        :returns: PreviewSinks
+        """
+        if preview_port is None:
+            controller = server.controller()
+            try:
+                preview_port = controller.get_compose_port()
+            finally:
+                controller.close()
+        return cls(preview_port=preview_port)
+
     @property
     def preview_port(self):
         """Get the preview port"""
@@ -0,0 +1,95 @@
+"""
+introspection reads the remote methods from the dbus introspection data
+of the gst-switch-srv, so methods added to the server can be called
+without a new release of the client. The IntrospectionCache keeps the data
+on disk per server version, so it is only fetched once.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import io
+import os
+import re
+from gi.repository import Gio, GLib
+
+__all__ = ["IntrospectionCache", "parse_methods",
+           "INTROSPECTABLE_INTERFACE", ]
+
+INTROSPECTABLE_INTERFACE = 'org.freedesktop.DBus.Introspectable'
+
+
+def parse_methods(xml, interface_name):
+    """Get the signatures of all methods of an interface
+
+    :param xml: The introspection data
+    :param interface_name: The name of the interface
+    :returns: dict of method name to (in_signature, out_signature), the
+    signatures being tuples like '(ii)'
+    :raises ValueError: xml can not be parsed or lacks the interface
+    """
+    try:
+        node = Gio.DBusNodeInfo.new_for_xml(xml)
+    except GLib.GError as error:
+        raise ValueError('Invalid introspection data: {0}'
+                         .format(error.message))
+    interface = node.lookup_interface(interface_name)
+    if interface is None:
+        raise ValueError("Interface '{0}' is not introspected"
+                         .format(interface_name))
+
+    def signature(args):
+        """Join the signatures of args into a tuple signature"""
+        return '({0})'.format(''.join(arg.signature for arg in args or ()))
+
+    return dict((method.name, (signature(method.in_args),
+                               signature(method.out_args)))
+                for method in interface.methods)
+
+
+class IntrospectionCache(object):
+
+    """Directory holding the introspection data of each server version
+
+    :param directory: Where to keep the files, defaults to gstswitch in
+    the user's cache directory, e.g. ~/.cache/gstswitch
+    """
+
+    def __init__(self, directory=None):
+        super(IntrospectionCache, self).__init__()
+        self.directory = directory or os.path.join(
+            GLib.get_user_cache_dir(), 'gstswitch')
+
+    def path(self, version):
+        """The file holding the data of version"""
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', version)
+        return os.path.join(self.directory,
+                            'introspection-{0}.xml'.format(name))
+
+    def load(self, version):
+        """Read the data of version
+
+        :returns: The introspection data, None if it is not cached
+        """
+        try:
+            with io.open(self.path(version), encoding='utf-8') as cached:
+                return cached.read()
+        except (IOError, OSError):
+            return None
+
+    def store(self, version, xml):
+        """Write the data of version. Failing to write is not an error,
+        the data is fetched from the server again next time.
+
+        :returns: True if the data was written
+        """
+        path = self.path(version)
+        temp = '{0}.{1}'.format(path, os.getpid())
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            with io.open(temp, 'w', encoding='utf-8') as cached:
+                cached.write(xml)
+            os.rename(temp, path)
+        except (IOError, OSError):
+            return False
+        return True
@@ -0,0 +1,140 @@
+"""
+mainloop runs a GLib MainLoop in a background thread.
+Asynchronous dbus calls and signals are dispatched from the MainContext
+they were started in, so the MainLoopThread gives them a place to run
+without requiring the caller to run a GLib MainLoop itself.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import sys
+import threading
+import six
+from gi.repository import GLib
+
+__all__ = ["MainLoopThread", ]
+
+
+class MainLoopThread(object):
+
+    """Run a GLib MainLoop on its own MainContext in a daemon thread.
+    The MainContext is pushed as thread-default inside the thread, so
+    everything started through invoke() and invoke_sync() dispatches its
+    callbacks into this thread.
+
+    :param name: The name of the thread
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name='gstswitch-mainloop'):
+        super(MainLoopThread, self).__init__()
+        self.name = name
+        self.context = GLib.MainContext()
+        self.loop = GLib.MainLoop.new(self.context, False)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """Get the MainLoopThread shared by everybody who does not need
+        a thread of its own. It is started on first use.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def start(self):
+        """Start the thread, unless it is already running
+
+        :returns: Nothing
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        """Non-public method: Body of the thread"""
+        self.context.push_thread_default()
+        try:
+            self.loop.run()
+        finally:
+            self.context.pop_thread_default()
+
+    def stop(self):
+        """Quit the MainLoop and wait for the thread to end
+
+        :returns: Nothing
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        # quit through the MainContext, so it is not lost when the loop
+        # has not started running yet
+        self.context.invoke_full(GLib.PRIORITY_DEFAULT,
+                                 lambda _: self.loop.quit(), None)
+        if thread is not threading.current_thread():
+            thread.join()
+
+    def is_running(self):
+        """Test if the thread has been started and not yet stopped"""
+        return self._thread is not None
+
+    def is_loop_thread(self):
+        """Test if the caller is running inside the thread"""
+        return threading.current_thread() is self._thread
+
+    def invoke(self, function, *args):
+        """Call function(*args) inside the thread and return immediately.
+        The thread is started if it is not yet running.
+
+        :param function: The callable to run
+        :returns: Nothing
+        """
+        self.start()
+
+        def dispatch(_):
+            """Run function once and remove the source"""
+            function(*args)
+            return False
+
+        self.context.invoke_full(GLib.PRIORITY_DEFAULT, dispatch, None)
+
+    def invoke_sync(self, function, *args):
+        """Call function(*args) inside the thread, wait for it to finish and
+        return its result. Exceptions raised by function are re-raised in
+        the calling thread. When called from inside the thread, function is
+        called directly.
+
+        :param function: The callable to run
+        :returns: The return value of function
+        """
+        if self.is_loop_thread():
+            return function(*args)
+
+        done = threading.Event()
+        outcome = {}
+
+        def call():
+            """Run function and store its outcome"""
+            # hand back everything, e.g. KeyboardInterrupt or SystemExit
+            # too, the caller would wait forever otherwise
+            try:
+                outcome['result'] = function(*args)
+            except BaseException:  # pylint: disable=broad-except
+                outcome['error'] = sys.exc_info()
+            finally:
+                done.set()
+
+        self.invoke(call)
+        done.wait()
+        if 'error' in outcome:
+            six.reraise(*outcome['error'])
+        return outcome.get('result')
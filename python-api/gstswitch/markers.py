@@ -0,0 +1,395 @@
+"""
+markers sends face and track markers at the rate a tracker produces them.
+Markers are only ever interesting in their latest state, so instead of
+waiting for a reply to every mark_face call, the MarkerQueue sends them
+without asking for a reply and drops updates which became stale while
+the connection was busy.
+
+Markers are an array of (x, y, width, height) int32 tuples, a(iiii). As
+every element has a fixed size, the serialized GVariant is just the ints
+in native byte order, so arrays are packed from and unpacked to their
+bytes in one step instead of one Python object per int.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import itertools
+import threading
+from array import array
+from collections import deque
+from gi.repository import GLib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ["MarkerQueue", "MarkerMixin", "pack_markers", "unpack_markers",
+           "marker_decoder", "MARKER_TYPE", "ARRAY_TYPES", ]
+
+MARKER_TYPE = GLib.VariantType.new('a(iiii)')
+
+# The types markers can be unpacked to, see unpack_markers
+ARRAY_TYPES = ('array', 'numpy')
+
+# Size of one serialized marker, four int32
+_MARKER_SIZE = 16
+
+
+def _array_to_bytes(ints):
+    """Non-public function: The bytes of an array('i')"""
+    if hasattr(ints, 'tobytes'):
+        return ints.tobytes()
+    return ints.tostring()
+
+
+def _int32_bytes(ints):
+    """Non-public function: The native int32 bytes of an iterable of ints"""
+    try:
+        return _array_to_bytes(array(str('i'), ints))
+    except TypeError:
+        raise TypeError('Markers must be a sequence of (x, y, width, '
+                        'height) tuples or a buffer of int32')
+    except OverflowError:
+        raise ValueError('Marker values must fit into int32')
+
+
+def _marker_bytes(faces):
+    """Non-public function: The native int32 bytes of faces. Contiguous
+    int32 buffers are copied at once, everything else is converted by
+    array('i') without building a GVariant per int.
+    """
+    try:
+        view = memoryview(faces)
+    except TypeError:
+        return _int32_bytes(itertools.chain.from_iterable(faces))
+    if view.itemsize == 4 and view.format in ('i', '@i', '=i') and \
+            view.c_contiguous:
+        return view.tobytes()
+    ints = view.tolist()
+    if view.ndim > 1:
+        ints = itertools.chain.from_iterable(ints)
+    return _int32_bytes(ints)
+
+
+def pack_markers(faces):
+    """Pack markers into an a(iiii) GVariant in one step
+
+    :param faces: A sequence of (x, y, width, height) tuples, or any
+    object with the buffer protocol holding four ints per marker, like
+    array('i') or a numpy array of shape (n, 4). A GLib.Variant of
+    MARKER_TYPE is returned as it is.
+    :returns: GLib.Variant of MARKER_TYPE
+    :raises TypeError: faces has the wrong type
+    :raises ValueError: faces does not hold four ints per marker
+    """
+    if isinstance(faces, GLib.Variant):
+        if not faces.get_type().equal(MARKER_TYPE):
+            raise TypeError('Markers must be of type a(iiii), not {0}'
+                            .format(faces.get_type_string()))
+        return faces
+    data = _marker_bytes(faces)
+    if len(data) % _MARKER_SIZE:
+        raise ValueError('Every marker needs four values, x, y, width '
+                         'and height')
+    return GLib.Variant.new_from_bytes(MARKER_TYPE, GLib.Bytes.new(data),
+                                       True)
+
+
+def unpack_markers(variant, array_type='array'):
+    """Unpack an a(iiii) GVariant from its bytes
+
+    :param variant: GLib.Variant of MARKER_TYPE
+    :param array_type: 'array' for a flat array('i') holding x, y,
+    width and height of each marker after another, 'numpy' for a
+    read-only int32 numpy array of shape (n, 4)
+    :returns: The markers
+    :raises ValueError: Unknown array_type or numpy is not installed
+    """
+    data = variant.get_data_as_bytes().get_data()
+    if array_type == 'array':
+        ints = array(str('i'))
+        if hasattr(ints, 'frombytes'):
+            ints.frombytes(data)
+        else:
+            ints.fromstring(data)
+        return ints
+    if array_type == 'numpy':
+        if numpy is None:
+            raise ValueError('Unpacking markers to numpy arrays needs '
+                             'numpy to be installed')
+        return numpy.frombuffer(data, dtype=numpy.int32).reshape(-1, 4)
+    raise ValueError("array_type must be one of {0}, not '{1}'"
+                     .format(ARRAY_TYPES, array_type))
+
+
+def marker_decoder(array_type):
+    """Build a decoder for the parameters of show_face_marker and
+    show_track_marker, see SignalDispatcher.subscribe
+
+    :param array_type: See unpack_markers
+    :returns: Function taking the GVariant parameters, returning a tuple
+    with the unpacked markers
+    """
+    if array_type not in ARRAY_TYPES:
+        raise ValueError("array_type must be one of {0}, not '{1}'"
+                         .format(ARRAY_TYPES, array_type))
+    if array_type == 'numpy' and numpy is None:
+        raise ValueError('Unpacking markers to numpy arrays needs numpy '
+                         'to be installed')
+
+    def decode(parameters):
+        """Unpack the markers of a signal"""
+        return (unpack_markers(parameters.get_child_value(0),
+                               array_type),)
+    return decode
+
+
+class MarkerQueue(object):
+
+    """Send face and track markers from a thread of its own.
+
+    put() never blocks: every method has a queue of at most maxlen
+    markers, and when the sending thread falls behind the oldest markers
+    are dropped. The thread sends without waiting for replies (see
+    Connection.send) but waits for each message to be written, so at most
+    one message per method is buffered in the connection and the rate is
+    limited by the bus instead of the round trip.
+
+        queue = MarkerQueue(controller)
+        for faces in tracker:
+            queue.mark_face(faces)
+        queue.close()
+
+    :param controller: The Controller to send with, it is connected when
+    needed
+    :param maxlen: Number of markers kept per method, 1 keeps the latest
+    :param on_error: Called as on_error(method_name, error) from the
+    sending thread when sending failed, the markers are dropped
+    """
+
+    METHODS = ('mark_face', 'mark_tracking')
+
+    def __init__(self, controller, maxlen=1, on_error=None):
+        super(MarkerQueue, self).__init__()
+        if maxlen < 1:
+            raise ValueError('maxlen must be at least 1')
+        if on_error is not None and not callable(on_error):
+            raise ValueError('Provided argument on_error is not callable')
+        self.controller = controller
+        self.on_error = on_error
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queues = dict((name, deque(maxlen=maxlen))
+                            for name in self.METHODS)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='gstswitch-markers')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, method_name, faces):
+        """Queue markers, dropping the oldest ones queued for
+        method_name when the queue is full
+
+        :param method_name: One of METHODS
+        :param faces: The markers, see pack_markers. They are packed right
+        away, so the caller may reuse a buffer afterwards.
+        :returns: Nothing
+        :raises ValueError: method_name is not one of METHODS, or faces
+        does not hold four ints per marker
+        :raises TypeError: faces has the wrong type
+        :raises RuntimeError: The queue is closed
+        """
+        if method_name not in self._queues:
+            raise ValueError("Unknown marker method '{0}'"
+                             .format(method_name))
+        queue = self._queues[method_name]
+        packed = pack_markers(faces)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('MarkerQueue is closed')
+            if len(queue) == queue.maxlen:
+                self.dropped += 1
+            queue.append(packed)
+            self._condition.notify()
+
+    def mark_face(self, faces):
+        """Queue face markers, see put"""
+        self.put('mark_face', faces)
+
+    def mark_tracking(self, faces):
+        """Queue track markers, see put"""
+        self.put('mark_tracking', faces)
+
+    def pending(self):
+        """Number of markers waiting to be sent"""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def flush(self, timeout=None):
+        """Wait until all queued markers were sent
+
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: True if the queue ran empty
+        """
+        with self._condition:
+            return self._wait_for(self._idle, timeout)
+
+    def close(self, timeout=None):
+        """Send the queued markers and stop the thread
+
+        :param timeout: Seconds to wait for the queued markers
+        :returns: Nothing
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _idle(self):
+        """Non-public method: Test if nothing is queued or being sent"""
+        return not self._busy and not any(self._queues.values())
+
+    def _wait_for(self, predicate, timeout):
+        """Non-public method: Wait on the condition until predicate holds,
+        which Condition.wait_for does on Python 3 only
+        """
+        if timeout is None:
+            while not predicate():
+                self._condition.wait()
+            return True
+        end = GLib.get_monotonic_time() + timeout * 1e6
+        while not predicate():
+            remaining = (end - GLib.get_monotonic_time()) / 1e6
+            if remaining <= 0:
+                return False
+            self._condition.wait(remaining)
+        return True
+
+    def _run(self):
+        """Non-public method: Body of the sending thread"""
+        while True:
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+                while not self._closed and not any(self._queues.values()):
+                    self._condition.wait()
+                if not any(self._queues.values()):
+                    return
+                self._busy = True
+                markers = [(name, self._queues[name].popleft())
+                           for name in self.METHODS if self._queues[name]]
+            for name, faces in markers:
+                self._send(name, faces)
+
+    def _send(self, method_name, faces):
+        """Non-public method: Send one update and wait until it is written"""
+        try:
+            # pylint: disable=protected-access
+            connection = self.controller._bound_connection()
+            connection.send(method_name, (faces,), flush=True)
+        except Exception as error:  # pylint: disable=broad-except
+            self.errors += 1
+            if self.on_error is not None:
+                self.on_error(method_name, error)
+            return
+        self.sent += 1
+
+
+class MarkerMixin(object):
+
+    """Methods of the Controller setting markers and registering
+    Callbacks for the marker signals. Markers are packed and unpacked
+    with pack_markers and unpack_markers.
+    """
+
+    def mark_face(self, faces, timeout=None, cancellable=None,
+                  no_reply=False):
+        """Mark faces
+
+        :param faces: list of (x, y, w, h) tuples, or an int32 buffer like
+        array('i') or numpy arrays, see markers.pack_markers
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :param no_reply: Send without waiting for the server, see
+        Connection.send and markers.MarkerQueue
+        :returns: Nothing
+        """
+        # faces is list of a tuple of four elements
+        connection = self._bound_connection()
+        if no_reply:
+            connection.send('mark_face', (faces,))
+        else:
+            connection.mark_face(
+                faces, timeout=timeout, cancellable=cancellable)
+
+    def mark_tracking(self, faces, timeout=None, cancellable=None,
+                      no_reply=False):
+        """Mark tracking
+
+        :param faces: markers, see mark_face
+        :param timeout: Timeout in msec, defaults to self.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :param no_reply: Send without waiting for the server, see
+        mark_face
+        :returns: Nothing
+        """
+        connection = self._bound_connection()
+        if no_reply:
+            connection.send('mark_tracking', (faces,))
+        else:
+            connection.mark_tracking(
+                faces, timeout=timeout, cancellable=cancellable)
+
+
+    def on_show_face_marker(self, callback, max_rate=None, delta=False,
+                            as_array=None):
+        """Register a Callback for the show_face_marker Signal
+        which is fired, when a Client has successfully set a face-marker
+        by calling mark_face.
+
+        The Callback takes the following Argument:
+            array faces  - An Array of Tuples of 4 ints, each specifying
+                           x, y, w, and h of a tracked region
+
+        With max_rate the Callback is called at most max_rate times per
+        second with the latest markers, with delta it takes the lists of
+        added and removed markers instead, see subscribe. With as_array
+        'array' or 'numpy' it takes the markers unpacked in one step, see
+        markers.unpack_markers.
+        """
+
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        return self.subscribe(
+            'show_face_marker', callback, max_rate=max_rate, delta=delta,
+            decode=as_array and marker_decoder(as_array))
+
+    def on_show_track_marker(self, callback, max_rate=None, delta=False,
+                             as_array=None):
+        """Register a Callback for the show_track_marker Signal
+        which is fired, when a Client has successfully set a track-marker
+        by calling mark_tracking.
+
+        The Callback takes the following Argument:
+            array faces  - An Array of Tuples of 4 ints, each specifying
+                           x, y, w, and h of a tracked region
+
+        With max_rate the Callback is called at most max_rate times per
+        second with the latest markers, with delta it takes the lists of
+        added and removed markers instead, see subscribe. With as_array
+        'array' or 'numpy' it takes the markers unpacked in one step, see
+        markers.unpack_markers.
+        """
+
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        return self.subscribe(
+            'show_track_marker', callback, max_rate=max_rate, delta=delta,
+            decode=as_array and marker_decoder(as_array))
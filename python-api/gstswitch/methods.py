@@ -0,0 +1,67 @@
+"""
+methods describes the remote methods of the gst-switch-srv.
+A RemoteMethod is built once per method and packs the arguments of every
+call with a packer chosen for its signature.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from gi.repository import GLib
+from .markers import pack_markers
+
+__all__ = ["RemoteMethod", ]
+
+
+def _make_packer(signature):
+    """Non-public function: Build a function packing a sequence of
+    arguments into a GVariant tuple of signature. Tuples of int32 are
+    built from GLib's constructors directly, and arrays of markers from
+    their bytes (see markers.pack_markers), which is several times faster
+    than letting GLib.Variant parse the signature on every call.
+    """
+    if signature == '()':
+        return lambda args: None
+    if signature == '(a(iiii))':
+        new_tuple = GLib.Variant.new_tuple
+        return lambda args: new_tuple(pack_markers(args[0]))
+    if signature.strip('()') == 'i' * (len(signature) - 2):
+        new_int32 = GLib.Variant.new_int32
+        new_tuple = GLib.Variant.new_tuple
+
+        def pack_int32(args):
+            """Pack a tuple of int32"""
+            # pylint: disable=star-args
+            return new_tuple(*[new_int32(arg) for arg in args])
+        return pack_int32
+    return lambda args: GLib.Variant(signature, tuple(args))
+
+
+class RemoteMethod(object):
+
+    """Descriptor of a remote method, built once per method
+
+    :param name: The name of the remote method
+    :param in_signature: Type-string of the arguments, as a tuple
+    :param out_signature: Type-string of the reply, as a tuple
+    """
+    __slots__ = ('name', 'in_signature', 'out_signature', 'n_args',
+                 '_pack', 'reply_type')
+
+    def __init__(self, name, in_signature, out_signature):
+        self.name = name
+        self.in_signature = in_signature
+        self.out_signature = out_signature
+        self.n_args = GLib.VariantType.new(in_signature).n_items()
+        self._pack = _make_packer(in_signature)
+        self.reply_type = GLib.VariantType.new(out_signature)
+
+    def pack(self, args):
+        """Pack args into a GVariant tuple, None if there are none
+
+        :raises TypeError: Wrong number or type of arguments
+        :raises ValueError: An argument is out of range
+        """
+        if len(args) != self.n_args:
+            raise TypeError('{0} takes {1} arguments ({2} given)'.format(
+                self.name, self.n_args, len(args)))
+        return self._pack(args)
@@ -0,0 +1,289 @@
+"""
+pool controls many gst-switch-srv instances at once.
+The ControllerPool holds a Controller for every server and fans remote
+method calls out to all of them concurrently, so changing the mode of N
+servers takes one round trip instead of N in series.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from collections import OrderedDict
+
+from .controller import Controller
+from .exception import ConnectionError, PoolError
+from .mainloop import MainLoopThread
+
+__all__ = ["ControllerPool", "PoolResults", ]
+
+
+class PoolResults(object):
+
+    """The outcome of a call on a ControllerPool
+
+        results - dict of server name to the value returned by the server
+        errors  - dict of server name to the exception the call raised
+    """
+
+    def __init__(self):
+        super(PoolResults, self).__init__()
+        self.results = {}
+        self.errors = {}
+
+    def succeeded(self):
+        """Test if the call succeeded on all servers"""
+        return not self.errors
+
+    def raise_errors(self):
+        """Raise a PoolError when the call failed on any server
+
+        :returns: The results
+        :raises PoolError: The call failed on at least one server
+        """
+        if self.errors:
+            raise PoolError(self.errors)
+        return self.results
+
+    def __repr__(self):
+        return 'PoolResults(results={0!r}, errors={1!r})'.format(
+            self.results, self.errors)
+
+
+class ControllerPool(object):
+
+    """Controllers for many gst-switch-srv instances sharing one
+    MainLoopThread, which makes all connections and dispatches all replies
+    and signals. Every remote method of the Controller is available on the
+    pool and is called on all servers concurrently:
+
+        pool = ControllerPool({'room1': 'tcp:host=room1,port=5000',
+                               'room2': 'tcp:host=room2,port=5000'})
+        results = pool.set_composite_mode(Controller.COMPOSITE_PIP)
+        results.raise_errors()
+
+    Calls on the pool block until all servers replied or failed, so they
+    must not be made from inside the MainLoopThread, e.g. from a signal
+    callback. Use call_async there. Servers which are not connected yet are
+    connected concurrently, each in a thread of its own, so a server which
+    cannot be reached neither stalls the other servers nor the
+    MainLoopThread.
+
+    :param addresses: dict of server name to dbus address, or a list of
+    addresses which are then used as names too
+    :param timeout: Timeout of the remote method calls in msec, see
+    Controller
+    :param main_loop_thread: The MainLoopThread to share, defaults to a
+    new one
+    :param connect_timeout: Seconds to wait for the connection to a server
+    before its call fails with ConnectionError, None waits as long as
+    connecting takes
+    """
+
+    def __init__(self, addresses, timeout=-1, main_loop_thread=None,
+                 connect_timeout=5.0):
+        super(ControllerPool, self).__init__()
+        if isinstance(addresses, dict):
+            addresses = sorted(addresses.items())
+        else:
+            addresses = [(address, address) for address in addresses]
+        if not addresses:
+            raise ValueError('At least one address is required')
+
+        self.connect_timeout = connect_timeout
+        self._own_thread = main_loop_thread is None
+        self.main_loop_thread = main_loop_thread or \
+            MainLoopThread(name='gstswitch-pool')
+        self.controllers = OrderedDict(
+            (name, Controller(address=address, timeout=timeout,
+                              threaded=self.main_loop_thread))
+            for name, address in addresses)
+
+    def __len__(self):
+        return len(self.controllers)
+
+    def __iter__(self):
+        return iter(self.controllers)
+
+    def __getitem__(self, name):
+        return self.controllers[name]
+
+    def __getattr__(self, name):
+        if name not in Controller.REMOTE_METHODS:
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            """Call the remote method on all servers, returns PoolResults"""
+            return self.call(name, *args, **kwargs)
+        method.__name__ = str(name)
+        return method
+
+    def call_async(self, method_name, args, callback, timeout=None,
+                   names=None):
+        """Call a remote method on all servers concurrently without
+        blocking. callback is called once all of them replied or failed,
+        from inside the MainLoopThread unless the last of them failed to
+        start or to connect.
+
+        :param method_name: One of Controller.REMOTE_METHODS
+        :param args: Sequence of arguments for the remote method
+        :param callback: Called as callback(results) with the PoolResults
+        :param timeout: Timeout in msec, defaults to the Controller's
+        :param names: The servers to call, defaults to all
+        :returns: None
+        """
+        if method_name not in Controller.REMOTE_METHODS:
+            raise ValueError("Unknown remote method '{0}'"
+                             .format(method_name))
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        names = list(self.controllers if names is None else names)
+        results = PoolResults()
+        lock = threading.Lock()
+        pending = [len(names)]
+
+        def finish(name, result, error):
+            """Store the outcome of one server, call back after the last"""
+            with lock:
+                if name in results.results or name in results.errors:
+                    return
+                if error is None:
+                    results.results[name] = result
+                else:
+                    results.errors[name] = error
+                pending[0] -= 1
+                last = not pending[0]
+            if last:
+                callback(results)
+
+        if not names:
+            callback(results)
+            return
+
+        for name in names:
+            def done(result, error, name=name):
+                """Reply of one server"""
+                finish(name, result, error)
+            controller = self.controllers[name]
+            if controller.is_connected():
+                self._start(controller, method_name, args, done, timeout)
+            else:
+                self._connect_and_start(controller, method_name, args, done,
+                                        timeout)
+
+    @staticmethod
+    def _start(controller, method_name, args, done, timeout):
+        """Non-public method: Start the call on one server, failing to start
+        it is its outcome"""
+        try:
+            controller.call_async(method_name, args, done, timeout)
+        except Exception as error:  # pylint: disable=broad-except
+            done(None, error)
+
+    def _connect_and_start(self, controller, method_name, args, done,
+                           timeout):
+        """Non-public method: Connect to one server in a thread of its own
+        and start the call once connected. When connect_timeout passes
+        first, the call fails and is not started anymore.
+        """
+        decided = threading.Lock()
+        timer = None
+        if self.connect_timeout is not None:
+            error = ConnectionError(
+                'No connection to {0} within {1} seconds'.format(
+                    controller.address, self.connect_timeout))
+
+            def expire():
+                """Fail the call, unless connecting finished meanwhile"""
+                if decided.acquire(False):
+                    done(None, error)
+            timer = threading.Timer(self.connect_timeout, expire)
+            timer.daemon = True
+            timer.start()
+
+        def connect():
+            """Connect, then start the call unless it expired"""
+            try:
+                controller.establish_connection()
+            except Exception as connect_error:  # pylint: disable=broad-except
+                if decided.acquire(False):
+                    done(None, connect_error)
+                return
+            finally:
+                if timer is not None:
+                    timer.cancel()
+            if decided.acquire(False):
+                self._start(controller, method_name, args, done, timeout)
+
+        worker = threading.Thread(target=connect,
+                                  name='gstswitch-pool-connect')
+        worker.daemon = True
+        worker.start()
+
+    def call(self, method_name, *args, **kwargs):
+        """Call a remote method on all servers concurrently and wait for
+        all of them, see call_async.
+
+        :param method_name: One of Controller.REMOTE_METHODS
+        :param args: Arguments for the remote method
+        :param timeout: Timeout in msec, defaults to the Controller's
+        :param names: The servers to call, defaults to all
+        :returns: PoolResults
+        :raises RuntimeError: Called from inside the MainLoopThread
+        """
+        timeout = kwargs.pop('timeout', None)
+        names = kwargs.pop('names', None)
+        if kwargs:
+            raise TypeError("Unexpected arguments {0}".format(list(kwargs)))
+        if self.main_loop_thread.is_loop_thread():
+            raise RuntimeError('ControllerPool.call would block the '
+                               'MainLoopThread, use call_async')
+
+        finished = threading.Event()
+        outcome = []
+
+        def done(results):
+            """Hand the results to the waiting thread"""
+            outcome.append(results)
+            finished.set()
+
+        self.call_async(method_name, args, done, timeout=timeout,
+                        names=names)
+        finished.wait()
+        return outcome[0]
+
+    def subscribe(self, signal_name, callback, **kwargs):
+        """Register a Callback for a Signal on all servers, see
+        Controller.subscribe. It is called from inside the MainLoopThread
+        with the name of the server followed by the signal arguments.
+
+        :param signal_name: One of Controller.SIGNALS
+        :param callback: Called as callback(name, *args)
+        :returns: list of SignalSubscription, one per server
+        """
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+
+        return [controller.subscribe(signal_name,
+                                     self._forward(name, callback), **kwargs)
+                for name, controller in self.controllers.items()]
+
+    @staticmethod
+    def _forward(name, callback):
+        """Non-public method: Wrap callback to get the server name first"""
+        def forward(*args):
+            """Prepend the name of the server"""
+            # pylint: disable=star-args
+            callback(name, *args)
+        return forward
+
+    def close(self):
+        """Close all connections and stop the MainLoopThread, unless it
+        was passed in
+
+        :returns: None
+        """
+        for controller in self.controllers.values():
+            controller.close()
+        if self._own_thread:
+            self.main_loop_thread.stop()
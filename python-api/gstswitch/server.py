@@ -6,21 +6,54 @@ These include all OS related tasks
 from __future__ import absolute_import, print_function, unicode_literals
 
 from six import string_types
+from collections import namedtuple
 import os
+import re
 import signal
 import subprocess
 from distutils import spawn
 
 from errno import ENOENT
+from .address import (check_address, free_port_address,
+                      read_listening_address, remove_stale_socket)
+from .controller import Controller
 from .exception import PathError, ServerProcessError
-from time import sleep
+from .serverlog import LogOptions
+from .supervisor import Supervisor
+from time import sleep, time
 
 
-__all__ = ["Server", ]
+__all__ = ["Server", "Isolation", ]
 
 
 TOOLS_DIR = '/'.join(os.getcwd().split('/')[:-1]) + '/tools/'
 
+# The lines the server logs once its video and audio inputs accept sources
+LISTENING_PATTERN = re.compile(
+    r'(Video|Audio|Compose|Encode) (?:input|output) is listening at port: '
+    r'(\d+)')
+
+
+class Isolation(namedtuple('Isolation', ('free_ports', 'working_dir'))):
+
+    """How a Server is kept apart from other servers on the host, see
+    Server
+
+        free_ports  - Let the server pick free ports for the video and
+                      audio inputs, its outputs and a tcp controller
+                      address. Sources, sinks and controllers learn the
+                      ports from the running server, see
+                      Server.bound_video_port, Server.bound_compose_port,
+                      Server.discover_address and
+                      helpers.TestSources.for_server
+        working_dir - Directory the server runs in, which is where it
+                      writes its recordings, None for the current one
+    """
+    __slots__ = ()
+
+    def __new__(cls, free_ports=False, working_dir=None):
+        return super(Isolation, cls).__new__(cls, free_ports, working_dir)
+
 
 class Server(object):
 
@@ -29,15 +62,31 @@ class Server(object):
     :param path: Path where the executable gst-switch-srv
     is located. Provide the full path.
     By default looks in the current $PATH.
-    :param video_port: The video port number - default = 3000
-    :param audio_port: The audio port number - default = 4000
+    :param video_port: The video port number - default = 3000,
+        0 lets the server pick a free port, see bound_video_port
+    :param audio_port: The audio port number - default = 4000,
+        0 lets the server pick a free port, see bound_audio_port
     :param controller_address: The DBus-Address for remote control -
-        default = tcp:host=0.0.0.0,port=5000
+        default = tcp:host=0.0.0.0,port=5000. Controllers on the same host
+        are faster over a unix socket, see address.local_address
     :param record_file: The record file format
     :param video_format: The video format to use on the server.
+    :param marker_rate: Maximum number of face and track marker signals
+        the server emits per second, None for no limit
+    :param log_to_file: Write the output of the server to the log file,
+        otherwise it is echoed to stdout
+    :param log_options: The log file, its rotation and the number of lines
+        kept in log, a serverlog.LogOptions
+    :param isolation: Free ports and the working directory, so that many
+        servers run on one host, an Isolation
     :returns: nothing
+
+    The output of the running server is read into log, a ServerLog. Its
+    last lines are returned by tail_log and log_records queries them.
     """
-    SLEEP_TIME = 0.5
+    POLL_INTERVAL = 0.05
+    READY_TIMEOUT = 10.0
+    KILL_TIMEOUT = 5.0
 
     def __init__(
             self,
@@ -47,7 +96,10 @@ class Server(object):
             controller_address='tcp:host=0.0.0.0,port=5000',
             record_file=False,
             video_format=None,
-            log_to_file=True):
+            log_to_file=True,
+            marker_rate=None,
+            log_options=None,
+            isolation=None):
 
         super(Server, self).__init__()
 
@@ -58,17 +110,26 @@ class Server(object):
         self._record_file = None
         self.gst_option_string = ''
 
+        self.isolation = isolation or Isolation()
         self.path = path
-        self.video_port = video_port
-        self.audio_port = audio_port
+        self.video_port = 0 if self.isolation.free_ports else video_port
+        self.audio_port = 0 if self.isolation.free_ports else audio_port
         self.controller_address = controller_address
+        if self.isolation.free_ports:
+            self.controller_address = free_port_address(controller_address)
         self.record_file = record_file
         self.video_format = video_format
+        self.marker_rate = marker_rate
 
-        self.log_to_file = log_to_file
+        self.log_options = log_options or LogOptions()
+        if not log_to_file:
+            self.log_options = self.log_options._replace(path=None)
 
         self.proc = None
         self.pid = -1
+        self.log = None
+        self._address = None
+        self._bound_ports = {}
 
     @property
     def path(self):
@@ -89,19 +150,19 @@ class Server(object):
 
     @video_port.setter
     def video_port(self, video_port):
-        """Set Video Port
+        """Set Video Port, 0 lets the server pick a free one
         :raises ValueError: Video Port cannot be left blank
-        :raises ValueError: Video Port must be in range 1 to 65535
+        :raises ValueError: Video Port must be in range 0 to 65535
         :raises TypeError: Video Port must be a string or a number
         """
-        if not video_port:
+        if not video_port and video_port != 0:
             raise ValueError("Video Port '{0}' cannot be blank"
                              .format(video_port))
         else:
             try:
                 i = int(video_port)
-                if i < 1 or i > 65535:
-                    raise ValueError('Video Port must be in range 1 to 65535')
+                if i < 0 or i > 65535:
+                    raise ValueError('Video Port must be in range 0 to 65535')
                 else:
                     self._video_port = video_port
             except TypeError:
@@ -115,19 +176,19 @@ class Server(object):
 
     @audio_port.setter
     def audio_port(self, audio_port):
-        """Set Audio Port
+        """Set Audio Port, 0 lets the server pick a free one
         :raises ValueError: Audio Port cannot be left blank
-        :raises ValueError: Audio Port must be in range 1 to 65535
+        :raises ValueError: Audio Port must be in range 0 to 65535
         :raises TypeError: Audio Port must be a string or a number
         """
-        if not audio_port:
+        if not audio_port and audio_port != 0:
             raise ValueError("Audio Port '{0}' cannot be blank"
                              .format(audio_port))
         else:
             try:
                 i = int(audio_port)
-                if i < 1 or i > 65535:
-                    raise ValueError('Audio Port must be in range 1 to 65535')
+                if i < 0 or i > 65535:
+                    raise ValueError('Audio Port must be in range 0 to 65535')
                 else:
                     self._audio_port = audio_port
             except TypeError:
@@ -143,7 +204,7 @@ class Server(object):
     def controller_address(self, controller_address):
         """Set Control Address
         :raises ValueError: Control Address cannot be left blank
-        :raises ValueError: Control Address must contain at least one Colon
+        :raises ValueError: Control Address is invalid, see check_address
         :raises TypeError: Control Address must be a string
         """
         if not controller_address:
@@ -154,13 +215,7 @@ class Server(object):
                 raise TypeError("Control Address must be a string,"
                                 " not '{0}'".format(type(controller_address)))
 
-            try:
-                controller_address.index(':')
-                self._controller_address = controller_address
-            except ValueError:
-                raise ValueError("Control Address must contain at least "
-                                 " one Colon. It is '{0}'"
-                                 .format(controller_address))
+            self._controller_address = check_address(controller_address)
 
     @property
     def record_file(self):
@@ -189,25 +244,190 @@ class Server(object):
                     raise ValueError("Record File: '{0}' "
                                      "cannot have forward slashes".format(rec))
 
-    def run(self, gst_option=''):
-        """Launch the server process
+    def run(self, gst_option='', timeout=None):
+        """Launch the server process and wait until it is ready, see
+        wait_until_ready
 
         :param: None
         :gst-option: Any gstreamer option.
         Refer to http://www.linuxmanpages.com/man1/gst-launch-0.8.1.php#lbAF.
         Multiple can be added separated by spaces
+        :param timeout: Seconds to wait for the server, defaults to
+        READY_TIMEOUT
         :returns: nothing
         :raises IOError: Fail to open /dev/null (os.devnull)
         :raises PathError: Unable to find gst-switch-srv at path specified
         :raises ServerProcessError: Running gst-switch-srv
-        gives a OS based error.
+        gives a OS based error, or the server exited or was not ready
+        within timeout. The process is stopped then.
         """
         self.gst_option_string = gst_option
         print("Starting server")
+        if remove_stale_socket(self.controller_address):
+            print("Removed stale socket of {0}"
+                  .format(self.controller_address))
+        self._address = None
+        self._bound_ports = {}
         self.proc = self._run_process()
         if self.proc:
             self.pid = self.proc.pid
-        sleep(self.SLEEP_TIME)
+        try:
+            self.wait_until_ready(timeout)
+        except Exception:
+            # leave no process behind which is not ready
+            self.stop()
+            if self.log is not None:
+                self.log.close()
+            raise
+
+    def wait_until_ready(self, timeout=None):
+        """Wait until the running server accepts video sources, audio
+        sources and controllers. The server logs a line for each of them
+        once it listens, so this returns as soon as all three are up.
+
+        :param timeout: Seconds to wait, defaults to READY_TIMEOUT
+        :returns: The address clients connect to, see discover_address
+        :raises ServerProcessError: The server is not running, exited or
+        is not ready after timeout
+        """
+        def ready(log):
+            """Get the address once all inputs listen, too"""
+            ports = dict((kind, int(port)) for kind, port in
+                         LISTENING_PATTERN.findall(log))
+            if not set(('Video', 'Audio')) <= set(ports):
+                return None
+            self._bound_ports.update(ports)
+            return read_listening_address(log)
+
+        return self._wait_for_log(ready, timeout, 'ready')
+
+    def discover_address(self, timeout=5.0):
+        """Get the address clients connect to, as reported by the
+        running server. It differs from controller_address when the
+        server picks it, e.g. for unix:tmpdir=
+
+        :param timeout: Seconds to wait for the server to listen
+        :returns: The address
+        :raises ServerProcessError: The server is not running, exited or
+        is not listening after timeout
+        """
+        if self._address is None:
+            # kept, the line leaves the ring buffer of a long running server
+            self._address = self._wait_for_log(read_listening_address,
+                                               timeout, 'listening')
+        return self._address
+
+    @property
+    def bound_video_port(self):
+        """The port the running server accepts video sources on, as it
+        reported. It differs from video_port when that is 0.
+
+        :raises ServerProcessError: The server is not running, exited or
+        is not listening after READY_TIMEOUT
+        """
+        return self._bound_port('Video')
+
+    @property
+    def bound_audio_port(self):
+        """The port the running server accepts audio sources on, as it
+        reported. It differs from audio_port when that is 0.
+
+        :raises ServerProcessError: The server is not running, exited or
+        is not listening after READY_TIMEOUT
+        """
+        return self._bound_port('Audio')
+
+    @property
+    def bound_compose_port(self):
+        """The port the running server serves the composite video on, as
+        it reported. The server picks it when video_port is 0.
+
+        :raises ServerProcessError: The server is not running, exited or
+        is not listening after READY_TIMEOUT
+        """
+        return self._bound_port('Compose')
+
+    @property
+    def bound_encode_port(self):
+        """The port the running server serves the encoded composite video
+        on, as it reported. The server picks it when video_port is 0.
+
+        :raises ServerProcessError: The server is not running, exited or
+        is not listening after READY_TIMEOUT
+        """
+        return self._bound_port('Encode')
+
+    def _bound_port(self, kind):
+        """Non-public method: Get the port the server reported for the
+        inputs or outputs of kind, 'Video', 'Audio', 'Compose' or
+        'Encode'"""
+        if kind not in self._bound_ports:
+            def find(log):
+                """Get the last port reported for kind"""
+                ports = [int(port) for found, port in
+                         LISTENING_PATTERN.findall(log)
+                         if found == kind]
+                return ports[-1] if ports else None
+
+            self._bound_ports[kind] = self._wait_for_log(
+                find, None, 'listening on the {0} port'.format(kind.lower()))
+        return self._bound_ports[kind]
+
+    def _wait_for_log(self, find, timeout, state):
+        """Non-public method: Poll the log of the server until find
+        returns something for it
+
+        :param find: Called with the text logged so far, returns None
+        until the awaited line was logged
+        :param timeout: Seconds to wait, None for READY_TIMEOUT
+        :param state: What is waited for, for the errors
+        :returns: The value returned by find
+        """
+        if self.proc is None or self.log is None:
+            raise ServerProcessError('Server is not running')
+        if timeout is None:
+            timeout = self.READY_TIMEOUT
+        deadline = time() + timeout
+        seen = 0
+        while True:
+            found = find(self.log.text())
+            if found:
+                return found
+            code = self.proc.poll()
+            if code is not None:
+                raise ServerProcessError("Server exited with code {0} "
+                                         "before it was {1}"
+                                         .format(code, state))
+            remaining = deadline - time()
+            if remaining <= 0:
+                raise ServerProcessError("Server is not {0} after {1} "
+                                         "seconds".format(state, timeout))
+            if self.log.closed:
+                # the output ended, the process is about to exit
+                sleep(self.POLL_INTERVAL)
+            else:
+                seen = self.log.wait(seen, min(remaining, self.POLL_INTERVAL))
+
+    def controller(self, **kwargs):
+        """Create a Controller connecting to the discovered address of
+        the running server, see discover_address
+
+        :param kwargs: Further arguments for the Controller
+        :returns: The Controller, not yet connected
+        """
+        return Controller(address=self.discover_address(), **kwargs)
+
+    def supervise(self, **kwargs):
+        """Run the server unless it is running and restart it whenever it
+        crashes or hangs, see Supervisor
+
+        :param kwargs: Further arguments for the Supervisor
+        :returns: The started Supervisor, stop it instead of terminating
+        the server
+        """
+        supervisor = Supervisor(self, **kwargs)
+        supervisor.start()
+        return supervisor
 
     def _run_process(self):
         """Non-public method: Runs the gst-switch-srv process
@@ -237,34 +457,40 @@ class Server(object):
 
         if self.video_format is not None:
             cmd.append("--video-format={0}".format(self.video_format))
+        if self.marker_rate is not None:
+            cmd.append("--marker-rate={0}".format(self.marker_rate))
 
         proc = self._start_process(cmd)
         return proc
 
     def _start_process(self, cmd):
-        """Non-public method: Start a process
+        """Non-public method: Start a process, its output is read into
+        a new log
 
         :param cmd: The command which needs to be executed
         :returns: process created
         """
         print('Creating process %s' % (cmd))
+        if self.log is not None:
+            self.log.close()
+        self.log = self.log_options.open()
         try:
-            if self.log_to_file:
-                with open('server.log', 'w') as tempf:
-                    return self._start_process_log_file(cmd, tempf, tempf)
-            else:
-                from sys import stdout, stderr
-                return self._start_process_log_file(cmd, stdout, stderr)
+            process = self._start_process_log_file(
+                cmd, subprocess.PIPE, subprocess.STDOUT,
+                self.isolation.working_dir)
         except OSError as error:
+            self.log.close()
             if error.errno == ENOENT:
                 raise PathError("Cannot find gst-switch-srv at path:"
                                 " '{0}'".format(self.path))
             else:
                 raise ServerProcessError("Internal error "
                                          "while launching process")
+        self.log.start(process.stdout)
+        return process
 
     @staticmethod
-    def _start_process_log_file(cmd, stdout_file, stderr_file):
+    def _start_process_log_file(cmd, stdout_file, stderr_file, cwd=None):
         """
         Start a process with the specified file like objects.
         """
@@ -273,7 +499,8 @@ class Server(object):
             stdout=stdout_file,
             stderr=stderr_file,
             bufsize=-1,
-            shell=False)
+            shell=False,
+            cwd=cwd)
         print(cmd)
         return process
 
@@ -292,6 +519,35 @@ class Server(object):
             out, _ = proc.communicate()
             print(out)
 
+    def stop(self, timeout=None):
+        """Terminate the server process and wait until it exited, killing
+        it if it does not exit within timeout. Unlike terminate, the
+        process is reaped and there need not be one.
+        self.proc is made None
+
+        :param timeout: Seconds to wait before killing, defaults to
+        KILL_TIMEOUT
+        :returns: The return code of the process, None if there was none
+        """
+        proc = self.proc
+        self.proc = None
+        if proc is None:
+            return None
+        if timeout is None:
+            timeout = self.KILL_TIMEOUT
+        try:
+            if proc.poll() is None:
+                proc.terminate()
+                deadline = time() + timeout
+                while proc.poll() is None and time() < deadline:
+                    sleep(self.POLL_INTERVAL)
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+        except OSError:
+            pass
+        return proc.poll()
+
     def terminate(self, cov=False):
         """Terminate the server.
         self.proc is made None on success
@@ -320,7 +576,8 @@ class Server(object):
 
     def terminate_and_output_status(self, cov=False):
         """Test is a closed Server-Processed died because of a SEGMENTATION
-        FAULT and print its Log if it did
+        FAULT and print its Log if it did. Only the lines kept in log are
+        printed, see log_options.
         """
 
         if self.proc:
@@ -330,8 +587,31 @@ class Server(object):
             print("ERROR CODE - {0}".format(poll))
 
             self.terminate(cov)
-            with open('server.log') as log:
-                print(log.read())
+            print('\n'.join(self.tail_log(None)))
+
+    def tail_log(self, count=10):
+        """The last lines the server wrote, see ServerLog.tail
+
+        :param count: Number of lines, None for all kept
+        :returns: List of str, empty if the server was never run
+        """
+        if self.log is None:
+            return []
+        return self.log.tail(count)
+
+    def log_records(self, level=None, pattern=None, since=None):
+        """Query the lines the server wrote, see ServerLog.records
+
+        :param level: Only lines of this level and the ones above, one of
+        serverlog.LEVELS
+        :param pattern: Only lines whose message matches this regular
+        expression
+        :param since: Only lines read at or after this time.time()
+        :returns: List of LogRecord, empty if the server was never run
+        """
+        if self.log is None:
+            return []
+        return self.log.records(level, pattern, since)
 
     def kill(self, cov=False):
         """Kill the server process by sending signal.SIGKILL
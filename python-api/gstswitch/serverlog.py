@@ -0,0 +1,237 @@
+"""
+serverlog captures the output of gst-switch-srv. A thread reads it as it
+is written into a bounded ring buffer, so a long running server does not
+fill the memory, and optionally into a log file which is rotated once it
+reaches a size. The INFO, WARN and ERROR lines of the server are parsed
+into LogRecords, which can be queried without reading a file.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import logging
+import re
+import sys
+import threading
+from collections import deque, namedtuple
+from logging.handlers import RotatingFileHandler
+from time import time
+
+__all__ = ["LogOptions", "LogRecord", "ServerLog", "parse_line", "LEVELS", ]
+
+# The levels of the server's log lines, see logutils.h
+LEVELS = ('INFO', 'WARN', 'ERROR')
+
+# <LOG_PREFIX>/<file>:<line>:<level>: <message>
+LINE_PATTERN = re.compile(
+    r'^(?P<source>\S+?):(?P<line>\d+):(?P<level>info|warning|error):'
+    r' ?(?P<message>.*)$')
+
+_LEVEL_NAMES = {'info': 'INFO', 'warning': 'WARN', 'error': 'ERROR'}
+
+
+class LogRecord(namedtuple('LogRecord', ('time', 'level', 'source', 'line',
+                                         'message', 'text'))):
+
+    """A line of output of the server
+
+        time    - time.time() when the line was read
+        level   - One of LEVELS, None for other output
+        source  - The source file which logged the line, or None
+        line    - The line in the source file, or None
+        message - The line without the prefix
+        text    - The whole line
+    """
+    __slots__ = ()
+
+
+class LogOptions(namedtuple('LogOptions', ('path', 'size', 'max_bytes',
+                                           'backups'))):
+
+    """How a Server logs its output, see Server
+
+        path      - Path of the log file, give every Server in a directory
+                    a file of its own. None echoes the output to stdout.
+        size      - Number of lines of output kept in memory
+        max_bytes - Rotate the log file once it reaches this size,
+                    0 never rotates
+        backups   - Number of rotated log files kept
+    """
+    __slots__ = ()
+
+    def __new__(cls, path='server.log', size=1000, max_bytes=0, backups=0):
+        return super(LogOptions, cls).__new__(cls, path, size, max_bytes,
+                                              backups)
+
+    def open(self):
+        """Start a new ServerLog with these options
+
+        :returns: ServerLog
+        """
+        return ServerLog(maxlen=self.size, path=self.path,
+                         max_bytes=self.max_bytes, backups=self.backups,
+                         echo=sys.stdout if self.path is None else None)
+
+
+def parse_line(text, timestamp=None):
+    """Parse a line of output of the server
+
+    :param text: The line without the line break
+    :param timestamp: The time the line was read, defaults to now
+    :returns: LogRecord
+    """
+    if timestamp is None:
+        timestamp = time()
+    match = LINE_PATTERN.match(text)
+    if match is None:
+        return LogRecord(timestamp, None, None, None, text, text)
+    return LogRecord(timestamp, _LEVEL_NAMES[match.group('level')],
+                     match.group('source'), int(match.group('line')),
+                     match.group('message'), text)
+
+
+class ServerLog(object):
+
+    """Ring buffer of the output of a server, see Server.log
+
+    :param stream: Binary file object to read, see start. None to start
+    reading later, or to only take lines passed to append.
+    :param maxlen: Number of lines kept
+    :param path: Also write every line to this file, None for no file
+    :param max_bytes: Rotate the file once it reaches this size,
+    0 never rotates
+    :param backups: Number of rotated files kept, as path.1, path.2, ...
+    :param echo: Also write every line to this text stream, e.g.
+    sys.stdout
+    """
+
+    def __init__(self, stream=None, maxlen=1000, path=None, max_bytes=0,
+                 backups=0, echo=None):
+        super(ServerLog, self).__init__()
+        if maxlen < 1:
+            raise ValueError('maxlen must be at least 1')
+        self.maxlen = maxlen
+        self.path = path
+        self.echo = echo
+        self.count = 0
+        self.closed = False
+        self._records = deque(maxlen=maxlen)
+        self._condition = threading.Condition()
+        self._file = None
+        if path is not None:
+            # start with an empty file, the handler appends when rotating
+            open(path, 'w').close()
+            self._file = RotatingFileHandler(path, maxBytes=max_bytes,
+                                             backupCount=backups)
+        self._thread = None
+        if stream is not None:
+            self.start(stream)
+
+    def start(self, stream):
+        """Read stream from a thread of its own until its end
+
+        :param stream: Binary file object, e.g. the stdout pipe of the
+        server
+        :returns: Nothing
+        :raises RuntimeError: Already reading a stream
+        """
+        if self._thread is not None:
+            raise RuntimeError('ServerLog is already reading')
+        self._thread = threading.Thread(target=self._run, args=(stream,),
+                                        name='gstswitch-server-log')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, stream):
+        """Non-public method: Body of the reading thread"""
+        try:
+            for raw in iter(stream.readline, b''):
+                self.append(raw.decode('utf-8', 'replace').rstrip('\r\n'))
+        finally:
+            stream.close()
+            self.close()
+
+    def append(self, text):
+        """Add a line, called by the reading thread for every line. Lines
+        are ignored once the log is closed.
+
+        :param text: The line without the line break
+        :returns: The LogRecord
+        """
+        record = parse_line(text)
+        with self._condition:
+            if self.closed:
+                return record
+            self._records.append(record)
+            self.count += 1
+            self._condition.notify_all()
+            if self._file is not None:
+                self._file.handle(logging.makeLogRecord({'msg': text}))
+        if self.echo is not None:
+            print(text, file=self.echo)
+        return record
+
+    def tail(self, count=10):
+        """The last lines
+
+        :param count: Number of lines, None for all kept
+        :returns: List of str
+        """
+        with self._condition:
+            records = list(self._records)
+        if count is not None:
+            records = records[-count:] if count > 0 else []
+        return [record.text for record in records]
+
+    def text(self):
+        """All lines kept, joined by line breaks"""
+        return '\n'.join(self.tail(None))
+
+    def records(self, level=None, pattern=None, since=None):
+        """Query the lines kept
+
+        :param level: Only lines of this level and the ones above, one of
+        LEVELS, None for all lines including unparsed output
+        :param pattern: Only lines whose message matches this regular
+        expression
+        :param since: Only lines read at or after this time.time()
+        :returns: List of LogRecord, oldest first
+        :raises ValueError: Unknown level
+        """
+        if level is not None and level not in LEVELS:
+            raise ValueError("level must be one of {0}, not '{1}'"
+                             .format(LEVELS, level))
+        levels = LEVELS[LEVELS.index(level):] if level else None
+        if pattern is not None:
+            pattern = re.compile(pattern)
+        with self._condition:
+            records = list(self._records)
+        return [record for record in records
+                if (levels is None or record.level in levels) and
+                (since is None or record.time >= since) and
+                (pattern is None or pattern.search(record.message))]
+
+    def wait(self, count, timeout=None):
+        """Wait until more than count lines were read in total or the
+        stream ended
+
+        :param count: The number of lines already seen, see count
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: The number of lines read in total
+        """
+        with self._condition:
+            if self.count <= count and not self.closed:
+                self._condition.wait(timeout)
+            return self.count
+
+    def close(self):
+        """Stop taking lines and close the log file
+
+        :returns: Nothing
+        """
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        if self._file is not None:
+            self._file.close()
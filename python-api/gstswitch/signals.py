@@ -0,0 +1,295 @@
+"""
+signals dispatches the dbus signals of the gst-switch-srv to the callbacks
+registered for them. Only signals somebody listens to are subscribed on the
+connection, so GDBus drops all others before they reach Python.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from gi.repository import GLib
+
+__all__ = ["CoalescedCallback", "DecodingCallback", "SignalDispatcher",
+           "SignalSubscription", ]
+
+
+class CoalescedCallback(object):
+
+    """Callback wrapper which calls callback at most max_rate times per
+    second. Signals arriving faster are coalesced: the latest one replaces
+    the pending one and is delivered once the interval has passed, so a
+    slow consumer never falls behind the server.
+
+    The pending signal is delivered by a timeout on the GLib MainContext
+    which dispatched the signal.
+
+    With delta, the first argument of the signal must be an array of
+    tuples, like the faces of show_face_marker. The callback is then
+    called with two lists, the tuples added and the tuples removed since
+    the last call, and not at all while the array does not change.
+
+    :param callback: The callback to call
+    :param max_rate: Maximum number of calls per second, None for no limit
+    :param delta: Call callback with the changes of the first argument
+    :raises ValueError: max_rate is not a positive number
+    """
+
+    def __init__(self, callback, max_rate=None, delta=False):
+        super(CoalescedCallback, self).__init__()
+        if max_rate is not None and not max_rate > 0:
+            raise ValueError('max_rate must be a positive number')
+        self.callback = callback
+        self.max_rate = max_rate
+        self.delta = delta
+        # microseconds, like GLib.get_monotonic_time
+        self.interval = int(1000000 / max_rate) if max_rate else 0
+        self._lock = threading.Lock()
+        self._last_call = None
+        self._pending = None
+        self._source = None
+        self._previous = frozenset()
+
+    def __call__(self, *args):
+        if self.interval:
+            with self._lock:
+                now = GLib.get_monotonic_time()
+                wait = 0
+                if self._last_call is not None:
+                    wait = self._last_call + self.interval - now
+                if wait > 0 or self._source is not None:
+                    self._pending = args
+                    if self._source is None:
+                        self._schedule(wait)
+                    return
+                self._last_call = now
+        self._deliver(args)
+
+    def _schedule(self, wait):
+        """Non-public method: Deliver the pending signal in wait usec"""
+        source = GLib.timeout_source_new(max(wait, 0) // 1000 + 1)
+        source.set_callback(self._flush)
+        source.attach(GLib.MainContext.ref_thread_default())
+        self._source = source
+
+    def _flush(self, *_):
+        """Non-public method: Timeout delivering the pending signal"""
+        with self._lock:
+            args = self._pending
+            self._pending = None
+            self._source = None
+            self._last_call = GLib.get_monotonic_time()
+        if args is not None:
+            self._deliver(args)
+        return False
+
+    def _deliver(self, args):
+        """Non-public method: Call callback with args or their delta"""
+        if self.delta:
+            current = frozenset(tuple(item) for item in args[0])
+            added = sorted(current - self._previous)
+            removed = sorted(self._previous - current)
+            self._previous = current
+            if not added and not removed:
+                return
+            args = (added, removed)
+
+        # pylint: disable=star-args
+        self.callback(*args)
+
+    def cancel(self):
+        """Drop the pending signal, if any
+        :returns: Nothing
+        """
+        with self._lock:
+            if self._source is not None:
+                self._source.destroy()
+            self._source = None
+            self._pending = None
+
+
+class DecodingCallback(object):
+
+    """Callback wrapper which gets the arguments of the signal from decode
+    instead of unpacking its GVariant parameters to Python objects, e.g.
+    to turn large arrays into an array('i') in one step.
+
+    :param callback: The callback to call, or a CoalescedCallback
+    :param decode: Called as decode(parameters) with the GVariant tuple
+    of the signal, returns the tuple of arguments for callback
+    """
+
+    def __init__(self, callback, decode):
+        super(DecodingCallback, self).__init__()
+        self.callback = callback
+        self.decode = decode
+
+    def __call__(self, *args):
+        # pylint: disable=star-args
+        self.callback(*args)
+
+    def cancel(self):
+        """Cancel the wrapped callback, if it can be"""
+        cancel = getattr(self.callback, 'cancel', None)
+        if cancel is not None:
+            cancel()
+
+
+class SignalSubscription(object):
+
+    """Handle of a callback registered with SignalDispatcher.subscribe,
+    which can be used to remove the callback again.
+
+    :param dispatcher: The SignalDispatcher the callback is registered on
+    :param signal_name: The name of the signal
+    :param callback: The registered callback
+    """
+    __slots__ = ('dispatcher', 'signal_name', 'callback')
+
+    def __init__(self, dispatcher, signal_name, callback):
+        self.dispatcher = dispatcher
+        self.signal_name = signal_name
+        self.callback = callback
+
+    def unsubscribe(self):
+        """Remove the callback, see SignalDispatcher.unsubscribe"""
+        return self.dispatcher.unsubscribe(self)
+
+
+class SignalDispatcher(object):
+
+    """Dispatch table from signal names to lists of callbacks.
+    While bound to a Connection, one subscription per signal name with at
+    least one callback is held on it.
+
+    The connection to the gst-switch-srv is peer-to-peer, so there is no
+    bus daemon to install match rules on and the server still sends every
+    signal; the per-signal subscriptions make GDBus discard unwanted
+    signals without calling into Python.
+
+    :param signal_names: The names of all signals which can be subscribed
+    :param serialize: Called as serialize(function, *args) to apply every
+    change of the subscriptions, e.g. to run it under a lock or inside a
+    MainLoopThread. By default function is called directly.
+    """
+
+    def __init__(self, signal_names, serialize=None):
+        super(SignalDispatcher, self).__init__()
+        self.callbacks = dict((name, []) for name in signal_names)
+        self._connection = None
+        self._handler = None
+        self._serialize = serialize or (lambda function, *args:
+                                        function(*args))
+
+    def bind(self, connection, handler):
+        """Subscribe all signals with callbacks on connection
+
+        :param connection: The Connection to subscribe on
+        :param handler: The signal_handler passed to
+        Connection.signal_subscribe, which calls dispatch
+        :returns: Nothing
+        """
+        self._connection = connection
+        self._handler = handler
+        for signal_name, callbacks in self.callbacks.items():
+            if callbacks:
+                connection.signal_subscribe(handler, member=signal_name)
+
+    def unbind(self):
+        """Forget the Connection, its subscriptions end when it is closed
+
+        :returns: Nothing
+        """
+        self._connection = None
+        self._handler = None
+
+    def subscribe(self, signal_name, callback, max_rate=None, delta=False,
+                  decode=None):
+        """Register callback for the signal signal_name
+
+        :param signal_name: The name of the signal
+        :param callback: Called with the arguments of every signal
+        :param max_rate: Call callback at most max_rate times per second,
+        see CoalescedCallback
+        :param delta: Call callback with the changes of the first
+        argument, see CoalescedCallback
+        :param decode: Get the arguments from decode(parameters) instead
+        of unpacking them, see DecodingCallback
+        :returns: SignalSubscription
+        :raises ValueError: Unknown signal, callback not callable or delta
+        together with decode
+        """
+        if signal_name not in self.callbacks:
+            raise ValueError("Unknown signal '{0}'".format(signal_name))
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+        if delta and decode is not None:
+            raise ValueError('delta compares unpacked tuples and can not '
+                             'be combined with decode')
+        if max_rate is not None or delta:
+            callback = CoalescedCallback(callback, max_rate, delta)
+        if decode is not None:
+            callback = DecodingCallback(callback, decode)
+        return self._serialize(self._subscribe, signal_name, callback)
+
+    def _subscribe(self, signal_name, callback):
+        """Non-public method: Register the validated callback"""
+        callbacks = self.callbacks[signal_name]
+        callbacks.append(callback)
+        if len(callbacks) == 1 and self._connection is not None:
+            self._connection.signal_subscribe(self._handler,
+                                              member=signal_name)
+        return SignalSubscription(self, signal_name, callback)
+
+    def unsubscribe(self, subscription):
+        """Remove a callback registered with subscribe. When it was the last
+        callback of its signal, the signal is unsubscribed on the connection
+
+        :param subscription: The SignalSubscription returned by subscribe
+        :returns: True if the callback was registered
+        """
+        return self._serialize(self._unsubscribe, subscription)
+
+    def _unsubscribe(self, subscription):
+        """Non-public method: Remove the callback of subscription"""
+        callbacks = self.callbacks[subscription.signal_name]
+        try:
+            callbacks.remove(subscription.callback)
+        except ValueError:
+            return False
+        if isinstance(subscription.callback,
+                      (CoalescedCallback, DecodingCallback)):
+            subscription.callback.cancel()
+        if not callbacks and self._connection is not None:
+            self._connection.signal_unsubscribe(
+                member=subscription.signal_name)
+        return True
+
+    def dispatch(self, signal_name, parameters):
+        """Call all callbacks of signal_name with the unpacked parameters.
+        The parameters are only unpacked when there is a callback which
+        does not decode them itself.
+
+        :param signal_name: The name of the signal
+        :param parameters: GVariant tuple of the signal arguments
+        :returns: Nothing
+        """
+        callbacks = self.callbacks.get(signal_name)
+        if not callbacks:
+            return
+
+        unpack = None
+        for callback in tuple(callbacks):
+            if isinstance(callback, DecodingCallback):
+                # pylint: disable=star-args
+                callback(*callback.decode(parameters))
+                continue
+            if unpack is None:
+                unpack = parameters.unpack()
+            # We're passing the values unpacked from the GVariant as-is
+            # to the callback. The auther of the callback is responsible
+            # to make sure that it's arguments match with the DBus Signal
+            # Specification for the particular Signal he's subscribing for
+            # Disable pylint-warning because we know what we're doing here.
+
+            # pylint: disable=star-args
+            callback(*unpack)
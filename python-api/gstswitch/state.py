@@ -0,0 +1,299 @@
+"""
+state describes the state of the gst-switch-srv.
+ServerState is a snapshot as returned by Controller.get_state, the
+ControllerState fetches such a snapshot once and afterwards follows the
+signals of the server, so reading it does not need a round trip over dbus.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from collections import namedtuple
+
+__all__ = ["PreviewPort", "ServerState", "ControllerState", ]
+
+
+class PreviewPort(namedtuple('PreviewPort', ('port', 'serve', 'type'))):
+
+    """A preview port of the gst-switch-srv
+
+        port  - The TCP-Port on the Server where the Preview-Stream
+                can be obtained from
+        serve - Type of Material served, one of Controller.SERVE_*
+        type  - Type of Branch serving the Video
+    """
+    __slots__ = ()
+
+
+class ServerState(object):
+
+    """Snapshot of the state of the gst-switch-srv, see Controller.get_state.
+    Values the server did not report are None.
+
+        compose_port       - The compose port number
+        encode_port        - The encode port number
+        audio_port         - The audio port number
+        preview_ports      - List of PreviewPort
+        composite_mode     - The current composite mode
+        pip                - Tuple (x, y, width, height) of the PIP
+        channel_a          - The port shown on video channel A
+        channel_b          - The port shown on video channel B
+        inputs             - Number of connected video and audio sources
+        output_clients     - Number of clients of the encode port
+        controller_clients - Number of clients connected over dbus
+        record_filename    - The file being recorded to, '' if none
+        transition_request - The id of the set_composite_mode request
+                             whose mode is not rendered yet, 0 if none
+    """
+
+    FIELDS = (
+        'compose_port', 'encode_port', 'audio_port', 'preview_ports',
+        'composite_mode', 'pip', 'channel_a', 'channel_b', 'inputs',
+        'output_clients', 'controller_clients', 'record_filename',
+        'transition_request',
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, **kwargs):
+        super(ServerState, self).__init__()
+        for name in self.FIELDS:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError("Unexpected arguments {0}".format(list(kwargs)))
+
+    @classmethod
+    def from_dict(cls, values):
+        """Build a ServerState from the dict returned by get_state.
+        Keys which are not known are ignored.
+
+        :param values: dict of the unpacked a{sv}
+        :returns: ServerState
+        """
+        kwargs = dict((name, values[name])
+                      for name in cls.FIELDS if name in values)
+        if kwargs.get('preview_ports') is not None:
+            kwargs['preview_ports'] = [PreviewPort._make(tupl)
+                                       for tupl in kwargs['preview_ports']]
+        if kwargs.get('pip') is not None:
+            kwargs['pip'] = tuple(kwargs['pip'])
+        return cls(**kwargs)
+
+    def as_dict(self):
+        """Get the values as dict"""
+        return dict((name, getattr(self, name)) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, ServerState):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ServerState({0})'.format(', '.join(
+            '{0}={1!r}'.format(name, getattr(self, name))
+            for name in self.FIELDS))
+
+
+class ControllerState(object):
+
+    """Cached view on the state of the gst-switch-srv, kept up to date by
+    the preview_port_added, preview_port_removed, new_mode_online and
+    switch_completed signals. Create it through
+    Controller.enable_state_cache().
+
+    All values are fetched with a single get_state call on first access
+    and again after the cache was invalidated, which the Controller does
+    whenever it reconnects. The audio port is fetched again after an
+    audio source connected or disconnected, the server may have routed
+    another one to the audio channel then.
+    Signals are dispatched by the GLib MainContext which was the
+    thread-default one when the connection was established, so a GLib
+    MainLoop must be running there for the cache to follow the server.
+
+    :param controller: The Controller used to fetch the state
+    """
+
+    # Number of times refresh fetches while signals change the cache
+    FETCH_ATTEMPTS = 3
+
+    def __init__(self, controller):
+        super(ControllerState, self).__init__()
+        self._controller = controller
+        self._lock = threading.RLock()
+        self._values = None
+        self._generation = 0
+        self._subscriptions = []
+
+    def attach(self):
+        """Register the signal callbacks on the Controller
+
+        :returns: Nothing
+        """
+        with self._lock:
+            if self._subscriptions:
+                return
+            controller = self._controller
+            self._subscriptions = [
+                controller.on_preview_port_added(self.cb_preview_port_added),
+                controller.on_preview_port_removed(
+                    self.cb_preview_port_removed),
+                controller.on_new_mode_online(self.cb_new_mode_online),
+                controller.on_switch_completed(self.cb_switch_completed),
+            ]
+
+    def detach(self):
+        """Remove the signal callbacks from the Controller and drop the
+        cached values
+
+        :returns: Nothing
+        """
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.unsubscribe()
+            self._subscriptions = []
+            self._values = None
+            self._generation += 1
+
+    def is_valid(self):
+        """Test if the cached values can be used without fetching them"""
+        return self._values is not None
+
+    def invalidate(self):
+        """Drop the cached values, they are fetched again on next access
+
+        :returns: Nothing
+        """
+        with self._lock:
+            self._values = None
+            self._generation += 1
+
+    def refresh(self, timeout=None, cancellable=None):
+        """Fetch all values from the gst-switch-srv
+
+        :param timeout: Timeout in msec, defaults to Controller.timeout
+        :param cancellable: Gio.Cancellable to abort the call
+        :returns: Nothing
+        """
+        self._fetch(timeout, cancellable)
+
+    def _fetch(self, timeout=None, cancellable=None):
+        """Non-public method: Fetch all values without holding the lock
+        during the call. When a signal changed the cache meanwhile, the
+        snapshot may be older than it, so it is fetched again.
+
+        :returns: dict of the new values
+        """
+        for _ in range(self.FETCH_ATTEMPTS):
+            with self._lock:
+                generation = self._generation
+            state = self._controller.get_state(timeout=timeout,
+                                               cancellable=cancellable)
+            values = {
+                'compose_port': state.compose_port,
+                'encode_port': state.encode_port,
+                'audio_port': state.audio_port,
+                'preview_port_info': list(state.preview_ports or []),
+                'composite_mode': state.composite_mode,
+            }
+            with self._lock:
+                if self._generation == generation:
+                    break
+        with self._lock:
+            self._values = values
+            self._generation += 1
+        return values
+
+    def _get(self, name):
+        """Non-public method: Get a cached value, fetching all of them
+        if the cache is not valid or the value is not known
+        """
+        with self._lock:
+            values = self._values
+        if values is None or name not in values:
+            values = self._fetch()
+        return values[name]
+
+    @property
+    def compose_port(self):
+        """The compose port number"""
+        return self._get('compose_port')
+
+    @property
+    def encode_port(self):
+        """The encode port number"""
+        return self._get('encode_port')
+
+    @property
+    def audio_port(self):
+        """The audio port number"""
+        return self._get('audio_port')
+
+    @property
+    def composite_mode(self):
+        """The current composite mode"""
+        return self._get('composite_mode')
+
+    @property
+    def preview_port_info(self):
+        """List of PreviewPort for all preview ports"""
+        return list(self._get('preview_port_info'))
+
+    @property
+    def preview_ports(self):
+        """List of all preview port numbers"""
+        return [info.port for info in self._get('preview_port_info')]
+
+    def cb_preview_port_added(self, port, serve, type_):
+        """Callback of the preview_port_added signal"""
+        with self._lock:
+            self._generation += 1
+            if self._values is None:
+                return
+            infos = [info for info in self._values['preview_port_info']
+                     if info.port != port]
+            infos.append(PreviewPort(port, serve, type_))
+            self._values['preview_port_info'] = infos
+            self._forget_audio_port(serve)
+
+    def cb_preview_port_removed(self, port, serve, type_):
+        """Callback of the preview_port_removed signal"""
+        # pylint: disable=unused-argument
+        with self._lock:
+            self._generation += 1
+            if self._values is None:
+                return
+            self._values['preview_port_info'] = [
+                info for info in self._values['preview_port_info']
+                if info.port != port]
+            self._forget_audio_port(serve)
+
+    def cb_new_mode_online(self, mode):
+        """Callback of the new_mode_online signal"""
+        with self._lock:
+            self._generation += 1
+            if self._values is None:
+                return
+            self._values['composite_mode'] = mode
+
+    def cb_switch_completed(self, request, channel, port, start, end, ok):
+        """Callback of the switch_completed signal, an audio switch
+        changes the audio port"""
+        # pylint: disable=unused-argument
+        if channel != self._controller.AUDIO_CHANNEL or not ok:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._values is None:
+                return
+            self._values['audio_port'] = port
+
+    def _forget_audio_port(self, serve):
+        """Non-public method: Fetch the audio port again on next access
+        after an audio source connected or disconnected, the caller must
+        be holding the lock"""
+        if serve == self._controller.SERVE_AUDIO_STREAM:
+            self._values.pop('audio_port', None)
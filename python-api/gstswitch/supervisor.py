@@ -0,0 +1,275 @@
+"""
+supervisor keeps a gst-switch-srv running. The Supervisor watches the
+server process and probes it with a cheap remote call. When the process
+exited or stopped answering, it is restarted with an exponential backoff
+and every restart is reported with its timing, so clients can reconnect
+and the time to recover can be monitored.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import threading
+from collections import deque, namedtuple
+from time import time
+
+from .exception import (ConnectionError, ConnectionReturnError, PathError,
+                        ServerProcessError)
+
+__all__ = ["Supervisor", "RestartEvent", ]
+
+
+class RestartEvent(namedtuple('RestartEvent', (
+        'reason', 'exit_code', 'attempt', 'failed_at', 'started_at',
+        'ready_at', 'address', 'error'))):
+
+    """A restart of a supervised server
+
+        reason     - 'exited' or 'unresponsive'
+        exit_code  - The return code of the exited process, None if it
+                     was unresponsive
+        attempt    - Number of restarts since the server was last healthy,
+                     counting from 1
+        failed_at  - time.time() the failure was detected
+        started_at - time.time() the new process was started
+        ready_at   - time.time() the new process was ready, None if the
+                     restart failed
+        address    - The address clients connect to, None if the restart
+                     failed
+        error      - The exception of a failed restart, otherwise None
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """True if the server is running again"""
+        return self.ready_at is not None
+
+    @property
+    def downtime(self):
+        """Seconds from detecting the failure until the server was ready
+        again, None if the restart failed"""
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.failed_at
+
+    @property
+    def startup(self):
+        """Seconds the new process took to get ready, None if the restart
+        failed"""
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.started_at
+
+
+class Supervisor(object):
+
+    """Keep a Server running from a thread of its own:
+
+        supervisor = Supervisor(Server(path=PATH))
+        supervisor.on_restart(lambda event: print(event.downtime))
+        supervisor.start()
+        ...
+        supervisor.stop()
+
+    Every interval seconds the process is polled for its exit and the
+    server is probed. A server which exited, or failed max_failures
+    probes in a row, is stopped and run again. The first restart is
+    immediate, every further one before the server is healthy again waits
+    twice as long, starting at backoff and at most backoff_max seconds.
+
+    :param server: The Server to supervise
+    :param interval: Seconds between two checks
+    :param probe: Called with the Server, returns True if it is healthy.
+    Defaults to get_compose_port on a Controller connected to it.
+    :param probe_timeout: Timeout of the default probe in msec
+    :param max_failures: Number of failed probes in a row after which
+    the server is considered unresponsive
+    :param backoff: Seconds to wait before the second restart
+    :param backoff_max: Seconds to wait between restarts at most
+    :param history: Number of RestartEvents kept in events
+    """
+
+    KILL_TIMEOUT = 5.0
+
+    def __init__(self, server, interval=1.0, probe=None, probe_timeout=1000,
+                 max_failures=3, backoff=0.5, backoff_max=30.0,
+                 history=100):
+        super(Supervisor, self).__init__()
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        if max_failures < 1:
+            raise ValueError('max_failures must be at least 1')
+        if probe is not None and not callable(probe):
+            raise ValueError('Provided argument probe is not callable')
+        self.server = server
+        self.interval = interval
+        self.probe = probe or self._probe
+        self.probe_timeout = probe_timeout
+        self.max_failures = max_failures
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.restarts = 0
+        self.events = deque(maxlen=history)
+        self.callbacks = []
+        self._controller = None
+        self._condition = threading.Condition()
+        self._stopped = True
+        self._thread = None
+
+    def on_restart(self, callback):
+        """Register a Callback for the restarts
+
+        The Callback takes a RestartEvent and is called from the thread
+        of the Supervisor, for failed restarts too. Exceptions it raises
+        are ignored.
+        """
+        if not callable(callback):
+            raise ValueError('Provided argument callback is not callable')
+        self.callbacks.append(callback)
+
+    @property
+    def running(self):
+        """True while the server is supervised"""
+        return not self._stopped
+
+    def start(self, timeout=None):
+        """Run the server unless it is running and start supervising it
+
+        :param timeout: Seconds to wait for the server, see Server.run
+        :returns: Nothing
+        :raises RuntimeError: Already supervising
+        :raises ServerProcessError: The server could not be started
+        """
+        with self._condition:
+            if not self._stopped:
+                raise RuntimeError('Supervisor is already running')
+        if self.server.proc is None:
+            self.server.run(timeout=timeout)
+        with self._condition:
+            self._stopped = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='gstswitch-supervisor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, terminate=True, timeout=None):
+        """Stop supervising
+
+        :param terminate: Stop the server too
+        :param timeout: Seconds to wait for the thread of the Supervisor
+        :returns: Nothing
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None and \
+                self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+        self._close_controller()
+        if terminate:
+            self.server.stop(self.KILL_TIMEOUT)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def _sleep(self, seconds):
+        """Non-public method: Wait for seconds unless stopped before
+
+        :returns: True if stopped
+        """
+        with self._condition:
+            if not self._stopped and seconds > 0:
+                self._condition.wait(seconds)
+            return self._stopped
+
+    def _run(self):
+        """Non-public method: Body of the supervising thread"""
+        failures = 0
+        attempt = 0
+        while not self._sleep(self.interval):
+            proc = self.server.proc
+            exit_code = proc.poll() if proc is not None else None
+            if proc is not None and exit_code is None:
+                if self._check():
+                    failures = attempt = 0
+                    continue
+                failures += 1
+                if failures < self.max_failures:
+                    continue
+                reason = 'unresponsive'
+            else:
+                reason = 'exited'
+            failures = 0
+            attempt = self._restart(reason, exit_code, attempt)
+
+    def _check(self):
+        """Non-public method: Probe the server, a probe raising counts as
+        failed"""
+        try:
+            return bool(self.probe(self.server))
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    def _probe(self, server):
+        """Non-public method: The default probe, a cheap remote call"""
+        if self._controller is None:
+            self._controller = server.controller(timeout=self.probe_timeout)
+        try:
+            self._controller.get_compose_port()
+        except (ConnectionError, ConnectionReturnError):
+            # reconnect for the next probe
+            self._close_controller()
+            return False
+        return True
+
+    def _close_controller(self):
+        """Non-public method: Drop the Controller of the default probe"""
+        controller, self._controller = self._controller, None
+        if controller is not None:
+            controller.close()
+
+    def _restart(self, reason, exit_code, attempt):
+        """Non-public method: Restart the server until it runs or the
+        Supervisor is stopped
+
+        :returns: The number of restarts since it was last healthy
+        """
+        failed_at = time()
+        self._close_controller()
+        self.server.stop(self.KILL_TIMEOUT)
+        while True:
+            attempt += 1
+            delay = 0
+            if attempt > 1:
+                delay = min(self.backoff * 2 ** (attempt - 2),
+                            self.backoff_max)
+            if self._sleep(delay):
+                return attempt
+            started_at = time()
+            try:
+                self.server.run()
+                address = self.server.discover_address()
+            except (PathError, ServerProcessError) as error:
+                self.server.stop(self.KILL_TIMEOUT)
+                self._report(RestartEvent(reason, exit_code, attempt,
+                                          failed_at, started_at, None, None,
+                                          error))
+                continue
+            self._report(RestartEvent(reason, exit_code, attempt, failed_at,
+                                      started_at, time(), address, None))
+            return attempt
+
+    def _report(self, event):
+        """Non-public method: Keep event and pass it to the Callbacks"""
+        self.restarts += 1
+        self.events.append(event)
+        for callback in list(self.callbacks):
+            try:
+                callback(event)
+            except Exception:  # pylint: disable=broad-except
+                pass
@@ -0,0 +1,139 @@
+"""
+waiting lets a Controller wait for the gst-switch-srv to reach a state.
+Instead of sleeping for a fixed time after set_composite_mode or after
+starting sources, the helpers follow the signals of the server and
+return as soon as the state is reached.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+from gi.repository import GLib
+from .exception import ConnectionUnknownMethodError, WaitTimeoutError
+
+__all__ = ["WaitMixin", ]
+
+
+class WaitMixin(object):
+
+    """Methods of the Controller waiting for a state of the server.
+
+    The signals are subscribed before the current state is read, so a
+    change which happens in between is not missed. Waiting works without
+    a GLib MainLoop, see events.EventStream. All timeouts are in seconds.
+    """
+
+    def wait_until(self, signal_names, condition, timeout=10.0):
+        """Wait until condition holds. It is tested once right away and
+        again after every signal in signal_names.
+
+        :param signal_names: The signals which may change the condition
+        :param condition: Called as condition(event) with None on the
+        first test and the Event afterwards, returns a true value once
+        the wait is over
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: The value returned by condition
+        :raises WaitTimeoutError: The condition did not hold within timeout
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = GLib.get_monotonic_time() + timeout * 1e6
+        with self.events(signal_names, policy='drop-oldest') as events:
+            result = condition(None)
+            while not result:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(
+                        (deadline - GLib.get_monotonic_time()) / 1e6, 0)
+                batch = events.get_batch(timeout=remaining)
+                if not batch:
+                    raise WaitTimeoutError(
+                        'Condition not reached within {0} seconds'
+                        .format(timeout))
+                for event in batch:
+                    result = condition(event)
+                    if result:
+                        break
+        return result
+
+    def wait_for_signal(self, signal_name, predicate=None, timeout=10.0):
+        """Wait for the next signal_name whose arguments satisfy predicate
+
+        :param signal_name: One of SIGNALS
+        :param predicate: Called with the arguments of the signal, returns
+        True when it is the awaited one. None accepts any.
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: Tuple of the arguments of the signal
+        :raises WaitTimeoutError: No such signal within timeout
+        """
+        def condition(event):
+            """Test the arguments of the signal"""
+            if event is None:
+                return None
+            # pylint: disable=star-args
+            if predicate is None or predicate(*event.args):
+                return event
+            return None
+
+        return self.wait_until((signal_name,), condition, timeout).args
+
+    def wait_for_mode(self, mode, timeout=10.0):
+        """Wait until the server composites in mode, which is announced by
+        the new_mode_online signal once the new mode is rendered.
+
+        The server reports the requested mode before it is rendered, so
+        the current mode only counts while no transition is pending. A
+        server which does not report pending transitions in get_state, or
+        has no get_state at all, is trusted with its current mode.
+
+        :param mode: One of the COMPOSITE_* modes
+        :param timeout: Seconds to wait at most, None waits forever
+        :returns: True
+        :raises WaitTimeoutError: The mode was not reached within timeout
+        """
+        without_state = []
+
+        def current_mode():
+            """The mode of the server, None while a transition is pending"""
+            if not without_state:
+                try:
+                    state = self.get_state()
+                except (ConnectionUnknownMethodError, ValueError):
+                    # the server is older than get_state
+                    without_state.append(True)
+                else:
+                    if state.transition_request:
+                        return None
+                    return state.composite_mode
+            return self.get_composite_mode()
+
+        def condition(event):
+            """Test the signal, or the state of the server when no signal
+            tells the mode"""
+            if event is not None and event.name == 'new_mode_online':
+                return event.args[0] == mode
+            # at first and after a transition completed or failed
+            return current_mode() == mode
+
+        return self.wait_until(('new_mode_online', 'transition_completed'),
+                               condition, timeout)
+
+    def wait_for_preview_ports(self, count, timeout=10.0, serve=None):
+        """Wait until the server has at least count preview ports, e.g.
+        until the sources just started are connected
+
+        :param count: Number of preview ports to wait for
+        :param timeout: Seconds to wait at most, None waits forever
+        :param serve: Only count ports serving this, one of the SERVE_*
+        constants, None counts all
+        :returns: List of PreviewPort
+        :raises WaitTimeoutError: Fewer ports within timeout
+        """
+        def condition(_):
+            """Get the ports if there are enough of them, wrapped in a
+            tuple as no ports at all may be enough too"""
+            ports = [port for port in self.get_preview_port_info()
+                     if serve is None or port.serve == serve]
+            return (ports,) if len(ports) >= count else None
+
+        return self.wait_until(('preview_port_added', 'preview_port_removed'),
+                               condition, timeout)[0]
@@ -0,0 +1,36 @@
+"""
+Fixtures of the integration tests. One pool of servers is started for
+the whole session, tests taking pooled_server run on one of them instead
+of starting a server of their own.
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import sys
+import os
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+from gstswitch.fixtures import ServerPool
+
+PATH = '../tools/'
+
+# Number of servers, defaults to the number of CPUs
+POOL_SIZE = os.environ.get('GSTSWITCH_SERVER_POOL_SIZE')
+
+
+@pytest.fixture(scope='session')
+def server_pool(request):
+    """Start the pool of servers once for all tests"""
+    pool = ServerPool(int(POOL_SIZE) if POOL_SIZE else None, path=PATH,
+                      video_format='debug')
+    pool.start()
+    request.addfinalizer(pool.stop)
+    return pool
+
+
+@pytest.yield_fixture
+def pooled_server(server_pool):
+    """A running server of the pool, reset after the test"""
+    with server_pool.server() as serv:
+        yield serv
@@ -7,6 +7,7 @@ from __future__ import absolute_import, print_function, unicode_literals
 import sys
 import os
 import pytest
+import threading
 import time
 import datetime
 import subprocess
@@ -50,6 +51,52 @@ class TestEstablishConnection(object):
             serv.terminate_and_output_status(cov=True)
 
 
+class TestUnixTransport(object):
+
+    """Test connecting over unix domain sockets"""
+
+    def connect(self, serv, address):
+        """Get the compose port over the discovered and the given
+        address"""
+        controller = serv.controller()
+        controller.establish_connection()
+        assert controller.get_compose_port() == 3001
+        controller.close()
+
+        if address is not None:
+            controller = Controller(address=address)
+            controller.establish_connection()
+            assert controller.get_compose_port() == 3001
+            controller.close()
+
+    @pytest.mark.parametrize('address', [
+        'unix:abstract=gstswitch-test',
+        'unix:path=/tmp/gstswitch-test',
+    ])
+    def test_address(self, address):
+        """Test unix:abstract= and unix:path="""
+        serv = Server(path=PATH, video_format="debug",
+                      controller_address=address)
+        try:
+            serv.run()
+            assert serv.discover_address().startswith(address)
+            self.connect(serv, address)
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
+    def test_tmpdir(self):
+        """Test that the socket the server picked is discovered"""
+        serv = Server(path=PATH, video_format="debug",
+                      controller_address='unix:tmpdir=/tmp')
+        try:
+            serv.run()
+            self.connect(serv, None)
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
+
 class TestGetComposePort(object):
 
     """Test get_compose_port method"""
@@ -212,6 +259,31 @@ class TestGetPreviewPorts(object):
                 serv.terminate_and_output_status(cov=True)
 
 
+class TestGetState(object):
+
+    """Test get_state method"""
+
+    def test_get_state(self, pooled_server):
+        """Test that the snapshot matches the single getters"""
+        sources = TestSources.for_server(pooled_server)
+        controller = pooled_server.controller()
+        try:
+            sources.new_test_video()
+            sources.new_test_video()
+            controller.wait_for_preview_ports(2)
+            state = controller.get_state()
+            assert state.compose_port == controller.get_compose_port()
+            assert state.encode_port == controller.get_encode_port()
+            assert state.composite_mode == controller.get_composite_mode()
+            assert [info.port for info in state.preview_ports] == (
+                controller.get_preview_ports())
+            assert state.inputs == 2
+            assert state.controller_clients >= 1
+        finally:
+            sources.terminate_video()
+            controller.close()
+
+
 class TestSignals(object):
 
     """Test on_*() methods"""
@@ -260,6 +332,67 @@ class TestSignals(object):
         finally:
             serv.terminate_and_output_status(cov=True)
 
+    def test_on_transition_completed(self):
+        """Create a Controller object, call on_transition_completed method
+        and check that the callback fires with the timing of the request
+        """
+        serv = Server(path=PATH)
+        try:
+            serv.run()
+
+            controller = Controller()
+            controller.establish_connection()
+
+            test_cb = Mock(side_effect=self.quit_mainloop)
+            controller.on_transition_completed(test_cb, as_tuple=True)
+            controller.set_composite_mode(0)
+
+            GLib.timeout_add_seconds(5, self.quit_mainloop)
+            self.run_mainloop()
+
+            assert test_cb.call_count == 1
+            completed = test_cb.call_args[0][0]
+            assert completed.mode == 0
+            assert completed.ok
+            assert 0 <= completed.duration < 5
+
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
+    def test_on_switch_completed(self):
+        """Create a Controller object, call on_switch_completed method and
+        check that the callback fires once the streams are switched
+        """
+        serv = Server(path=PATH, video_port=3000)
+        try:
+            serv.run()
+            sources = TestSources(video_port=3000)
+            sources.new_test_video()
+            sources.new_test_video()
+
+            controller = Controller()
+            controller.wait_for_preview_ports(2)
+
+            test_cb = Mock(side_effect=self.quit_mainloop)
+            controller.on_switch_completed(test_cb)
+            assert controller.switch(Controller.VIDEO_CHANNEL_A, 3004)
+
+            GLib.timeout_add_seconds(5, self.quit_mainloop)
+            self.run_mainloop()
+
+            assert test_cb.call_count == 1
+            request, channel, port, start, end, ok = test_cb.call_args[0]
+            assert request > 0
+            assert (channel, port) == (Controller.VIDEO_CHANNEL_A, 3004)
+            assert start <= end
+            assert ok
+
+            sources.terminate_video()
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
     def test_on_preview_port_added(self):
         """Create a Controller object, call add a source method and
         check that the callback fires
@@ -292,6 +425,35 @@ class TestSignals(object):
             serv.terminate_and_output_status(cov=True)
 
 
+class TestThreaded(object):
+
+    """Test signals of a threaded Controller without a MainLoop"""
+
+    def test_on_new_mode_online(self):
+        """Create a threaded Controller object and check that the
+        new_mode_online callback fires from its own thread
+        """
+        serv = Server(path=PATH)
+        try:
+            serv.run()
+
+            controller = Controller(threaded=True)
+            controller.establish_connection()
+
+            fired = threading.Event()
+            test_cb = Mock(side_effect=lambda mode: fired.set())
+            controller.on_new_mode_online(test_cb)
+            controller.set_composite_mode(0)
+
+            assert fired.wait(5)
+            test_cb.assert_called_once_with(0)
+
+            controller.close()
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
+
 class VideoFileSink(object):
 
     """Sink the video to a file
@@ -337,10 +499,10 @@ class TestSetCompositeMode(object):
                 sources.new_test_video(pattern=4)
                 sources.new_test_video(pattern=5)
 
-                time.sleep(3)
                 # expected_result = [mode != 3] * self.FACTOR
                 # print(mode, expected_result)
                 controller = Controller()
+                controller.wait_for_preview_ports(2)
                 res = controller.set_composite_mode(mode)
                 print(res)
                 time.sleep(3)
@@ -466,7 +628,7 @@ class TestAdjustPIP(object):
                 sources.new_test_video(pattern=5)
                 controller = Controller()
                 controller.set_composite_mode(Controller.COMPOSITE_PIP)
-                time.sleep(3)
+                controller.wait_for_mode(Controller.COMPOSITE_PIP)
                 res = controller.adjust_pip(xpos, ypos, width, heigth)
                 time.sleep(3)
                 sources.terminate_video()
@@ -526,8 +688,8 @@ class TestSwitch(object):
                 preview.run()
                 out_file = "output-{0}.data".format(index)
                 video_sink = VideoFileSink(3001, out_file)
-                time.sleep(3)
                 controller = Controller()
+                controller.wait_for_preview_ports(2)
                 res = controller.switch(channel, port)
                 print(res)
                 time.sleep(3)
@@ -549,6 +711,36 @@ class TestSwitch(object):
             self.switch(dic[i - start][0], dic[i - start][1], i)
 
 
+class TestBatch(object):
+
+    """Test batch method"""
+
+    def test_batch(self):
+        """Test switching both channels and the mode in one batch"""
+        serv = Server(path=PATH, video_format="debug")
+        try:
+            serv.run()
+
+            sources = TestSources(3000)
+            sources.new_test_video(pattern=4)
+            sources.new_test_video(pattern=5)
+            sources.new_test_video(pattern=6)
+            controller = Controller()
+            controller.wait_for_preview_ports(3)
+            with controller.batch() as batch:
+                batch.switch(Controller.VIDEO_CHANNEL_A, 3005)
+                batch.set_composite_mode(Controller.COMPOSITE_DUAL_EQUAL)
+                batch.adjust_pip(10, 10, 0, 0)
+            assert len(batch.results) == 3
+            assert batch.results[0] is True
+            assert controller.get_composite_mode() == (
+                Controller.COMPOSITE_DUAL_EQUAL)
+            sources.terminate_video()
+            serv.terminate(1)
+        finally:
+            serv.terminate_and_output_status(cov=True)
+
+
 class TestClickVideo(object):
 
     """Test click_video method"""
@@ -575,7 +767,7 @@ class TestClickVideo(object):
                 sources.new_test_video(pattern=4)
                 sources.new_test_video(pattern=5)
                 controller = Controller()
-                time.sleep(1)
+                controller.wait_for_preview_ports(2)
                 res = controller.click_video(xpos, ypos, width, heigth)
                 print(res)
                 time.sleep(1)
@@ -636,7 +828,7 @@ class TestMarkFace(object):
                 sources.new_test_video(pattern=4)
                 sources.new_test_video(pattern=5)
                 controller = Controller()
-                time.sleep(1)
+                controller.wait_for_preview_ports(2)
                 res = controller.mark_face(faces)
                 print(res)
                 time.sleep(1)
@@ -691,7 +883,7 @@ class TestMarkTracking(object):
                 sources.new_test_video(pattern=4)
                 sources.new_test_video(pattern=5)
                 controller = Controller()
-                time.sleep(1)
+                controller.wait_for_preview_ports(2)
                 res = controller.mark_tracking(faces)
                 print(res)
                 time.sleep(1)
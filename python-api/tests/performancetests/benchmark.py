@@ -0,0 +1,430 @@
+"""
+Latency and throughput benchmark of the DBus control plane.
+
+Every Controller method is called repeatedly against a running
+gst-switch-srv and the latency of every call is recorded. The results
+report p50/p95/p99 latency and operations per second, so runs of
+different releases can be compared.
+
+Three modes are measured:
+
+    sync  - blocking calls, one Controller per worker thread
+    async - Controller.call_async with up to `concurrency` calls in flight
+    batch - Controller.apply_batch, `batch_size` operations per call
+
+Run it against a server which is already running:
+
+    python tests/performancetests/benchmark.py \\
+        --address tcp:host=127.0.0.1,port=5000 --json results.json
+
+or let it start one from ../tools/ with --path, listening on the
+transport given by --transport (tcp or unix).
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import argparse
+import json
+import platform
+import threading
+import time
+from timeit import default_timer
+
+from gstswitch.address import parse_address, unix_address
+from gstswitch.controller import Controller
+from gstswitch.helpers import TestSources
+from gstswitch.server import Server
+
+MODES = ('sync', 'async', 'batch')
+
+# Arguments of the benchmarked methods, called with the iteration number.
+# switch needs a preview port, so it is only measured when the setup
+# knows one (see Benchmark.switch_port).
+METHODS = {
+    'get_compose_port': lambda i: (),
+    'get_encode_port': lambda i: (),
+    'get_audio_port': lambda i: (),
+    'get_preview_ports': lambda i: (),
+    'get_preview_port_info': lambda i: (),
+    'get_composite_mode': lambda i: (),
+    'get_state': lambda i: (),
+    'set_composite_mode': lambda i: (i % 4,),
+    'adjust_pip': lambda i: (i % 2, i % 2, 0, 0),
+}
+
+BATCH_METHODS = ('set_composite_mode', 'adjust_pip', 'switch')
+
+# Addresses of a server started by the benchmark, per transport
+TRANSPORTS = {
+    'tcp': 'tcp:host=127.0.0.1,port=5000',
+    'unix': unix_address(abstract='gstswitch-benchmark'),
+}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of samples
+
+    :param samples: Sorted list of numbers
+    :param pct: The percentile, 0 < pct <= 100
+    :returns: The smallest sample which is not less than pct percent
+    of all samples, None if there are none
+    """
+    if not samples:
+        return None
+    rank = int(-(-len(samples) * pct // 100))
+    return samples[max(rank, 1) - 1]
+
+
+class BenchmarkResult(object):
+
+    """The measurements of one method in one mode
+
+    :param method: The benchmarked method
+    :param mode: One of MODES
+    :param concurrency: Number of concurrent callers
+    :param latencies: Latency of every call in seconds
+    :param elapsed: Wall time of the whole run in seconds
+    :param operations: Number of operations done, defaults to the number
+    of latencies (a batch call does several operations)
+    :param errors: Number of failed calls
+    """
+
+    def __init__(self, method, mode, concurrency, latencies, elapsed,
+                 operations=None, errors=0):
+        self.method = method
+        self.mode = mode
+        self.concurrency = concurrency
+        self.latencies = sorted(latencies)
+        self.elapsed = elapsed
+        self.operations = len(latencies) if operations is None \
+            else operations
+        self.errors = errors
+
+    @property
+    def ops_per_sec(self):
+        """Operations per second over the whole run"""
+        if not self.elapsed:
+            return None
+        return self.operations / self.elapsed
+
+    def as_dict(self):
+        """Get the result as dict of plain values, latencies in msec"""
+        def msec(value):
+            """Convert seconds to rounded milliseconds"""
+            return None if value is None else round(value * 1000, 4)
+
+        latencies = self.latencies
+        return {
+            'method': self.method,
+            'mode': self.mode,
+            'concurrency': self.concurrency,
+            'calls': len(latencies),
+            'operations': self.operations,
+            'errors': self.errors,
+            'ops_per_sec': self.ops_per_sec and round(self.ops_per_sec, 2),
+            'min_ms': msec(latencies[0] if latencies else None),
+            'p50_ms': msec(percentile(latencies, 50)),
+            'p95_ms': msec(percentile(latencies, 95)),
+            'p99_ms': msec(percentile(latencies, 99)),
+            'max_ms': msec(latencies[-1] if latencies else None),
+            'mean_ms': msec(sum(latencies) / len(latencies)
+                            if latencies else None),
+        }
+
+    def __str__(self):
+        values = self.as_dict()
+        return ('{method:<22} {mode:<5} c={concurrency:<3} '
+                'p50={p50_ms:>8.3f}ms p95={p95_ms:>8.3f}ms '
+                'p99={p99_ms:>8.3f}ms {ops_per_sec:>9.1f} ops/s '
+                'errors={errors}'.format(**values))
+
+
+class Benchmark(object):
+
+    """Run the benchmarks against the gst-switch-srv at address
+
+    :param address: DBus address of the gst-switch-srv
+    :param iterations: Measured calls per method and mode
+    :param warmup: Calls before measuring, which are not recorded
+    :param concurrency: Number of worker threads (sync) or calls in
+    flight (async)
+    :param batch_size: Operations per batch call
+    :param switch_port: A preview port for benchmarking switch, None to
+    leave it out
+    """
+
+    def __init__(self, address, iterations=200, warmup=20, concurrency=1,
+                 batch_size=10, switch_port=None):
+        self.address = address
+        self.iterations = iterations
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.switch_port = switch_port
+
+    def make_controller(self):
+        """Create a connected Controller"""
+        controller = Controller(address=self.address)
+        controller.establish_connection()
+        return controller
+
+    def arguments(self, method, i):
+        """Arguments for the i-th call of method"""
+        if method == 'switch':
+            return (Controller.VIDEO_CHANNEL_A, self.switch_port)
+        return METHODS[method](i)
+
+    def methods(self, mode):
+        """Names of the methods which can be benchmarked in mode"""
+        names = sorted(METHODS)
+        if self.switch_port is not None:
+            names.append('switch')
+        if mode == 'batch':
+            names = [name for name in names if name in BATCH_METHODS]
+        return names
+
+    def run(self, modes=MODES, methods=None):
+        """Benchmark methods in all modes
+
+        :param modes: The modes to run
+        :param methods: Names of the methods to run, defaults to all
+        :returns: List of BenchmarkResult
+        """
+        results = []
+        for mode in modes:
+            runner = getattr(self, 'run_' + mode)
+            for method in self.methods(mode):
+                if methods is None or method in methods:
+                    results.append(runner(method))
+        return results
+
+    def run_sync(self, method):
+        """Benchmark blocking calls of method from concurrency threads"""
+        controllers = [self.make_controller()
+                       for _ in range(self.concurrency)]
+        for i in range(self.warmup):
+            getattr(controllers[0], method)(*self.arguments(method, i))
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        start_barrier = threading.Event()
+
+        def worker(controller, count):
+            """Do count calls and record their latency"""
+            call = getattr(controller, method)
+            own_latencies = []
+            own_errors = 0
+            start_barrier.wait()
+            for i in range(count):
+                args = self.arguments(method, i)
+                begin = default_timer()
+                try:
+                    call(*args)
+                except Exception:  # pylint: disable=broad-except
+                    own_errors += 1
+                own_latencies.append(default_timer() - begin)
+            with lock:
+                latencies.extend(own_latencies)
+                errors.append(own_errors)
+
+        threads = []
+        for index, controller in enumerate(controllers):
+            count = self.iterations // self.concurrency
+            if index < self.iterations % self.concurrency:
+                count += 1
+            threads.append(threading.Thread(target=worker,
+                                            args=(controller, count)))
+        for thread in threads:
+            thread.start()
+        begin = default_timer()
+        start_barrier.set()
+        for thread in threads:
+            thread.join()
+        elapsed = default_timer() - begin
+
+        for controller in controllers:
+            controller.close()
+        return BenchmarkResult(method, 'sync', self.concurrency, latencies,
+                               elapsed, errors=sum(errors))
+
+    def run_async(self, method):
+        """Benchmark call_async of method with up to concurrency calls
+        in flight
+        """
+        controller = self.make_controller()
+        latencies = []
+        errors = []
+        slots = threading.Semaphore(self.concurrency)
+        finished = threading.Event()
+        pending = [self.warmup + self.iterations]
+
+        def start(i, record):
+            """Start the i-th call, record its latency when it returns"""
+            slots.acquire()
+            begin = default_timer()
+
+            def done(result, error):
+                """Record the call and free its slot"""
+                # pylint: disable=unused-argument
+                if record:
+                    latencies.append(default_timer() - begin)
+                    if error is not None:
+                        errors.append(error)
+                slots.release()
+                pending[0] -= 1
+                if not pending[0]:
+                    finished.set()
+
+            controller.call_async(method, self.arguments(method, i), done)
+
+        for i in range(self.warmup):
+            start(i, False)
+        # wait for the warmup calls to return before measuring
+        for _ in range(self.concurrency):
+            slots.acquire()
+        for _ in range(self.concurrency):
+            slots.release()
+
+        begin = default_timer()
+        for i in range(self.iterations):
+            start(i, True)
+        finished.wait()
+        elapsed = default_timer() - begin
+
+        controller.close()
+        return BenchmarkResult(method, 'async', self.concurrency,
+                               latencies, elapsed, errors=len(errors))
+
+    def run_batch(self, method):
+        """Benchmark apply_batch with batch_size operations of method"""
+        controller = self.make_controller()
+
+        def operations(i):
+            """The operations of the i-th batch"""
+            return [(method, self.arguments(method, i * self.batch_size + j))
+                    for j in range(self.batch_size)]
+
+        for i in range(self.warmup):
+            controller.apply_batch(operations(i))
+
+        latencies = []
+        errors = 0
+        batches = max(self.iterations // self.batch_size, 1)
+        begin = default_timer()
+        for i in range(batches):
+            ops = operations(i)
+            start = default_timer()
+            try:
+                controller.apply_batch(ops)
+            except Exception:  # pylint: disable=broad-except
+                errors += 1
+            latencies.append(default_timer() - start)
+        elapsed = default_timer() - begin
+
+        controller.close()
+        return BenchmarkResult(method, 'batch', 1, latencies, elapsed,
+                               operations=batches * self.batch_size,
+                               errors=errors)
+
+
+def report(results, benchmark):
+    """Build the JSON report of a run
+
+    :param results: List of BenchmarkResult
+    :param benchmark: The Benchmark which produced them
+    :returns: dict
+    """
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'transport': parse_address(benchmark.address)[0][0],
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'iterations': benchmark.iterations,
+        'warmup': benchmark.warmup,
+        'concurrency': benchmark.concurrency,
+        'batch_size': benchmark.batch_size,
+        'results': [result.as_dict() for result in results],
+    }
+
+
+def parse_args(argv):
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--address', default=None,
+                        help='DBus address of a running gst-switch-srv')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS),
+                        default='tcp',
+                        help='Transport of the server started when no '
+                        '--address is given, default: %(default)s')
+    parser.add_argument('--path', default='../tools/',
+                        help='Where to find gst-switch-srv when starting '
+                        'one, default: %(default)s')
+    parser.add_argument('--video-port', type=int, default=3000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--mode', action='append', choices=MODES,
+                        help='Mode to run, may be given several times, '
+                        'default: all')
+    parser.add_argument('--method', action='append',
+                        help='Method to run, may be given several times, '
+                        'default: all')
+    parser.add_argument('--json', default=None,
+                        help='Write the results as JSON to this file, '
+                        '- for stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the benchmark from the command line"""
+    args = parse_args(argv)
+    serv = sources = None
+    address = args.address
+    try:
+        if address is None:
+            address = TRANSPORTS[args.transport]
+            serv = Server(path=args.path, video_port=args.video_port,
+                          controller_address=address)
+            serv.run()
+            sources = TestSources(video_port=args.video_port)
+            sources.new_test_video()
+            sources.new_test_video()
+
+        controller = Controller(address=address)
+        controller.establish_connection()
+        ports = controller.get_preview_ports()
+        controller.close()
+
+        benchmark = Benchmark(address, iterations=args.iterations,
+                              warmup=args.warmup,
+                              concurrency=args.concurrency,
+                              batch_size=args.batch_size,
+                              switch_port=ports[0] if ports else None)
+        results = benchmark.run(modes=args.mode or MODES,
+                                methods=args.method)
+    finally:
+        if sources is not None:
+            sources.terminate_video()
+        if serv is not None:
+            serv.terminate(1)
+
+    for result in results:
+        print(result, file=sys.stderr if args.json == '-' else sys.stdout)
+    if args.json == '-':
+        json.dump(report(results, benchmark), sys.stdout, indent=2,
+                  sort_keys=True)
+    elif args.json:
+        with open(args.json, 'w') as out:
+            json.dump(report(results, benchmark), out, indent=2,
+                      sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,10 @@
 """
-Performance/Torture test for DBus methods
+Performance tests for the DBus methods, see benchmark.py.
+
+A single gst-switch-srv is started for the whole module and every method
+is benchmarked in every mode. test_transport compares the latency over
+tcp and over a unix socket. The results are printed and, when
+GSTSWITCH_BENCHMARK_JSON names a file, written there as JSON.
 """
 
 from __future__ import absolute_import, print_function, unicode_literals
@@ -7,374 +12,161 @@ from __future__ import absolute_import, print_function, unicode_literals
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from gstswitch.server import Server
-from gstswitch.helpers import TestSources, PreviewSinks
-from gstswitch.controller import Controller
+import json
 import time
 
-PATH = '../tools/'
-
-
-
-def get_compose_port(num):
-        """Test get_compose_port - num times"""
-        video_port = 8000
-        serv = Server(path=PATH, video_port=video_port)
-        try:
-            serv.run()
-            sources = TestSources(video_port=video_port)
-            sources.new_test_video()
-
-            expected_res = [video_port + 1] * num
-
-            controller = Controller()
-            controller.establish_connection()
-            res = []
-            for _ in range(num):
-                res.append(controller.get_compose_port())
-
-            assert expected_res == res
-        finally:
-            if serv.proc:
-                    poll = serv.proc.poll()
-                    if poll == -11:
-                        print("SEGMENTATION FAULT OCCURRED")
-                    print("ERROR CODE - {0}".format(poll))
-                    serv.terminate(1)
-                    log = open('server.log')
-                    print(log.read())
-
-
-class TestGetComposePort(object):
-    """Performance test for get_compose_port method - 100 times"""
-
-    def test_100(self):
-        """Performance test for get_compose_port method"""
-        number_test_runs = 100
-        get_compose_port(number_test_runs)
-
-
-    def test_200(self):
-        """Performance test for get_compose_port method"""
-        number_test_runs = 200
-        get_compose_port(number_test_runs)
-
-
-    def test_300(self):
-        """Performance test for get_compose_port method"""
-        number_test_runs = 300
-        get_compose_port(number_test_runs)
-
-
-    def test_400(self):
-        """Performance test for get_compose_port method"""
-        number_test_runs = 400
-        get_compose_port(number_test_runs)
-
-    def test_500(self):
-        """Performance test for get_compose_port method"""
-        number_test_runs = 500
-        get_compose_port(number_test_runs)
-
-
-def get_encode_port(num):
-        """Test get_encode_port - num times"""
-        video_port = 3000
-        serv = Server(path=PATH, video_port=video_port)
-        try:
-            serv.run()
-            sources = TestSources(video_port=video_port)
-            sources.new_test_video()
-
-            expected_res = [video_port + 2] * num
-
-            controller = Controller()
-            controller.establish_connection()
-            res = []
-            for _ in range(num):
-                res.append(controller.get_encode_port())
-
-            assert expected_res == res
-        finally:
-            if serv.proc:
-                    poll = serv.proc.poll()
-                    if poll == -11:
-                        print("SEGMENTATION FAULT OCCURRED")
-                    print("ERROR CODE - {0}".format(poll))
-                    serv.terminate(1)
-                    log = open('server.log')
-                    print(log.read())
-
-
-class TestGetEncodePort(object):
-    """Performance test for get_encode_port method"""
-
-    def test_100(self):
-        """Performance test for get_encode_port method - 100 times"""
-        number_test_runs = 100
-        get_encode_port(number_test_runs)
-
-    def test_200(self):
-        """Performance test for get_encode_port method - 200 times"""
-        number_test_runs = 200
-        get_encode_port(number_test_runs)
-
-    def test_300(self):
-        """Performance test for get_encode_port method - 300 times"""
-        number_test_runs = 300
-        get_encode_port(number_test_runs)
-
-    def test_400(self):
-        """Performance test for get_encode_port method - 400 times"""
-        number_test_runs = 400
-        get_encode_port(number_test_runs)
-
-    def test_500(self):
-        """Performance test for get_encode_port method - 500 times"""
-        number_test_runs = 500
-        get_encode_port(number_test_runs)
-
-
-
-def get_audio_port(num):
-        """Test get_audio_port"""
-        audio_port = 8000
-        serv = Server(path=PATH, audio_port=audio_port)
-        try:
-            serv.run()
-            sources = TestSources(audio_port=audio_port)
-            sources.new_test_audio()
-
-            expected_res = [3003] * num
-
-            controller = Controller()
-            controller.establish_connection()
-            res = []
-            for _ in range(num):
-                res.append(controller.get_audio_port())
-
-            assert expected_res == res
-
-        finally:
-            if serv.proc:
-                    poll = serv.proc.poll()
-                    if poll == -11:
-                        print("SEGMENTATION FAULT OCCURRED")
-                    print("ERROR CODE - {0}".format(poll))
-                    serv.terminate(1)
-                    log = open('server.log')
-                    print(log.read())
-
-
-class TestGetAudioPort(object):
-
-    def test_100(self):
-        """Performance test for get_audio_port method - 100 times"""
-        number_test_runs = 100
-        get_audio_port(number_test_runs)
-
-
-    def test_200(self):
-        """Performance test for get_audio_port method - 200 times"""
-        number_test_runs = 200
-        get_audio_port(number_test_runs)
+import pytest
 
+from gstswitch.address import unix_address
+from gstswitch.server import Isolation, Server
+from gstswitch.helpers import TestSources
+from gstswitch.controller import Controller
+from gstswitch.markers import MarkerQueue
+from benchmark import Benchmark, MODES, report
 
-    def test_300(self):
-        """Performance test for get_audio_port method - 300 times"""
-        number_test_runs = 300
-        get_audio_port(number_test_runs)
-
-
-    def test_400(self):
-        """Performance test for get_audio_port method - 400 times"""
-        number_test_runs = 400
-        get_audio_port(number_test_runs)
-
-
-    def test_500(self):
-        """Performance test for get_audio_port method - 500 times"""
-        number_test_runs = 500
-        get_audio_port(number_test_runs)
-
-
-def get_preview_ports(num):
-    """Get Preview Ports when num number of sources are added"""
-    video_port = 3000
-    serv = Server(path=PATH, video_port=video_port)
-    try:
-        serv.run()
-        sources = TestSources(video_port=video_port)
-
-
-        expected_res = [ i for i in range(3003, 3003 + num)]
-
-        controller = Controller()
-
-        res = []
-        for _ in range(num):
-            sources.new_test_video()
-        controller.establish_connection()
-        res = controller.get_preview_ports()
-        print(res)
-
-        assert expected_res == res
-    finally:
-        if serv.proc:
-                poll = serv.proc.poll()
-                if poll == -11:
-                    print("SEGMENTATION FAULT OCCURRED")
-                print("ERROR CODE - {0}".format(poll))
-                serv.terminate(1)
-                log = open('server.log')
-                print(log.read())
-
-
-class _TestGetPreviewPorts(object):
-
-    def test_50(self):
-        """Test when 50 sources are added"""
-        number_souces = 50
-        get_preview_ports(number_souces)
-
-    def test_100(self):
-        """Test when 100 sources are added"""
-        number_souces = 100
-        get_preview_ports(number_souces)
-
-    def test_200(self):
-        """Test when 200 sources are added"""
-        number_souces = 200
-        get_preview_ports(number_souces)
-
-    def test_500(self):
-        """Test when 500 sources are added"""
-        number_souces = 500
-        get_preview_ports(number_souces)
-
-    def test_1000(self):
-        """Test when 1000 sources are added"""
-        number_souces = 1000
-        get_preview_ports(number_souces)
-
-
-def permutate_composite_mode(num, delay):
-    """Change composite mode num number of times"""
-    import random
-
-    video_port = 3000
-    serv = Server(path=PATH, video_port=video_port)
-    try:
-        serv.run()
-        sources = TestSources(video_port=video_port)
-        sources.new_test_video(pattern=6)
-        sources.new_test_video(pattern=5)
-        preview = PreviewSinks()
-        preview.run()
-        controller = Controller()
-        res = controller.set_composite_mode(0)
-        assert res is True
-
-        prev_mode = 0
-        for _ in range(num-1):
-
-            time.sleep(delay)
-            mode = random.randint(0,3)
-            expected_res = bool(prev_mode ^ mode)
-            prev_mode = mode
-            assert expected_res == controller.set_composite_mode(mode)
-        preview.terminate()
+PATH = '../tools/'
+# the server picks free ports, see server.Isolation
+ADDRESS = 'tcp:host=127.0.0.1,port=0'
+ITERATIONS = int(os.environ.get('GSTSWITCH_BENCHMARK_ITERATIONS', 200))
+CONCURRENCY = int(os.environ.get('GSTSWITCH_BENCHMARK_CONCURRENCY', 4))
+
+RESULTS = []
+
+
+@pytest.fixture(scope='module')
+def server_benchmark(request):
+    """Start the server with two test sources for all benchmarks"""
+    serv = Server(path=PATH, controller_address=ADDRESS,
+                  isolation=Isolation(free_ports=True))
+    serv.run()
+    sources = TestSources.for_server(serv)
+    sources.new_test_video()
+    sources.new_test_video()
+
+    controller = serv.controller()
+    controller.establish_connection()
+    ports = controller.get_preview_ports()
+    controller.close()
+    bench = Benchmark(serv.discover_address(), iterations=ITERATIONS,
+                      concurrency=CONCURRENCY, switch_port=ports[0])
+
+    def finalize():
+        """Stop the server and write the results"""
         sources.terminate_video()
-
-    finally:
         if serv.proc:
-                poll = serv.proc.poll()
-                if poll == -11:
-                    print("SEGMENTATION FAULT OCCURRED")
-                print("ERROR CODE - {0}".format(poll))
-                serv.terminate(1)
-                log = open('server.log')
-                print(log.read())
-
-class TestSetCompositeMode(object):
-    """Performance Tests for set_composite_mode"""
-
-    def test_num_20_delay_1(self):
-        delay = 1
-        num = 20
-        permutate_composite_mode(num, delay)
-
-    def test_num_20_delay_point_6(self):
-        delay = 0.6
-        num = 20
-        permutate_composite_mode(num, delay)
-
-    def test_num_20_delay_point_5(self):
-        delay = 0.5
-        num = 20
-        permutate_composite_mode(num, delay)
-
-    def test_num_20_delay_point_2(self):
-        delay = 0.2
-        num = 20
-        permutate_composite_mode(num, delay)
-
-
-def permutate_adjust_pip(num, delay):
-    """Adjust_pip num number of times"""
-    import random
-
-    video_port = 3000
-    serv = Server(path=PATH, video_port=video_port)
-    try:
+            poll = serv.proc.poll()
+            if poll == -11:
+                print("SEGMENTATION FAULT OCCURRED")
+            print("ERROR CODE - {0}".format(poll))
+            serv.terminate(1)
+        filename = os.environ.get('GSTSWITCH_BENCHMARK_JSON')
+        if filename and RESULTS:
+            with open(filename, 'w') as out:
+                json.dump(report(RESULTS, bench), out, indent=2,
+                          sort_keys=True)
+
+    request.addfinalizer(finalize)
+    return bench
+
+
+def cases():
+    """All (mode, method) combinations"""
+    bench = Benchmark(ADDRESS, switch_port=0)
+    return [(mode, method) for mode in MODES
+            for method in bench.methods(mode)]
+
+
+@pytest.mark.parametrize(('mode', 'method'), cases())
+def test_benchmark(server_benchmark, mode, method):
+    """Benchmark method in mode, no call may fail"""
+    result = server_benchmark.run(modes=(mode,), methods=(method,))[0]
+    RESULTS.append(result)
+    print(result)
+    assert result.errors == 0
+    assert len(result.latencies) > 0
+
+
+def test_connection_reuse(server_benchmark):
+    """Compare the per-call latency of reconnecting before every call
+    with reusing one persistent connection"""
+    num = 100
+    controller = Controller(address=server_benchmark.address)
+
+    start = time.time()
+    for _ in range(num):
+        controller.establish_connection(force=True)
+        controller.get_compose_port()
+    reconnecting = (time.time() - start) / num
+
+    controller.establish_connection(force=True)
+    start = time.time()
+    for _ in range(num):
+        controller.get_compose_port()
+    persistent = (time.time() - start) / num
+    controller.close()
+
+    print("per-call latency reconnecting: {0:.3f} ms"
+          .format(reconnecting * 1000))
+    print("per-call latency persistent:   {0:.3f} ms"
+          .format(persistent * 1000))
+
+    assert persistent < reconnecting
+
+
+def test_transport():
+    """Compare the latency of tcp with a unix socket, each on its own
+    server, which does not need test sources"""
+    addresses = {
+        'tcp': ADDRESS,
+        'unix': unix_address(abstract='gstswitch-benchmark-transport'),
+    }
+    results = {}
+    for transport in sorted(addresses):
+        serv = Server(path=PATH, controller_address=addresses[transport],
+                      isolation=Isolation(free_ports=True))
         serv.run()
-        sources = TestSources(video_port=video_port)
-        sources.new_test_video(pattern=6)
-        sources.new_test_video(pattern=5)
-        preview = PreviewSinks()
-        preview.run()
-        controller = Controller()
-
-        for _ in range(num):
-
-            xpos = random.randrange(-20, 20)
-            ypos = random.randrange(-20, 20)
-            res = controller.adjust_pip(xpos, ypos, 0, 0)
-            time.sleep(delay)
-            assert res is not None
-        preview.terminate()
-        sources.terminate_video()
-
-    finally:
-        if serv.proc:
-                poll = serv.proc.poll()
-                if poll == -11:
-                    print("SEGMENTATION FAULT OCCURRED")
-                print("ERROR CODE - {0}".format(poll))
-                serv.terminate(1)
-                log = open('server.log')
-                print(log.read())
-
-class TestAdjustPip(object):
-    """Performance Tests for set_adjust_pip"""
-
-    def test_num_20_delay_1(self):
-        delay = 1
-        num = 20
-        permutate_adjust_pip(num, delay)
-
-    def test_num_20_delay_point_6(self):
-        delay = 0.6
-        num = 20
-        permutate_adjust_pip(num, delay)
-
-    def test_num_20_delay_point_5(self):
-        delay = 0.5
-        num = 20
-        permutate_adjust_pip(num, delay)
-
-    def test_num_20_delay_point_2(self):
-        delay = 0.2
-        num = 20
-        permutate_adjust_pip(num, delay)
+        try:
+            bench = Benchmark(serv.discover_address(),
+                              iterations=ITERATIONS)
+            result = bench.run(modes=('sync',),
+                               methods=('get_compose_port',))[0]
+        finally:
+            serv.terminate(1)
+        print(transport, result)
+        assert result.errors == 0
+        results[transport] = result.as_dict()
+
+    print("p50 tcp: {0} ms, unix: {1} ms".format(
+        results['tcp']['p50_ms'], results['unix']['p50_ms']))
+    assert results['unix']['p50_ms'] <= results['tcp']['p50_ms']
+
+
+def test_marker_throughput(server_benchmark):
+    """Compare mark_face waiting for every reply with the MarkerQueue,
+    which sends without replies and drops stale markers"""
+    num = 500
+    faces = [(10, 10, 50, 50)]
+    controller = server_benchmark.make_controller()
+
+    start = time.time()
+    for _ in range(num):
+        controller.mark_face(faces)
+    with_reply = num / (time.time() - start)
+
+    queue = MarkerQueue(controller)
+    start = time.time()
+    for _ in range(num):
+        queue.mark_face(faces)
+    queue.flush()
+    queued = num / (time.time() - start)
+    queue.close()
+    controller.close()
+
+    print("mark_face with reply: {0:.0f}/s, queued: {1:.0f}/s "
+          "({2} sent, {3} dropped)".format(with_reply, queued, queue.sent,
+                                           queue.dropped))
+    assert queue.errors == 0
+    assert queue.sent + queue.dropped == num
+    assert queued > with_reply
@@ -0,0 +1,143 @@
+"""Unittests for address.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import socket
+
+from gstswitch.address import (check_address, format_address,
+                               free_port_address, local_address,
+                               parse_address, read_listening_address,
+                               remove_stale_socket, unix_address)
+from gi.repository import GLib
+import pytest
+
+
+class TestParseAddress(object):
+
+    """Unittests for parse_address"""
+
+    def test_entries(self):
+        """Test splitting entries and unescaping values"""
+        assert parse_address('unix:path=/tmp/a%20b;tcp:host=h,port=1') == [
+            ('unix', {'path': '/tmp/a b'}),
+            ('tcp', {'host': 'h', 'port': '1'}),
+        ]
+
+    def test_invalid(self):
+        """Test entries without transport or value"""
+        for address in ['abc', ':path=a', 'unix:path']:
+            with pytest.raises(ValueError):
+                parse_address(address)
+
+
+class TestFormatAddress(object):
+
+    """Unittests for format_address and free_port_address"""
+
+    def test_round_trip(self):
+        """Test that formatting reverses parsing"""
+        address = 'unix:path=/tmp/a%20b;tcp:host=h,port=1'
+        assert format_address(parse_address(address)) == address
+
+    def test_free_port(self):
+        """Test that tcp ports become 0 and other transports are kept"""
+        assert free_port_address('tcp:host=0.0.0.0,port=5000') == \
+            'tcp:host=0.0.0.0,port=0'
+        assert free_port_address('tcp:host=127.0.0.1') == \
+            'tcp:host=127.0.0.1,port=0'
+        assert free_port_address('unix:tmpdir=/tmp') == 'unix:tmpdir=/tmp'
+
+
+class TestCheckAddress(object):
+
+    """Unittests for check_address"""
+
+    def test_valid(self):
+        """Test addresses which are accepted"""
+        for address in ['tcp:host=127.0.0.1,port=5000',
+                        'unix:path=/tmp/gstswitch',
+                        'unix:abstract=gstswitch',
+                        'unix:tmpdir=/tmp',
+                        'unix:path']:
+            assert check_address(address) == address
+
+    def test_invalid(self):
+        """Test addresses which are refused"""
+        for address in ['', None, 'abc', 'unix:path=',
+                        'unix:abstract=', 'unix:path=/a,abstract=b',
+                        'unix:path=/' + 'a' * 107]:
+            with pytest.raises(ValueError):
+                check_address(address)
+
+
+class TestUnixAddress(object):
+
+    """Unittests for unix_address and local_address"""
+
+    def test_escaping(self):
+        """Test that values are escaped"""
+        assert unix_address(path='/tmp/a b') == 'unix:path=/tmp/a%20b'
+        assert unix_address(abstract='a,b') == 'unix:abstract=a%2Cb'
+
+    def test_arguments(self):
+        """Test that either path or abstract is required"""
+        with pytest.raises(ValueError):
+            unix_address()
+        with pytest.raises(ValueError):
+            unix_address(path='/a', abstract='b')
+
+    def test_local(self):
+        """Test that local addresses are in the runtime directory"""
+        assert local_address('srv') == 'unix:path={0}/srv'.format(
+            GLib.get_user_runtime_dir())
+
+
+class TestListeningAddress(object):
+
+    """Unittests for read_listening_address"""
+
+    def test_found(self):
+        """Test that the last address is found"""
+        log = ('info: Controller is listening at: unix:abstract=a\n'
+               'Controller is listening at: unix:abstract=b,guid=1\n')
+        assert read_listening_address(log) == 'unix:abstract=b,guid=1'
+
+    def test_missing(self):
+        """Test a log without the address"""
+        assert read_listening_address('starting\n') is None
+
+
+class TestRemoveStaleSocket(object):
+
+    """Unittests for remove_stale_socket"""
+
+    def test_stale(self, tmpdir):
+        """Test that a socket without listener is removed"""
+        path = str(tmpdir.join('sock'))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.close()
+        assert remove_stale_socket('unix:path=' + path) is True
+        assert not os.path.exists(path)
+
+    def test_listening(self, tmpdir):
+        """Test that a socket in use is kept"""
+        path = str(tmpdir.join('sock'))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen(1)
+        try:
+            assert remove_stale_socket('unix:path=' + path) is False
+            assert os.path.exists(path)
+        finally:
+            sock.close()
+
+    def test_other(self, tmpdir):
+        """Test that other files and addresses are left alone"""
+        path = tmpdir.join('file')
+        path.write('')
+        assert remove_stale_socket('unix:path=' + str(path)) is False
+        assert path.check()
+        assert remove_stale_socket('tcp:host=a,port=1') is False
+        assert remove_stale_socket('unix:path') is False
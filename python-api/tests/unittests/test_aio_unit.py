@@ -0,0 +1,140 @@
+"""Unittests for aio.py"""
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.controller import Controller, PreviewPort
+from gstswitch.exception import ConnectionError, ConnectionReturnError
+import pytest
+from mock import Mock
+from gi.repository import GLib
+
+
+class MockAsyncConnection(object):
+
+    """Mocks the asynchronous methods of the Connection class, with mode
+    True they reply invalid values"""
+
+    def __init__(self, mode):
+        self.mode = mode
+
+    def is_connected(self):
+        """mock of is_connected"""
+        return True
+
+    def reply(self, signature, value):
+        """The reply, or an invalid one"""
+        if self.mode is False:
+            return GLib.Variant(signature, (value,))
+        return (0,)
+
+    def get_compose_port_async(self, callback, timeout=None, cancellable=None):
+        """mock of get_compose_port_async"""
+        callback(self.reply('(i)', 3001), None)
+
+    def get_preview_port_info_async(self, callback,
+                                    timeout=None, cancellable=None):
+        """mock of get_preview_port_info_async"""
+        callback(self.reply('(a(iii))', [(3002, 1, 7), (3003, 2, 8)]), None)
+
+    def get_preview_ports_async(self, callback,
+                                timeout=None, cancellable=None):
+        """mock of get_preview_ports_async"""
+        callback(self.reply('(s)', '[(3002, 1, 7), (3003, 1, 8)]'), None)
+
+    def switch_async(self, channel, port, callback,
+                     timeout=None, cancellable=None):
+        """mock of switch_async"""
+        callback(None, ConnectionError('switch: failed'))
+
+
+class TestCallAsync(object):
+
+    """Test the call_async and future methods"""
+
+    def call(self, controller, method, *args):
+        """Run call_async and wait for the callback"""
+        done = threading.Event()
+        outcome = []
+
+        def callback(result, error):
+            """Store the outcome"""
+            outcome.append((result, error))
+            done.set()
+
+        controller.call_async(method, args, callback)
+        assert done.wait(5)
+        return outcome[0]
+
+    def test_unknown_method(self):
+        """Test that only remote methods can be called"""
+        controller = Controller(address='unix:abstract=abcdef')
+        with pytest.raises(ValueError):
+            controller.call_async('establish_connection', (), Mock())
+
+    def test_unpacked_result(self):
+        """Test that results are unpacked like the blocking methods"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = MockAsyncConnection(False)
+        assert self.call(controller, 'get_compose_port') == (3001, None)
+        assert self.call(controller, 'get_preview_ports') == (
+            [3002, 3003], None)
+        ports, _ = self.call(controller, 'get_preview_port_info')
+        assert ports[0] == PreviewPort(3002, 1, 7)
+
+    def test_unpack_error(self):
+        """Test that invalid replies are reported as error"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = MockAsyncConnection(True)
+        result, error = self.call(controller, 'get_compose_port')
+        assert result is None
+        assert isinstance(error, ConnectionReturnError)
+
+    def test_future(self):
+        """Test the asyncio facade"""
+        asyncio = pytest.importorskip('asyncio')
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = MockAsyncConnection(False)
+        loop = asyncio.new_event_loop()
+        try:
+            future = controller.aio.get_compose_port(loop=loop)
+            assert loop.run_until_complete(future) == 3001
+
+            future = controller.aio.switch(Controller.VIDEO_CHANNEL_A, 1,
+                                           loop=loop)
+            with pytest.raises(ConnectionError):
+                loop.run_until_complete(future)
+        finally:
+            loop.close()
+
+    def test_future_cancel(self):
+        """Test that cancelling the Future cancels the remote call"""
+        asyncio = pytest.importorskip('asyncio')
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = Mock()
+        controller.connection.is_connected.return_value = True
+        started = []
+        controller.connection.get_compose_port_async.side_effect = (
+            lambda callback, timeout, cancellable: started.append(
+                (timeout, cancellable)))
+        controller.main_loop_thread = Mock()
+        controller.main_loop_thread.invoke.side_effect = (
+            lambda function, *args: function(*args))
+        loop = asyncio.new_event_loop()
+        try:
+            future = controller.aio.get_compose_port(loop=loop, timeout=20)
+            timeout, cancellable = started[0]
+            assert timeout == 20
+            assert not cancellable.is_cancelled()
+            future.cancel()
+            loop.run_until_complete(asyncio.sleep(0))
+            assert cancellable.is_cancelled()
+        finally:
+            loop.close()
+
+    def test_facade_unknown_method(self):
+        """Test that the facade only exposes remote methods"""
+        controller = Controller(address='unix:abstract=abcdef')
+        with pytest.raises(AttributeError):
+            controller.aio.establish_connection()
@@ -0,0 +1,116 @@
+"""Unittests for completions.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.controller import Controller
+from gstswitch.completions import (SwitchCompleted, PipAdjusted,
+                                   TransitionCompleted, COMPLETIONS)
+from gi.repository import GLib
+from mock import Mock
+import pytest
+
+
+SIGNATURES = {
+    'switch_completed': '(uiixxb)',
+    'pip_adjusted': '(uiiiixxb)',
+    'transition_completed': '(uixxb)',
+}
+
+
+def signal(controller, name, *args):
+    """Dispatch the signal name as if it came from the server"""
+    controller.cb_signal_handler(None, None, None, None, name,
+                                 GLib.Variant(SIGNATURES[name], args), None)
+
+
+class TestCompletions(object):
+
+    """Unittests for the tuples of the completion signals"""
+
+    def test_duration(self):
+        """Test the duration in seconds"""
+        completed = SwitchCompleted(1, 65, 3003, 1000000, 1250000, True)
+        assert completed.duration == 0.25
+        assert PipAdjusted(2, 0, 0, 10, 10, 5, 5, False).duration == 0
+        assert TransitionCompleted(3, 1, 0, 2000000, True).duration == 2
+
+    def test_signals(self):
+        """Test that every completion signal is known to the Controller"""
+        assert set(COMPLETIONS) <= set(Controller.SIGNALS)
+
+
+class TestCallbacks(object):
+
+    """Unittests for the on_* methods of the completion signals"""
+
+    def test_args(self):
+        """Test that the Callbacks take the arguments of the signal"""
+        controller = Controller(address='unix:abstract=abcd')
+        test_cb = Mock()
+        controller.on_switch_completed(test_cb)
+        assert controller.callbacks['switch_completed'] == [test_cb]
+        signal(controller, 'switch_completed', 7, 65, 3004, 10, 20, True)
+        test_cb.assert_called_once_with(7, 65, 3004, 10, 20, True)
+
+    def test_tuple(self):
+        """Test that the Callbacks take one tuple with as_tuple"""
+        controller = Controller(address='unix:abstract=abcd')
+        test_cbs = {}
+        for name in COMPLETIONS:
+            test_cbs[name] = Mock()
+            getattr(controller, 'on_' + name)(test_cbs[name], as_tuple=True)
+        signal(controller, 'switch_completed', 1, 66, 3003, 10, 20, False)
+        signal(controller, 'pip_adjusted', 2, 1, 2, 30, 40, 10, 30, True)
+        signal(controller, 'transition_completed', 3, 2, 10, 40, True)
+        test_cbs['switch_completed'].assert_called_once_with(
+            SwitchCompleted(1, 66, 3003, 10, 20, False))
+        test_cbs['pip_adjusted'].assert_called_once_with(
+            PipAdjusted(2, 1, 2, 30, 40, 10, 30, True))
+        test_cbs['transition_completed'].assert_called_once_with(
+            TransitionCompleted(3, 2, 10, 40, True))
+
+    def test_unsubscribe(self):
+        """Test that the subscription removes the Callback"""
+        controller = Controller(address='unix:abstract=abcd')
+        subscription = controller.on_pip_adjusted(Mock(), as_tuple=True)
+        assert len(controller.callbacks['pip_adjusted']) == 1
+        subscription.unsubscribe()
+        assert controller.callbacks['pip_adjusted'] == []
+
+    def test_not_callable(self):
+        """Test that the Callback must be callable"""
+        controller = Controller(address='unix:abstract=abcd')
+        for name in COMPLETIONS:
+            with pytest.raises(ValueError):
+                getattr(controller, 'on_' + name)(1234)
+
+
+class TestRequests(object):
+
+    """Unittests for the methods replying the id of the request"""
+
+    def test_request_ids(self):
+        """Test that the result and the id of the request are returned"""
+        controller = Controller(address='unix:abstract=abcdef')
+        connection = Mock()
+        connection.switch_request.return_value = GLib.Variant(
+            '(bu)', (True, 7))
+        connection.set_composite_mode_request.return_value = GLib.Variant(
+            '(bu)', (False, 8))
+        connection.adjust_pip_request.return_value = GLib.Variant(
+            '(uu)', (3, 9))
+        controller._bound_connection = Mock(return_value=connection)
+        assert controller.switch_request(
+            Controller.VIDEO_CHANNEL_A, 3003) == (True, 7)
+        assert controller.set_composite_mode_request(1) == (False, 8)
+        assert controller.adjust_pip_request(1, 2, 0, 0, timeout=5) == \
+            (3, 9)
+        connection.adjust_pip_request.assert_called_once_with(
+            1, 2, 0, 0, timeout=5, cancellable=None)
+
+    def test_remote_methods(self):
+        """Test that the methods can be called without blocking too"""
+        for name in ('switch_request', 'set_composite_mode_request',
+                     'adjust_pip_request'):
+            assert name in Controller.REMOTE_METHODS
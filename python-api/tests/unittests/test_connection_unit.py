@@ -3,8 +3,11 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
 
-from gstswitch.connection import Connection
-from gstswitch.exception import ConnectionError
+import re
+from gstswitch.connection import Connection, RemoteMethod
+from gstswitch.introspection import IntrospectionCache
+from gstswitch.exception import (ConnectionError, ConnectionTimeoutError,
+                                 ConnectionUnknownMethodError)
 import pytest
 from gi.repository import Gio, GLib
 from mock import Mock
@@ -141,10 +144,57 @@ class TestConnectDBus(object):
         """Test GLib.GError exception"""
         monkeypatch.setattr(
             Gio.DBusConnection, 'new_for_address_sync',
-            Mock(return_value=1))
+            Mock(return_value=Mock()))
         conn = Connection()
         conn.connect_dbus()
         assert conn.connection is not None
+        conn.connection.connect.assert_called_once_with(
+            'closed', conn.cb_closed)
+
+
+class TestConnectionState(object):
+
+    """Unittests for is_connected, disconnect_dbus and on_closed"""
+
+    def test_not_connected(self):
+        """Test that a fresh Connection is not connected"""
+        conn = Connection()
+        assert conn.is_connected() is False
+        conn.disconnect_dbus()
+
+    def test_connected(self):
+        """Test is_connected follows the state of the Gio connection"""
+        conn = Connection()
+        conn.connection = Mock()
+        conn.connection.is_closed.return_value = False
+        assert conn.is_connected() is True
+        conn.connection.is_closed.return_value = True
+        assert conn.is_connected() is False
+
+    def test_disconnect(self):
+        """Test that disconnect_dbus unsubscribes and closes"""
+        conn = Connection()
+        conn.connection = Mock()
+        conn.connection.is_closed.return_value = False
+        conn.signal_subscriptions = {None: 7}
+        conn.disconnect_dbus()
+        conn.connection.signal_unsubscribe.assert_called_once_with(7)
+        assert conn.connection.close.call_count == 1
+        assert conn.signal_subscriptions == {}
+
+    def test_on_closed(self):
+        """Test that closed-callbacks are called"""
+        conn = Connection()
+        test_cb = Mock()
+        conn.on_closed(test_cb)
+        conn.cb_closed(None, True, None)
+        test_cb.assert_called_once_with(conn, True)
+
+    def test_on_closed_not_callable(self):
+        """Test that on_closed rejects non-callables"""
+        conn = Connection()
+        with pytest.raises(ValueError):
+            conn.on_closed(None)
 
 
 class TestSignalSubscribe(object):
@@ -206,6 +256,30 @@ class TestSignalSubscribe(object):
         with pytest.raises(ConnectionError):
             conn.signal_subscribe(test_cb)
 
+    def test_single_subscription(self):
+        """Test that subscribing again replaces the old subscription"""
+        conn = Connection()
+        conn.connection = Mock()
+        conn.connection.signal_subscribe.side_effect = [1, 2]
+        conn.signal_subscribe(lambda: None)
+        conn.signal_subscribe(lambda: None)
+        conn.connection.signal_unsubscribe.assert_called_once_with(1)
+        assert conn.signal_subscriptions == {None: 2}
+
+    def test_member_subscriptions(self):
+        """Test that every member has a subscription of its own"""
+        conn = Connection()
+        conn.connection = Mock()
+        conn.connection.signal_subscribe.side_effect = [1, 2]
+        conn.signal_subscribe(lambda: None, member='new_mode_online')
+        conn.signal_subscribe(lambda: None, member='select_face')
+        assert conn.connection.signal_subscribe.call_args[0][2] == (
+            'select_face')
+        assert not conn.connection.signal_unsubscribe.called
+        conn.signal_unsubscribe('new_mode_online')
+        conn.connection.signal_unsubscribe.assert_called_once_with(1)
+        assert conn.signal_subscriptions == {'select_face': 2}
+
 
 class MockConnection(object):
 
@@ -250,6 +324,254 @@ class MockConnection(object):
             raise GLib.GError('{0}: Test Failed'.format(self.method))
 
 
+class MockTimeoutConnection(object):
+
+    """Records the timeout and cancellable passed to call_sync"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def call_sync(self, *args):
+        """Mock of call_sync method"""
+        self.calls.append(args)
+        if self.error is not None:
+            raise self.error
+        return (3001,)
+
+
+class TestTimeout(object):
+
+    """Unittests for the default and per-call timeouts"""
+
+    def test_default(self):
+        """Test that the GLib default timeout is used by default"""
+        conn = Connection()
+        assert conn.default_timeout == -1
+
+    def test_forever(self):
+        """Test that 0 and None wait forever"""
+        for timeout in (0, None):
+            conn = Connection(default_timeout=timeout)
+            assert conn.default_timeout == GLib.MAXINT
+
+    def test_invalid(self):
+        """Test that invalid timeouts are rejected"""
+        for timeout in (-2, 'abc', []):
+            with pytest.raises(ValueError):
+                Connection(default_timeout=timeout)
+
+    def test_default_passed(self):
+        """Test that the default timeout is passed to call_sync"""
+        conn = Connection(default_timeout=500)
+        conn.connection = MockTimeoutConnection()
+        assert conn.get_compose_port() == (3001,)
+        assert conn.connection.calls[0][7:] == (500, None)
+
+    def test_per_call(self):
+        """Test that timeout and cancellable can be set per call"""
+        conn = Connection(default_timeout=500)
+        conn.connection = MockTimeoutConnection()
+        cancellable = Gio.Cancellable()
+        conn.switch(65, 3004, timeout=20, cancellable=cancellable)
+        assert conn.connection.calls[0][7:] == (20, cancellable)
+
+    def test_timeout_error(self):
+        """Test that a timed out call raises ConnectionTimeoutError"""
+        error = GLib.Error.new_literal(Gio.io_error_quark(),
+                                       'Timeout was reached',
+                                       int(Gio.IOErrorEnum.TIMED_OUT))
+        conn = Connection()
+        conn.connection = MockTimeoutConnection(error)
+        with pytest.raises(ConnectionTimeoutError):
+            conn.set_composite_mode(1)
+
+    def test_cancelled_error(self):
+        """Test that a cancelled call raises ConnectionError"""
+        error = GLib.Error.new_literal(Gio.io_error_quark(),
+                                       'Operation was cancelled',
+                                       int(Gio.IOErrorEnum.CANCELLED))
+        conn = Connection()
+        conn.connection = MockTimeoutConnection(error)
+        with pytest.raises(ConnectionError) as excinfo:
+            conn.set_composite_mode(1)
+        assert not isinstance(excinfo.value, ConnectionTimeoutError)
+
+    def test_unknown_method_error(self):
+        """Test that calling a method the server does not have raises
+        ConnectionUnknownMethodError"""
+        error = Gio.DBusError.new_for_dbus_error(
+            'org.freedesktop.DBus.Error.UnknownMethod', 'No such method')
+        conn = Connection()
+        conn.connection = MockTimeoutConnection(error)
+        with pytest.raises(ConnectionUnknownMethodError):
+            conn.get_state()
+
+
+INTROSPECTION = os.path.abspath(os.path.join(
+    __file__, '../../../../tools/gstswitchcontrollerintrospection.c'))
+
+
+class TestRemoteMethods(object):
+
+    """Unittests for the table of remote methods"""
+
+    @pytest.mark.skipif(not os.path.exists(INTROSPECTION),
+                        reason='tools/ not available')
+    def test_matches_introspection(self):
+        """Test that METHODS matches the introspection data of the server"""
+        with open(INTROSPECTION) as source:
+            xml = ''.join(re.findall(r'^\s*"(.*)"', source.read(), re.M))
+        xml = xml.replace('" SWITCH_CONTROLLER_OBJECT_NAME "', 'iface')
+        interface = Gio.DBusNodeInfo.new_for_xml(xml).interfaces[0]
+        methods = dict(
+            (method.name, (
+                '({0})'.format(''.join(arg.signature
+                                       for arg in method.in_args)),
+                '({0})'.format(''.join(arg.signature
+                                       for arg in method.out_args))))
+            for method in interface.methods)
+        assert methods == Connection.METHODS
+
+    def test_packing(self):
+        """Test that the fast packers build the same GVariants"""
+        for signature, args in (('(i)', (1,)), ('(ii)', (65, 3003)),
+                                ('(iiii)', (1, -2, 3, 4)),
+                                ('(a(iiii))', ([(1, 2, 3, 4)],))):
+            method = RemoteMethod('foo', signature, '()')
+            assert method.pack(args) == GLib.Variant(signature, args)
+        assert RemoteMethod('foo', '()', '()').pack(()) is None
+
+    def test_cached_reply_type(self):
+        """Test that the reply type is not built on every call"""
+        conn = Connection()
+        conn.connection = MockTimeoutConnection()
+        conn.set_composite_mode(1)
+        conn.set_composite_mode(2)
+        first, second = conn.connection.calls
+        assert first[5] is second[5]
+        assert first[4] == GLib.Variant('(i)', (1,))
+        assert second[4] == GLib.Variant('(i)', (2,))
+
+    def test_mark_face(self):
+        """Test that the markers are passed as tuple and no reply is
+        expected
+        """
+        conn = Connection()
+        conn.connection = MockTimeoutConnection()
+        conn.mark_face([(1, 2, 3, 4)])
+        args = conn.connection.calls[0]
+        assert args[4] == GLib.Variant('(a(iiii))', ([(1, 2, 3, 4)],))
+        assert args[5].dup_string() == '()'
+
+    def test_unknown(self):
+        """Test that unknown methods are refused"""
+        conn = Connection()
+        with pytest.raises(ValueError):
+            conn.invoke('foo')
+
+    def test_argument_count(self):
+        """Test that a wrong number of arguments fails locally"""
+        conn = Connection()
+        conn.connection = MockTimeoutConnection()
+        with pytest.raises(TypeError):
+            conn.invoke('switch', (65,))
+        assert conn.connection.calls == []
+
+
+XML = """<node>
+  <interface name='us.timvideos.gstswitch.SwitchControllerInterface'>
+    <method name='get_version'>
+      <arg type='s' name='version' direction='out'/>
+    </method>
+    <method name='switch'>
+      <arg type='i' name='channel' direction='in'/>
+      <arg type='i' name='port' direction='in'/>
+      <arg type='b' name='result' direction='out'/>
+    </method>
+    <method name='fade'>
+      <arg type='i' name='duration' direction='in'/>
+      <arg type='b' name='result' direction='out'/>
+    </method>
+  </interface>
+</node>"""
+
+
+class MockIntrospectConnection(object):
+
+    """Answers get_version and Introspect, records all calls"""
+
+    def __init__(self, version='0.0.1'):
+        self.version = version
+        self.calls = []
+
+    def call_sync(self, *args):
+        """Mock of call_sync method"""
+        self.calls.append(args)
+        if args[3] == 'get_version':
+            if self.version is None:
+                raise GLib.GError('No such method')
+            return GLib.Variant('(s)', (self.version,))
+        if args[3] == 'Introspect':
+            assert args[2] == 'org.freedesktop.DBus.Introspectable'
+            return GLib.Variant('(s)', (XML,))
+        return GLib.Variant('(b)', (True,))
+
+
+class TestIntrospect(object):
+
+    """Unittests for building the methods from introspection data"""
+
+    def test_load_methods(self):
+        """Test that the methods of the server replace the built-in ones"""
+        conn = Connection()
+        conn.connection = MockIntrospectConnection()
+        conn.load_methods()
+        assert sorted(conn.methods) == ['fade', 'get_version', 'switch']
+        assert conn.methods['switch'] is Connection.REMOTE_METHODS['switch']
+        assert conn.server_version == '0.0.1'
+        with pytest.raises(ValueError):
+            conn.invoke('get_compose_port')
+
+    def test_new_method(self):
+        """Test that methods unknown to the client can be called"""
+        conn = Connection()
+        conn.connection = MockIntrospectConnection()
+        conn.load_methods()
+        assert conn.fade(500).unpack() == (True,)
+        call = conn.connection.calls[-1]
+        assert call[3] == 'fade'
+        assert call[4] == GLib.Variant('(i)', (500,))
+        with pytest.raises(TypeError):
+            conn.fade()
+        with pytest.raises(AttributeError):
+            getattr(conn, 'foo')
+
+    def test_cache(self, tmpdir):
+        """Test that the data is introspected once per version"""
+        cache = IntrospectionCache(str(tmpdir))
+        conn = Connection()
+        conn.connection = MockIntrospectConnection()
+        conn.load_methods(cache)
+        assert cache.load('0.0.1') == XML
+
+        conn.connection = MockIntrospectConnection()
+        conn.load_methods(cache)
+        assert [call[3] for call in conn.connection.calls] == [
+            'get_version']
+        assert 'fade' in conn.methods
+
+    def test_without_version(self, tmpdir):
+        """Test that servers without get_version are not cached"""
+        cache = IntrospectionCache(str(tmpdir))
+        conn = Connection()
+        conn.connection = MockIntrospectConnection(version=None)
+        conn.load_methods(cache)
+        assert conn.server_version is None
+        assert 'fade' in conn.methods
+        assert tmpdir.listdir() == []
+
+
 def test_get_compose_port():
     """Test the get_compose_port method"""
     default_interface = "us.timvideos.gstswitch"
@@ -306,6 +628,26 @@ def test_get_preview_ports():
     assert conn.get_preview_ports() == ('[(3002, 1, 7), (3003, 1, 8)]',)
 
 
+def test_get_preview_port_info():
+    """Test the get_preview_port_info method"""
+    conn = Connection()
+    conn.connection = MockTimeoutConnection()
+    conn.get_preview_port_info()
+    args = conn.connection.calls[0]
+    assert args[3] == 'get_preview_port_info'
+    assert args[5].dup_string() == '(a(iii))'
+
+
+def test_get_state():
+    """Test the get_state method"""
+    conn = Connection()
+    conn.connection = MockTimeoutConnection()
+    conn.get_state()
+    args = conn.connection.calls[0]
+    assert args[3] == 'get_state'
+    assert args[5].dup_string() == '(a{sv})'
+
+
 def test_set_composite_mode():
     """Test the set_composite_mode method"""
     default_interface = "us.timvideos.gstswitch"
@@ -434,3 +776,200 @@ def test_mark_tracking():
     conn.connection = MockConnection('mark_tracking')
     face = [(1, 1, 1, 1), (2, 2, 2, 2)]
     assert conn.mark_tracking(face) is None
+
+
+class TestBatch(object):
+
+    """Unittests for the batch method"""
+
+    def test_pack(self):
+        """Test that operations are packed with their signatures"""
+        packed = Connection.pack_batch([('switch', (65, 3003)),
+                                        ('set_composite_mode', [1]),
+                                        ('adjust_pip', (1, 2, 3, 4))])
+        assert packed.get_type_string() == '(a(sv))'
+        assert packed.unpack() == ([('switch', (65, 3003)),
+                                    ('set_composite_mode', (1,)),
+                                    ('adjust_pip', (1, 2, 3, 4))],)
+
+    def test_unknown_method(self):
+        """Test that only supported methods can be batched"""
+        with pytest.raises(ValueError):
+            Connection.pack_batch([('new_record', ())])
+
+    def test_call(self):
+        """Test that the batch is sent in one call"""
+        conn = Connection()
+        conn.connection = MockTimeoutConnection()
+        conn.batch([('switch', (65, 3003)), ('switch', (66, 3004))])
+        assert len(conn.connection.calls) == 1
+        args = conn.connection.calls[0]
+        assert args[3] == 'batch'
+        assert args[5].dup_string() == '(av)'
+
+
+class MockAsyncConnection(object):
+
+    """Mocks the asynchronous call/call_finish pair of Gio.DBusConnection"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    def call(self, *args):
+        """Mock of call, completes immediately"""
+        self.calls.append(args)
+        callback, user_data = args[9], args[10]
+        callback(self, 'async-result', user_data)
+
+    def call_finish(self, result):
+        """Mock of call_finish"""
+        assert result == 'async-result'
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestCallAsync(object):
+
+    """Unittests for call_async and the *_async methods"""
+
+    def test_callback_not_callable(self):
+        """Test if callback is not callable"""
+        conn = Connection()
+        conn.connection = MockAsyncConnection()
+        with pytest.raises(ValueError):
+            conn.call_async('get_compose_port', None, '(i)', None)
+
+    def test_result(self):
+        """Test that the reply is passed to the callback"""
+        conn = Connection()
+        conn.connection = MockAsyncConnection(result=(3001,))
+        test_cb = Mock()
+        conn.get_compose_port_async(test_cb)
+        test_cb.assert_called_once_with((3001,), None)
+        args = conn.connection.calls[0]
+        assert args[3] == 'get_compose_port'
+        assert args[5].dup_string() == '(i)'
+
+    def test_arguments(self):
+        """Test that arguments are packed into a GVariant tuple"""
+        conn = Connection()
+        conn.connection = MockAsyncConnection(result=(True,))
+        test_cb = Mock()
+        conn.switch_async(65, 3004, test_cb)
+        args = conn.connection.calls[0]
+        assert args[4].unpack() == (65, 3004)
+        test_cb.assert_called_once_with((True,), None)
+
+    def test_error(self):
+        """Test that a GError is passed to the callback as ConnectionError"""
+        conn = Connection()
+        conn.connection = MockAsyncConnection(error=GLib.GError('Boom!'))
+        test_cb = Mock()
+        conn.new_record_async(test_cb)
+        result, error = test_cb.call_args[0]
+        assert result is None
+        assert isinstance(error, ConnectionError)
+
+    def test_timeout(self):
+        """Test that timeout and cancellable are passed to call"""
+        conn = Connection(default_timeout=500)
+        conn.connection = MockAsyncConnection(result=(3001,))
+        conn.get_compose_port_async(Mock())
+        assert conn.connection.calls[0][7:9] == (500, None)
+
+        cancellable = Gio.Cancellable()
+        conn.get_audio_port_async(Mock(), timeout=20,
+                                  cancellable=cancellable)
+        assert conn.connection.calls[1][7:9] == (20, cancellable)
+
+    def test_generated(self):
+        """Test that every remote method has an *_async variant, which takes
+        timeout and cancellable positionally too"""
+        conn = Connection()
+        conn.connection = MockAsyncConnection(result=(True,))
+        for name in Connection.METHODS:
+            assert callable(getattr(conn, name + '_async'))
+        with pytest.raises(AttributeError):
+            getattr(conn, 'foo_async')
+        cancellable = Gio.Cancellable()
+        test_cb = Mock()
+        conn.adjust_pip_async(1, 2, 3, 4, test_cb, 20, cancellable)
+        args = conn.connection.calls[0]
+        assert args[4].unpack() == (1, 2, 3, 4)
+        assert args[7:9] == (20, cancellable)
+        test_cb.assert_called_once_with((True,), None)
+
+    def test_timeout_error(self):
+        """Test that a timed out call reports ConnectionTimeoutError"""
+        error = GLib.Error.new_literal(Gio.io_error_quark(),
+                                       'Timeout was reached',
+                                       int(Gio.IOErrorEnum.TIMED_OUT))
+        conn = Connection()
+        conn.connection = MockAsyncConnection(error=error)
+        test_cb = Mock()
+        conn.new_record_async(test_cb)
+        assert isinstance(test_cb.call_args[0][1], ConnectionTimeoutError)
+
+
+class MockSendConnection(object):
+
+    """Records the messages sent"""
+
+    def __init__(self, error=None):
+        self.messages = []
+        self.flushed = 0
+        self.error = error
+
+    def send_message(self, message, flags):
+        """Mock of send_message"""
+        if self.error is not None:
+            raise self.error
+        assert flags == Gio.DBusSendMessageFlags.NONE
+        self.messages.append(message)
+        return True, len(self.messages)
+
+    def flush_sync(self, cancellable):
+        """Mock of flush_sync"""
+        self.flushed += 1
+        return True
+
+
+class TestSend(object):
+
+    """Unittests for send"""
+
+    def test_message(self):
+        """Test that the message asks for no reply"""
+        conn = Connection()
+        conn.connection = MockSendConnection()
+        conn.send('mark_face', ([(1, 2, 3, 4)],))
+        message = conn.connection.messages[0]
+        assert message.get_member() == 'mark_face'
+        assert message.get_interface() == conn.default_interface
+        assert message.get_path() == conn.object_path
+        assert message.get_body().unpack() == ([(1, 2, 3, 4)],)
+        assert message.get_flags() & \
+            Gio.DBusMessageFlags.NO_REPLY_EXPECTED
+        assert conn.connection.flushed == 0
+
+    def test_flush(self):
+        """Test waiting for the message to be written"""
+        conn = Connection()
+        conn.connection = MockSendConnection()
+        conn.send('new_record', flush=True)
+        assert conn.connection.messages[0].get_body() is None
+        assert conn.connection.flushed == 1
+
+    def test_errors(self):
+        """Test invalid calls and a closed connection"""
+        conn = Connection()
+        conn.connection = MockSendConnection(error=GLib.GError('closed'))
+        with pytest.raises(ValueError):
+            conn.send('foo')
+        with pytest.raises(TypeError):
+            conn.send('mark_face')
+        with pytest.raises(ConnectionError):
+            conn.send('mark_face', ([],))
@@ -1,10 +1,14 @@
 """Unittests for Controller class in controller.py"""
 import sys
 import os
+import threading
+import time
+from array import array
 sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
 
-from gstswitch.controller import Controller
-from gstswitch.exception import ConnectionReturnError
+from gstswitch.controller import (Controller, Batch, PreviewPort,
+                                  ServerState)
+from gstswitch.exception import ConnectionError, ConnectionReturnError
 import pytest
 from mock import Mock
 from gstswitch.connection import Connection
@@ -115,6 +119,153 @@ class TestEstablishConnection(object):
         controller.establish_connection()
         assert controller.connection is not None
 
+    def test_reuse(self, monkeypatch):
+        """Test that an open connection is reused"""
+        connect = Mock()
+        monkeypatch.setattr(Connection, 'connect_dbus', connect)
+        monkeypatch.setattr(Connection, 'signal_subscribe', Mock())
+        monkeypatch.setattr(Connection, 'is_connected',
+                            Mock(return_value=True))
+        controller = Controller(address='unix:abstract=abcd')
+        controller.establish_connection()
+        connection = controller.connection
+        controller.establish_connection()
+        assert controller.connection is connection
+        assert connect.call_count == 1
+
+    def test_force(self, monkeypatch):
+        """Test that force always makes a new connection"""
+        monkeypatch.setattr(Connection, 'connect_dbus', Mock())
+        monkeypatch.setattr(Connection, 'disconnect_dbus', Mock())
+        monkeypatch.setattr(Connection, 'signal_subscribe', Mock())
+        monkeypatch.setattr(Connection, 'is_connected',
+                            Mock(return_value=True))
+        controller = Controller(address='unix:abstract=abcd')
+        controller.establish_connection()
+        connection = controller.connection
+        controller.establish_connection(force=True)
+        assert controller.connection is not connection
+
+    def test_reconnect_when_closed(self, monkeypatch):
+        """Test that a closed connection is replaced"""
+        monkeypatch.setattr(Connection, 'connect_dbus', Mock())
+        monkeypatch.setattr(Connection, 'disconnect_dbus', Mock())
+        monkeypatch.setattr(Connection, 'signal_subscribe', Mock())
+        monkeypatch.setattr(Connection, 'is_connected',
+                            Mock(return_value=False))
+        controller = Controller(address='unix:abstract=abcd')
+        controller.establish_connection()
+        connection = controller.connection
+        controller.establish_connection()
+        assert controller.connection is not connection
+
+    def test_reconnect_backoff(self, monkeypatch):
+        """Test that reconnecting is retried with a growing delay"""
+        import gstswitch.controller
+        sleep = Mock()
+        monkeypatch.setattr(gstswitch.controller, 'sleep', sleep)
+        monkeypatch.setattr(Connection, 'disconnect_dbus', Mock())
+        monkeypatch.setattr(Connection, 'signal_subscribe', Mock())
+        monkeypatch.setattr(Connection, 'connect_dbus', Mock(
+            side_effect=[ConnectionError('down'), ConnectionError('down'),
+                         None]))
+        controller = Controller(address='unix:abstract=abcd')
+        controller.connection = Mock()
+        controller.connection.is_connected.return_value = False
+        controller.establish_connection()
+        assert [c[0][0] for c in sleep.call_args_list] == [
+            Controller.RECONNECT_BACKOFF, Controller.RECONNECT_BACKOFF * 2]
+
+    def test_first_connect_fails_fast(self, monkeypatch):
+        """Test that the first connection attempt is not retried"""
+        monkeypatch.setattr(Connection, 'connect_dbus',
+                            Mock(side_effect=ConnectionError('down')))
+        controller = Controller(address='unix:abstract=abcd')
+        with pytest.raises(ConnectionError):
+            controller.establish_connection()
+        assert controller.connection is None
+
+    def test_close(self):
+        """Test that close drops the connection"""
+        controller = Controller(address='unix:abstract=abcd')
+        connection = Mock()
+        controller.connection = connection
+        controller.close()
+        connection.disconnect_dbus.assert_called_once_with()
+        assert controller.connection is None
+        assert controller.is_connected() is False
+
+
+class TestThreaded(object):
+
+    """Test the threaded mode"""
+
+    def test_own_thread(self):
+        """Test that a threaded Controller has a MainLoopThread of its own"""
+        controller = Controller(address='unix:abstract=abcd', threaded=True)
+        assert controller.main_loop_thread is not None
+        assert controller.main_loop_thread is not \
+            Controller(address='unix:abstract=abcd',
+                       threaded=True).main_loop_thread
+        assert Controller(address='unix:abstract=abcd').main_loop_thread \
+            is None
+
+    def test_subscribe_in_loop_thread(self, monkeypatch):
+        """Test that connecting happens in the calling thread and
+        subscribing in the loop thread"""
+        threads = []
+
+        def record(*_, **__):
+            """Remember the calling thread"""
+            threads.append(threading.current_thread())
+
+        monkeypatch.setattr(Connection, 'connect_dbus', record)
+        monkeypatch.setattr(Connection, 'signal_subscribe', record)
+        monkeypatch.setattr(Connection, 'is_connected',
+                            Mock(return_value=True))
+        controller = Controller(address='unix:abstract=abcd', threaded=True)
+        try:
+            controller.establish_connection()
+            controller.on_select_face(Mock())
+            loop_thread = controller.main_loop_thread._thread
+            assert threads == [threading.current_thread(), loop_thread]
+        finally:
+            controller.main_loop_thread.stop()
+
+    def test_concurrent_connect(self, monkeypatch):
+        """Test that concurrent callers share a single new connection"""
+        for threaded in (False, True):
+            connect = Mock(side_effect=lambda: time.sleep(0.01))
+            monkeypatch.setattr(Connection, 'connect_dbus', connect)
+            monkeypatch.setattr(Connection, 'is_connected',
+                                Mock(return_value=True))
+            controller = Controller(address='unix:abstract=abcd',
+                                    threaded=threaded)
+            connections = []
+
+            def keep(controller=controller, connections=connections):
+                """Connect and keep the connection"""
+                controller.establish_connection()
+                connections.append(controller.connection)
+            workers = [threading.Thread(target=keep) for _ in range(5)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            assert connect.call_count == 1
+            assert len(set(connections)) == 1
+            if threaded:
+                controller.main_loop_thread.stop()
+
+    def test_closed_meanwhile(self):
+        """Test that a connection closed between connecting and the call
+        raises ConnectionError instead of AttributeError"""
+        controller = Controller(address='unix:abstract=abcd')
+        controller.establish_connection = Mock(return_value=None)
+        controller.connection = None
+        with pytest.raises(ConnectionError):
+            controller.get_compose_port()
+
 
 class TestSignalHandler(object):
 
@@ -178,6 +329,61 @@ class TestSignalHandler(object):
             assert test_cbs[signal].call_count == 3
 
 
+class TestSubscribe(object):
+
+    """Test the subscribe and unsubscribe methods"""
+
+    def test_handle(self):
+        """Test that on_* returns a handle to unsubscribe"""
+        controller = Controller(address='unix:abstract=abcd')
+        test_cb = Mock()
+        subscription = controller.on_new_mode_online(test_cb)
+        assert controller.callbacks['new_mode_online'] == [test_cb]
+        assert controller.unsubscribe(subscription) is True
+        assert controller.callbacks['new_mode_online'] == []
+
+    def test_subscribed_on_connect(self, monkeypatch):
+        """Test that only signals with callbacks are subscribed"""
+        monkeypatch.setattr(Connection, 'connect_dbus', Mock())
+        signal_subscribe = Mock()
+        monkeypatch.setattr(Connection, 'signal_subscribe', signal_subscribe)
+        controller = Controller(address='unix:abstract=abcd')
+        controller.on_select_face(Mock())
+        controller.establish_connection()
+        signal_subscribe.assert_called_once_with(
+            controller.cb_signal_handler, member='select_face')
+
+        controller.subscribe('new_mode_online', Mock())
+        assert signal_subscribe.call_count == 2
+        assert signal_subscribe.call_args[1] == {'member': 'new_mode_online'}
+
+    def test_marker_delta(self):
+        """Test that marker callbacks can get the changed markers only"""
+        controller = Controller(address='unix:abstract=abcd')
+        test_cb = Mock()
+        controller.on_show_face_marker(test_cb, delta=True)
+        for _ in range(2):
+            controller.cb_signal_handler(
+                None, None, None, None, 'show_face_marker',
+                GLib.Variant('(a(iiii))', ([(1, 2, 3, 4)],)), None)
+        test_cb.assert_called_once_with([(1, 2, 3, 4)], [])
+
+    def test_marker_array(self):
+        """Test that marker callbacks can get the markers as array"""
+        controller = Controller(address='unix:abstract=abcd')
+        test_cb = Mock()
+        controller.on_show_track_marker(test_cb, as_array='array')
+        controller.cb_signal_handler(
+            None, None, None, None, 'show_track_marker',
+            GLib.Variant('(a(iiii))', ([(1, 2, 3, 4), (5, 6, 7, 8)],)), None)
+        assert test_cb.call_args[0][0] == array('i', range(1, 9))
+        with pytest.raises(ValueError):
+            controller.on_show_face_marker(test_cb, as_array='list')
+        with pytest.raises(ValueError):
+            controller.on_show_face_marker(test_cb, delta=True,
+                                           as_array='array')
+
+
 class MockConnection(object):
 
     """A class which mocks the Connection class"""
@@ -185,88 +391,101 @@ class MockConnection(object):
     def __init__(self, mode):
         self.mode = mode
 
-    def get_compose_port(self):
+    def is_connected(self):
+        """mock of is_connected"""
+        return True
+
+    def get_compose_port(self, timeout=None, cancellable=None):
         """mock of get_compose_port"""
         if self.mode is False:
             return GLib.Variant('(i)', (3001,))
         else:
             return (0,)
 
-    def get_encode_port(self):
+    def get_encode_port(self, timeout=None, cancellable=None):
         """mock of get_encode_port"""
         if self.mode is False:
             return GLib.Variant('(i)', (3002,))
         else:
             return (0,)
 
-    def get_audio_port(self):
+    def get_audio_port(self, timeout=None, cancellable=None):
         """mock of get_audio_port"""
         if self.mode is False:
             return GLib.Variant('(i)', (4000,))
         else:
             return (0,)
 
-    def get_preview_ports(self):
+    def get_preview_ports(self, timeout=None, cancellable=None):
         """mock of get_preview_ports"""
         if self.mode is False:
             return GLib.Variant('(s)', ('[(3002, 1, 7), (3003, 1, 8)]',))
         else:
             return (0,)
 
-    def set_composite_mode(self, mode):
+    def get_preview_port_info(self, timeout=None, cancellable=None):
+        """mock of get_preview_port_info"""
+        if self.mode is False:
+            return GLib.Variant('(a(iii))', ([(3002, 1, 7), (3003, 2, 8)],))
+        else:
+            return (0,)
+
+    def set_composite_mode(self, mode, timeout=None, cancellable=None):
         """mock of set_composite_mode"""
         if self.mode is False:
             return GLib.Variant('(b)', (True,))
         else:
             return (False,)
 
-    def get_composite_mode(self):
+    def get_composite_mode(self, timeout=None, cancellable=None):
         """mock of set_composite_mode"""
         if self.mode is False:
             return GLib.Variant('(i)', (0,))
         else:
             return (False,)
 
-    def set_encode_mode(self, mode):
+    def set_encode_mode(self, mode, timeout=None, cancellable=None):
         """mock of get_set_encode_mode"""
         if self.mode is False:
             return GLib.Variant('(b)', (True,))
         else:
             return (True,)
 
-    def new_record(self):
+    def new_record(self, timeout=None, cancellable=None):
         """mock of new_record"""
         if self.mode is False:
             return GLib.Variant('(b)', (True,))
         else:
             return (True,)
 
-    def adjust_pip(self, xpos, ypos, width, height):
+    def adjust_pip(self, xpos, ypos, width, height,
+                   timeout=None, cancellable=None):
         """mock of adjust_pip"""
         if self.mode is False:
             return GLib.Variant('(u)', (1,))
         else:
             return (1,)
 
-    def switch(self, channel, port):
+    def switch(self, channel, port, timeout=None, cancellable=None):
         """mock of switch"""
         if self.mode is False:
             return GLib.Variant('(b)', (True,))
         else:
             return (True,)
 
-    def click_video(self, xpos, ypos, width, height):
+    def click_video(self, xpos, ypos, width, height,
+                    timeout=None, cancellable=None):
         """mock of click_video"""
         if self.mode is False:
             return GLib.Variant('(b)', (True,))
         else:
             return (True,)
 
-    def mark_face(self, face):
+    def mark_face(self, face, timeout=None, cancellable=None):
         """mock of mark_face"""
         pass
 
-    def mark_tracking(self, face):
+    def mark_tracking(self, face, timeout=None, cancellable=None):
         """mock of mark_tracking"""
         pass
 
@@ -344,6 +563,79 @@ class TestGetPreviewPorts(object):
         assert controller.get_preview_ports() == [3001, 3002]
 
 
+class TestGetPreviewPortInfo(object):
+
+    """Test the get_preview_port_info method"""
+
+    def test_unpack(self):
+        """Test if unpack fails"""
+        controller = Controller(address='unix:abstract=abcdefghijk')
+        controller.connection = MockConnection(True)
+        with pytest.raises(ConnectionReturnError):
+            controller.get_preview_port_info()
+
+    def test_normal_unpack(self):
+        """Test if valid"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = MockConnection(False)
+        ports = controller.get_preview_port_info()
+        assert ports == [(3002, 1, 7), (3003, 2, 8)]
+        assert isinstance(ports[0], PreviewPort)
+        assert ports[1].port == 3003
+        assert ports[1].serve == Controller.SERVE_AUDIO_STREAM
+        assert ports[1].type == 8
+
+
+class TestGetVersion(object):
+
+    """Test the get_version method"""
+
+    def test_normal_unpack(self):
+        """Test if valid"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = Mock()
+        controller.connection.get_version.return_value = GLib.Variant(
+            '(s)', ('0.0.1',))
+        assert controller.get_version() == '0.0.1'
+
+    def test_introspect_passed(self, monkeypatch):
+        """Test that introspect is passed to the Connection"""
+        import gstswitch.controller
+        connection = Mock()
+        monkeypatch.setattr(gstswitch.controller, 'Connection', connection)
+        controller = Controller(address='unix:abstract=abcdef',
+                                introspect=True)
+        controller.establish_connection()
+        assert connection.call_args[1]['introspect'] is True
+
+
+class TestGetState(object):
+
+    """Test the get_state method"""
+
+    def test_unpack(self):
+        """Test if unpack fails"""
+        controller = Controller(address='unix:abstract=abcdefghijk')
+        controller.connection = Mock()
+        controller.connection.get_state.return_value = (0,)
+        with pytest.raises(ConnectionReturnError):
+            controller.get_state()
+
+    def test_normal_unpack(self):
+        """Test if valid"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = Mock()
+        controller.connection.get_state.return_value = GLib.Variant(
+            '(a{sv})', ({'composite_mode': GLib.Variant('i', 2),
+                         'channel_a': GLib.Variant('i', 3003)},))
+        state = controller.get_state(timeout=20)
+        assert isinstance(state, ServerState)
+        assert state.composite_mode == Controller.COMPOSITE_DUAL_PREVIEW
+        assert state.channel_a == 3003
+        controller.connection.get_state.assert_called_once_with(
+            timeout=20, cancellable=None)
+
+
 class TestSetCompositeMode(object):
 
     """Test the set_composite_mode method"""
@@ -509,6 +801,18 @@ class TestMarkTracking(object):
         face = [(1, 2, 3, 4), (1, 1, 1, 1)]
         controller.mark_tracking(face)
 
+    def test_no_reply(self):
+        """Test sending without waiting for the reply"""
+        controller = Controller(address='unix:abstract=abcde')
+        controller.establish_connection = Mock(return_value=None)
+        controller.connection = Mock()
+        face = [(1, 2, 3, 4)]
+        controller.mark_face(face, no_reply=True)
+        controller.mark_tracking(face, no_reply=True)
+        assert controller.connection.send.call_args_list == [
+            (('mark_face', (face,)),), (('mark_tracking', (face,)),)]
+        assert not controller.connection.mark_face.called
+
 
 class TestParsePreviewPorts(object):
 
@@ -533,3 +837,95 @@ class TestParsePreviewPorts(object):
         controller = Controller(address='unix:abstract=abcde')
         test = '[(1, 2, 3), (2, 2, 2)]'
         assert controller.parse_preview_ports(test) == [1, 2]
+
+
+class TestTimeout(object):
+
+    """Test the default and per-call timeouts"""
+
+    def test_default(self):
+        """Test that the GLib default timeout is used by default"""
+        controller = Controller(address='unix:abstract=abcdef')
+        assert controller.timeout == -1
+
+    def test_passed_to_connection(self, monkeypatch):
+        """Test that the timeout becomes the default of the Connection"""
+        import gstswitch.controller
+        connection = Mock()
+        connection_class = Mock(return_value=connection)
+        monkeypatch.setattr(gstswitch.controller, 'Connection',
+                            connection_class)
+        controller = Controller(address='unix:abstract=abcdef', timeout=500)
+        controller.establish_connection()
+        assert connection_class.call_args[1]['default_timeout'] == 500
+
+    def test_per_call(self):
+        """Test that timeout and cancellable are passed through"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = Mock()
+        controller.connection.is_connected.return_value = True
+        controller.connection.set_composite_mode.return_value = (
+            GLib.Variant('(b)', (True,)))
+        cancellable = Mock()
+        assert controller.set_composite_mode(
+            Controller.COMPOSITE_PIP, timeout=20, cancellable=cancellable)
+        controller.connection.set_composite_mode.assert_called_once_with(
+            Controller.COMPOSITE_PIP, timeout=20, cancellable=cancellable)
+
+
+class TestBatch(object):
+
+    """Test the batch context manager"""
+
+    def controller(self):
+        """Controller with a mocked connection"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.connection = Mock()
+        controller.connection.is_connected.return_value = True
+        controller.connection.batch.return_value = GLib.Variant(
+            '(av)', ([GLib.Variant('b', True), GLib.Variant('u', 3)],))
+        return controller
+
+    def test_batch(self):
+        """Test that all operations are applied in one call"""
+        controller = self.controller()
+        with controller.batch(timeout=20) as batch:
+            batch.switch(Controller.VIDEO_CHANNEL_A, 3003)
+            batch.adjust_pip(1, 2, 3, 4)
+            assert not controller.connection.batch.called
+        controller.connection.batch.assert_called_once_with(
+            [('switch', (Controller.VIDEO_CHANNEL_A, 3003)),
+             ('adjust_pip', (1, 2, 3, 4))], timeout=20, cancellable=None)
+        assert batch.results == [True, 3]
+
+    def test_empty(self):
+        """Test that an empty batch is not sent"""
+        controller = self.controller()
+        with controller.batch() as batch:
+            pass
+        assert not controller.connection.batch.called
+        assert batch.results == []
+
+    def test_exception(self):
+        """Test that nothing is sent when the block raises"""
+        controller = self.controller()
+        with pytest.raises(KeyError):
+            with controller.batch() as batch:
+                batch.switch(Controller.VIDEO_CHANNEL_A, 3003)
+                raise KeyError()
+        assert not controller.connection.batch.called
+
+    def test_invalid_mode(self):
+        """Test that unsupported modes are rejected"""
+        batch = Batch()
+        with pytest.raises(ValueError):
+            batch.set_composite_mode(4)
+        batch.set_composite_mode(Controller.COMPOSITE_DUAL_EQUAL)
+        assert len(batch) == 1
+
+    def test_unpack(self):
+        """Test that invalid replies raise ConnectionReturnError"""
+        controller = self.controller()
+        controller.connection.batch.return_value = (0,)
+        with pytest.raises(ConnectionReturnError):
+            controller.apply_batch([('switch', (65, 3003))])
@@ -0,0 +1,187 @@
+"""Unittests for events.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import threading
+
+from gstswitch.controller import Controller
+from gstswitch.events import Event, EventStream
+from gi.repository import GLib
+from six.moves.queue import Empty
+import pytest
+
+
+def signal(controller, name, *args):
+    """Dispatch the signal name as if it came from the server"""
+    signature = '({0})'.format('i' * len(args))
+    controller.cb_signal_handler(None, None, None, None, name,
+                                 GLib.Variant(signature, args), None)
+
+
+class TestEventStream(object):
+
+    """Unittests for the EventStream"""
+
+    def test_invalid(self):
+        """Test invalid arguments"""
+        controller = Controller(address='unix:abstract=abcdef')
+        with pytest.raises(ValueError):
+            controller.events(policy='newest')
+        with pytest.raises(ValueError):
+            controller.events(maxsize=0)
+        with pytest.raises(ValueError):
+            controller.events(['new_mode_online', 'foo'])
+        assert not any(controller.signals.callbacks.values())
+
+    def test_get(self):
+        """Test reading events in order"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(['new_mode_online',
+                                    'preview_port_added'])
+        signal(controller, 'new_mode_online', 1)
+        signal(controller, 'preview_port_added', 3003, 1, 2)
+        signal(controller, 'select_face', 1, 2)
+        assert events.qsize() == 2
+        assert events.get() == Event('new_mode_online', (1,))
+        assert events.get() == Event('preview_port_added', (3003, 1, 2))
+        with pytest.raises(Empty):
+            events.get(timeout=0)
+
+    def test_batch(self):
+        """Test reading events in batches"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events()
+        for mode in range(5):
+            signal(controller, 'new_mode_online', mode)
+        assert [event.args for event in events.get_batch(3)] == [
+            (0,), (1,), (2,)]
+        assert len(events.get_batch()) == 2
+        assert events.get_batch(timeout=0.01) == []
+
+    def test_close(self):
+        """Test that iterating ends after the queued events"""
+        controller = Controller(address='unix:abstract=abcdef')
+        with controller.events(['new_mode_online']) as events:
+            signal(controller, 'new_mode_online', 1)
+        signal(controller, 'new_mode_online', 2)
+        assert list(events) == [Event('new_mode_online', (1,))]
+        assert not controller.signals.callbacks['new_mode_online']
+
+    def test_drop_oldest(self):
+        """Test that the oldest events are dropped when full"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(maxsize=2, policy='drop-oldest')
+        for mode in range(4):
+            signal(controller, 'new_mode_online', mode)
+        assert [event.args for event in events.get_batch()] == [(2,), (3,)]
+        assert events.dropped == 2
+
+    def test_coalesce(self):
+        """Test that only the latest event of each signal is kept"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(policy='coalesce')
+        signal(controller, 'new_mode_online', 1)
+        signal(controller, 'preview_port_added', 3003, 1, 2)
+        signal(controller, 'new_mode_online', 2)
+        assert events.get_batch() == [
+            Event('preview_port_added', (3003, 1, 2)),
+            Event('new_mode_online', (2,))]
+        assert events.dropped == 1
+
+    def test_block(self):
+        """Test that a producer waits for room in the queue"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(maxsize=1, policy='block')
+        signal(controller, 'new_mode_online', 1)
+        producer = threading.Thread(
+            target=signal, args=(controller, 'new_mode_online', 2))
+        producer.start()
+        producer.join(0.05)
+        assert producer.is_alive()
+        assert events.get() == Event('new_mode_online', (1,))
+        producer.join(5)
+        assert not producer.is_alive()
+        assert events.get() == Event('new_mode_online', (2,))
+        assert events.dropped == 0
+
+    def test_block_close(self):
+        """Test that closing releases a waiting producer"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(maxsize=1, policy='block')
+        events.put(Event('new_mode_online', (1,)))
+        producer = threading.Thread(
+            target=events.put, args=(Event('new_mode_online', (2,)),))
+        producer.start()
+        events.close()
+        producer.join(5)
+        assert not producer.is_alive()
+        assert events.get_batch() == [Event('new_mode_online', (1,))]
+
+    def test_block_close_threaded(self):
+        """Test that closing does not wait for the MainLoopThread while it
+        is blocked on a full queue"""
+        controller = Controller(address='unix:abstract=abcdef',
+                                threaded=True)
+        try:
+            events = controller.events(maxsize=1, policy='block')
+            loop_thread = controller.main_loop_thread
+            loop_thread.invoke(signal, controller, 'new_mode_online', 1)
+            loop_thread.invoke(signal, controller, 'new_mode_online', 2)
+            closer = threading.Timer(0.05, events.close)
+            closer.start()
+            closer.join(5)
+            assert not closer.is_alive()
+            assert events.get_batch() == [Event('new_mode_online', (1,))]
+        finally:
+            controller.main_loop_thread.stop()
+
+    def test_default_policy(self):
+        """Test that a full queue drops the oldest event by default"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(maxsize=1)
+        signal(controller, 'new_mode_online', 1)
+        signal(controller, 'new_mode_online', 2)
+        assert events.get_batch() == [Event('new_mode_online', (2,))]
+        assert events.dropped == 1
+
+    def test_pump(self):
+        """Test that reading runs the MainContext without a MainLoop"""
+        controller = Controller(address='unix:abstract=abcdef')
+        events = controller.events(['new_mode_online'])
+
+        def emit():
+            """Signal from inside the MainContext"""
+            signal(controller, 'new_mode_online', 3)
+            return False
+        GLib.idle_add(emit)
+        assert events.get(timeout=5) == Event('new_mode_online', (3,))
+        with pytest.raises(Empty):
+            events.get(timeout=0.01)
+        events.close()
+
+    def test_async(self):
+        """Test async iteration"""
+        asyncio = pytest.importorskip('asyncio')
+        controller = Controller(address='unix:abstract=abcdef')
+        events = EventStream(controller, ['new_mode_online'])
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            assert events.__aiter__() is events
+            signal(controller, 'new_mode_online', 1)
+            assert loop.run_until_complete(events.__anext__()) == \
+                Event('new_mode_online', (1,))
+
+            thread = threading.Timer(
+                0.01, signal, (controller, 'new_mode_online', 2))
+            thread.start()
+            assert loop.run_until_complete(events.__anext__()) == \
+                Event('new_mode_online', (2,))
+
+            threading.Timer(0.01, events.close).start()
+            with pytest.raises(StopAsyncIteration):
+                loop.run_until_complete(events.__anext__())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -0,0 +1,179 @@
+"""Unittests for fixtures.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import threading
+from gstswitch.fixtures import ServerPool
+from gstswitch.server import Isolation, Server
+from gstswitch.state import ServerState
+from gstswitch.exception import (PoolError, ServerProcessError,
+                                 WaitTimeoutError)
+from mock import Mock
+import pytest
+
+
+BASELINE = dict(composite_mode=3, pip=(0, 0, 100, 80), inputs=0,
+                record_filename='')
+
+
+class MockProcess(object):
+
+    """A running server process"""
+
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        """Get the return code"""
+        return self.returncode
+
+    def terminate(self):
+        """Terminate the process"""
+        self.returncode = -15
+
+
+@pytest.fixture(name='servers')
+def fixture_servers(monkeypatch):
+    """Replace running the server and controlling it, the state of every
+    server is kept in a dict by name"""
+    states = {}
+    controllers = {}
+
+    def run(serv, timeout=None):
+        """Start the server"""
+        serv.proc = MockProcess()
+
+    def wait_until(signal_names, condition, timeout):
+        """Test the condition once"""
+        if not condition(None):
+            raise WaitTimeoutError('Condition not reached')
+        return True
+
+    def controller(serv, **kwargs):
+        """A Controller reporting the state of the server"""
+        name = os.path.basename(serv.isolation.working_dir)
+        state = states.setdefault(name, dict(BASELINE))
+
+        def set_composite_mode(mode):
+            """Change the mode, which brings a PIP of its own"""
+            state.update(composite_mode=mode, pip=(10, 10, 50, 40))
+
+        def adjust_pip(*deltas):
+            """Move and resize the PIP by deltas"""
+            state['pip'] = tuple(value + delta
+                                 for value, delta in zip(state['pip'], deltas))
+
+        control = Mock()
+        control.get_state.side_effect = lambda: ServerState(**states[name])
+        control.wait_until.side_effect = wait_until
+        control.set_composite_mode.side_effect = set_composite_mode
+        control.adjust_pip.side_effect = adjust_pip
+        controllers[name] = control
+        return control
+
+    monkeypatch.setattr(Server, 'run', run)
+    monkeypatch.setattr(Server, 'controller', controller)
+    return states, controllers
+
+
+class TestServerPool(object):
+
+    """Unittests for the ServerPool"""
+
+    def test_isolated(self, servers, tmpdir):
+        """Test that every server has ports and a directory of its own"""
+        pool = ServerPool(2, path='abc', directory=str(tmpdir),
+                          video_format='debug')
+        assert list(pool) == ['server-0', 'server-1']
+        for name in pool:
+            serv = pool[name]
+            assert serv.video_port == 0
+            assert serv.audio_port == 0
+            assert serv.controller_address == 'tcp:host=127.0.0.1,port=0'
+            assert serv.isolation == Isolation(True, str(tmpdir.join(name)))
+            assert serv.log_options.path == \
+                str(tmpdir.join(name, 'server.log'))
+            assert serv.video_format == 'debug'
+        with pytest.raises(ValueError):
+            ServerPool(0)
+
+    def test_start_stop(self, servers):
+        """Test that all servers are started and stopped"""
+        pool = ServerPool(3, path='abc')
+        pool.start()
+        procs = [pool[name].proc for name in pool]
+        assert all(proc is not None for proc in procs)
+        pool.stop()
+        assert [proc.returncode for proc in procs] == [-15] * 3
+        assert not os.path.exists(pool.directory)
+
+    def test_start_error(self, servers, monkeypatch):
+        """Test that a failed start stops all servers"""
+        def run(serv, timeout=None):
+            """Fail to start server-1"""
+            serv.proc = MockProcess()
+            if serv.isolation.working_dir.endswith('server-1'):
+                raise ServerProcessError('Server is not ready')
+        monkeypatch.setattr(Server, 'run', run)
+        pool = ServerPool(2, path='abc')
+        with pytest.raises(PoolError) as excinfo:
+            pool.start()
+        assert list(excinfo.value.errors) == ['server-1']
+        assert all(pool[name].proc is None for name in pool)
+
+    def test_reuse(self, servers):
+        """Test that a returned server is reset and lent again"""
+        states, controllers = servers
+        pool = ServerPool(1, path='abc')
+        pool.start()
+        with pool.server() as serv:
+            states['server-0'].update(composite_mode=0, pip=(5, 5, 10, 10))
+        controllers['server-0'].set_composite_mode.assert_called_once_with(3)
+        controllers['server-0'].adjust_pip.assert_called_once_with(
+            -10, -10, 50, 40)
+        assert states['server-0']['composite_mode'] == 3
+        assert states['server-0']['pip'] == BASELINE['pip']
+        with pool.server() as serv:
+            states['server-0']['pip'] = (5, 5, 10, 10)
+        assert states['server-0']['pip'] == BASELINE['pip']
+        proc = serv.proc
+        with pool.server() as again:
+            assert again is serv
+        assert serv.proc is proc
+        assert (pool.reuses, pool.restarts) == (3, 0)
+        pool.stop()
+
+    def test_restart(self, servers):
+        """Test that a server which keeps state a reset cannot undo is
+        restarted"""
+        states, _ = servers
+        pool = ServerPool(1, path='abc')
+        pool.start()
+        with pool.server() as serv:
+            proc = serv.proc
+            states['server-0']['inputs'] = 2
+        assert serv.proc is not proc
+        assert pool.restarts == 1
+        with pool.server() as serv:
+            serv.proc.returncode = -11
+        assert pool.restarts == 2
+        with pool.server(fresh=True):
+            pass
+        assert pool.restarts == 3
+        pool.stop()
+
+    def test_wait(self, servers):
+        """Test that acquiring waits for a server to be returned"""
+        pool = ServerPool(1, path='abc')
+        pool.start()
+        serv = pool.acquire()
+        with pytest.raises(WaitTimeoutError):
+            pool.acquire(timeout=0.01)
+        timer = threading.Timer(0.05, pool.release, (serv,))
+        timer.start()
+        assert pool.acquire(timeout=5) is serv
+        timer.join()
+        with pytest.raises(ValueError):
+            pool.release(Server(path='abc'))
+        pool.stop()
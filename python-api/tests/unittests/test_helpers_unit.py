@@ -7,6 +7,7 @@ from gstswitch.helpers import TestSources, PreviewSinks
 from gstswitch.exception import RangeError, InvalidIndexError
 import pytest
 from gstswitch import testsource
+from mock import Mock
 
 
 class TestTestSourcesVideoPort(object):
@@ -299,3 +300,23 @@ class TestPreviewSinks(object):
         preview.preview = self.MockPreview()
         preview.terminate()
         assert preview.preview is None
+
+
+class TestForServer(object):
+
+    """Test creating the helpers on the ports of a running server"""
+
+    def test_test_sources(self):
+        """Test that the sources use the bound ports"""
+        server = Mock(bound_video_port=41000, bound_audio_port=41005)
+        src = TestSources.for_server(server)
+        assert src.video_port == 41000
+        assert src.audio_port == 41005
+
+    def test_preview_sinks(self):
+        """Test that the preview defaults to the compose port"""
+        server = Mock()
+        server.controller.return_value.get_compose_port.return_value = 41001
+        assert PreviewSinks.for_server(server).preview_port == 41001
+        server.controller.return_value.close.assert_called_once_with()
+        assert PreviewSinks.for_server(server, 41003).preview_port == 41003
@@ -0,0 +1,67 @@
+"""Unittests for introspection.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.introspection import IntrospectionCache, parse_methods
+import pytest
+
+XML = """<node>
+  <interface name='foo.bar.Baz'>
+    <method name='get_port'>
+      <arg type='i' name='port' direction='out'/>
+    </method>
+    <method name='mark'>
+      <arg type='a(iiii)' name='faces' direction='in'/>
+    </method>
+  </interface>
+</node>"""
+
+
+class TestParseMethods(object):
+
+    """Unittests for parse_methods"""
+
+    def test_signatures(self):
+        """Test that the signatures are joined into tuples"""
+        assert parse_methods(XML, 'foo.bar.Baz') == {
+            'get_port': ('()', '(i)'),
+            'mark': ('(a(iiii))', '()'),
+        }
+
+    def test_invalid(self):
+        """Test that broken data and missing interfaces are refused"""
+        with pytest.raises(ValueError):
+            parse_methods('<node', 'foo.bar.Baz')
+        with pytest.raises(ValueError):
+            parse_methods(XML, 'foo.bar.Other')
+
+
+class TestIntrospectionCache(object):
+
+    """Unittests for the IntrospectionCache"""
+
+    def test_store_load(self, tmpdir):
+        """Test that stored data can be loaded again"""
+        cache = IntrospectionCache(str(tmpdir.join('cache')))
+        assert cache.load('1.0') is None
+        assert cache.store('1.0', XML) is True
+        assert cache.load('1.0') == XML
+        assert cache.load('1.1') is None
+
+    def test_path(self, tmpdir):
+        """Test that versions can not escape the directory"""
+        cache = IntrospectionCache(str(tmpdir))
+        path = cache.path('../1.0/x')
+        assert os.path.dirname(path) == str(tmpdir)
+
+    def test_store_fails(self, tmpdir):
+        """Test that failing to write is not an error"""
+        blocker = tmpdir.join('file')
+        blocker.write('')
+        cache = IntrospectionCache(str(blocker.join('cache')))
+        assert cache.store('1.0', XML) is False
+
+    def test_default_directory(self):
+        """Test that the user's cache directory is used by default"""
+        assert IntrospectionCache().directory.endswith('gstswitch')
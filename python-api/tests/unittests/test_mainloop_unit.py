@@ -0,0 +1,91 @@
+"""Unittests for MainLoopThread class in mainloop.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import threading
+from gstswitch.mainloop import MainLoopThread
+import pytest
+
+
+class TestMainLoopThread(object):
+
+    """Unittests for the MainLoopThread"""
+
+    def test_invoke_runs_in_thread(self):
+        """Test that invoke calls the function inside the thread"""
+        thread = MainLoopThread()
+        done = threading.Event()
+        seen = []
+
+        def function(value):
+            """Record the calling thread"""
+            seen.append((value, thread.is_loop_thread()))
+            done.set()
+
+        try:
+            thread.invoke(function, 42)
+            assert done.wait(5)
+            assert seen == [(42, True)]
+        finally:
+            thread.stop()
+
+    def test_invoke_sync_result(self):
+        """Test that invoke_sync returns the result"""
+        thread = MainLoopThread()
+        try:
+            assert thread.invoke_sync(lambda a, b: a + b, 1, 2) == 3
+            assert thread.is_running() is True
+        finally:
+            thread.stop()
+        assert thread.is_running() is False
+
+    def test_invoke_sync_error(self):
+        """Test that invoke_sync re-raises exceptions"""
+        thread = MainLoopThread()
+
+        def function():
+            """Fail"""
+            raise KeyError('boom')
+
+        try:
+            with pytest.raises(KeyError):
+                thread.invoke_sync(function)
+        finally:
+            thread.stop()
+
+    def test_invoke_sync_base_exception(self):
+        """Test that invoke_sync re-raises a BaseException instead of
+        waiting forever"""
+        thread = MainLoopThread()
+
+        def function():
+            """Exit"""
+            raise SystemExit(3)
+
+        try:
+            with pytest.raises(SystemExit):
+                thread.invoke_sync(function)
+            assert thread.invoke_sync(lambda: 'alive') == 'alive'
+        finally:
+            thread.stop()
+
+    def test_invoke_sync_nested(self):
+        """Test that invoke_sync from inside the thread does not block"""
+        thread = MainLoopThread()
+        try:
+            assert thread.invoke_sync(
+                lambda: thread.invoke_sync(lambda: 'inner')) == 'inner'
+        finally:
+            thread.stop()
+
+    def test_stop_before_run(self):
+        """Test that stop does not hang when called right after start"""
+        thread = MainLoopThread()
+        thread.start()
+        thread.stop()
+        assert thread.is_loop_thread() is False
+
+    def test_shared(self):
+        """Test that shared always returns the same instance"""
+        assert MainLoopThread.shared() is MainLoopThread.shared()
@@ -0,0 +1,233 @@
+"""Unittests for markers.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import threading
+from array import array
+
+from gstswitch.exception import ConnectionError
+from gstswitch.markers import (MarkerQueue, marker_decoder, pack_markers,
+                               unpack_markers)
+from gi.repository import GLib
+import pytest
+
+
+class MockConnection(object):
+
+    """Records sent markers, blocks while the gate is closed"""
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = fail
+
+    def send(self, method_name, args, flush=False):
+        """Mock of Connection.send"""
+        assert flush is True
+        self.gate.wait()
+        if self.fail:
+            raise ConnectionError('closed')
+        self.sent.append((method_name, args[0].unpack()))
+
+
+class MockController(object):
+
+    """Controller with a MockConnection"""
+
+    def __init__(self, fail=False):
+        self.connection = MockConnection(fail)
+        self.connects = 0
+
+    def _bound_connection(self):
+        """Mock of _bound_connection"""
+        self.connects += 1
+        if self.connection is None:
+            raise ConnectionError('The connection was closed')
+        return self.connection
+
+
+class TestMarkerQueue(object):
+
+    """Unittests for the MarkerQueue"""
+
+    def test_send(self):
+        """Test that markers are sent in order"""
+        controller = MockController()
+        queue = MarkerQueue(controller)
+        queue.mark_face([(1, 2, 3, 4)])
+        assert queue.flush(5)
+        queue.mark_tracking([(5, 6, 7, 8)])
+        queue.close(5)
+        assert controller.connection.sent == [
+            ('mark_face', [(1, 2, 3, 4)]),
+            ('mark_tracking', [(5, 6, 7, 8)]),
+        ]
+        assert queue.sent == 2
+        assert queue.dropped == 0
+
+    def test_stale_dropped(self):
+        """Test that only the latest markers are sent when the
+        connection is busy"""
+        controller = MockController()
+        controller.connection.gate.clear()
+        queue = MarkerQueue(controller)
+        queue.mark_face([(0, 0, 0, 0)])
+        # wait for the thread to block in sending the first one
+        while queue.pending():
+            threading.Event().wait(0.001)
+        for i in range(1, 10):
+            queue.mark_face([(i, i, i, i)])
+        queue.mark_tracking([(1, 1, 1, 1)])
+        assert queue.pending() == 2
+        controller.connection.gate.set()
+        queue.close(5)
+        assert controller.connection.sent == [
+            ('mark_face', [(0, 0, 0, 0)]),
+            ('mark_face', [(9, 9, 9, 9)]),
+            ('mark_tracking', [(1, 1, 1, 1)]),
+        ]
+        assert queue.dropped == 8
+
+    def test_maxlen(self):
+        """Test that maxlen markers are kept per method"""
+        controller = MockController()
+        controller.connection.gate.clear()
+        queue = MarkerQueue(controller, maxlen=3)
+        for i in range(5):
+            queue.mark_face([(i, 0, 0, 0)])
+        assert queue.pending() <= 3
+        controller.connection.gate.set()
+        queue.close(5)
+        assert controller.connection.sent[-3:] == [
+            ('mark_face', [(i, 0, 0, 0)]) for i in range(2, 5)]
+
+    def test_errors(self):
+        """Test that failures are reported and counted"""
+        errors = []
+        controller = MockController(fail=True)
+        queue = MarkerQueue(controller,
+                            on_error=lambda *args: errors.append(args))
+        queue.mark_face([])
+        queue.close(5)
+        assert queue.errors == 1
+        assert queue.sent == 0
+        assert errors[0][0] == 'mark_face'
+        assert isinstance(errors[0][1], ConnectionError)
+
+    def test_buffer(self):
+        """Test that a buffer is packed when it is put, so it can be
+        reused right away"""
+        controller = MockController()
+        controller.connection.gate.clear()
+        queue = MarkerQueue(controller, maxlen=2)
+        faces = array(str('i'), [1, 2, 3, 4])
+        queue.mark_face(faces)
+        faces[0] = 5
+        queue.mark_face(faces)
+        with pytest.raises(ValueError):
+            queue.mark_face(array(str('i'), [1, 2, 3]))
+        controller.connection.gate.set()
+        queue.close(5)
+        assert queue.errors == 0
+        assert [faces for _, faces in controller.connection.sent] == [
+            [(1, 2, 3, 4)], [(5, 2, 3, 4)]]
+
+    def test_closed_meanwhile(self):
+        """Test that a connection closed by another thread is an error"""
+        controller = MockController()
+        controller.connection = None
+        queue = MarkerQueue(controller)
+        queue.mark_face([])
+        queue.close(5)
+        assert controller.connects == 1
+        assert queue.errors == 1
+
+    def test_invalid(self):
+        """Test invalid arguments and use after close"""
+        controller = MockController()
+        with pytest.raises(ValueError):
+            MarkerQueue(controller, maxlen=0)
+        with pytest.raises(ValueError):
+            MarkerQueue(controller, on_error=1)
+        queue = MarkerQueue(controller)
+        with pytest.raises(ValueError):
+            queue.put('switch', [])
+        queue.close()
+        with pytest.raises(RuntimeError):
+            queue.mark_face([])
+
+    def test_flush_timeout(self):
+        """Test that flush gives up after the timeout"""
+        controller = MockController()
+        controller.connection.gate.clear()
+        queue = MarkerQueue(controller)
+        queue.mark_face([])
+        assert queue.flush(0.05) is False
+        controller.connection.gate.set()
+        assert queue.flush(5) is True
+        queue.close()
+
+
+class TestPackMarkers(object):
+
+    """Unittests for pack_markers and unpack_markers"""
+
+    def test_sequences(self):
+        """Test packing lists of tuples"""
+        variant = pack_markers([(1, 2, 3, 4), [5, 6, 7, 8]])
+        assert variant.get_type_string() == 'a(iiii)'
+        assert variant.unpack() == [(1, 2, 3, 4), (5, 6, 7, 8)]
+        assert pack_markers([]).unpack() == []
+        assert variant.equal(GLib.Variant(
+            'a(iiii)', [(1, 2, 3, 4), (5, 6, 7, 8)]))
+
+    def test_buffers(self):
+        """Test packing buffers of ints"""
+        assert pack_markers(array('i', [1, 2, 3, -4])).unpack() == \
+            [(1, 2, 3, -4)]
+        assert pack_markers(array('q', [1, 2, 3, 4])).unpack() == \
+            [(1, 2, 3, 4)]
+        strided = memoryview(array('i', [1, 0, 2, 0, 3, 0, 4, 0]))[::2]
+        assert pack_markers(strided).unpack() == [(1, 2, 3, 4)]
+
+    def test_numpy(self):
+        """Test packing and unpacking numpy arrays"""
+        numpy = pytest.importorskip('numpy')
+        faces = numpy.arange(8, dtype=numpy.int32).reshape(2, 4)
+        assert pack_markers(faces).unpack() == [(0, 1, 2, 3), (4, 5, 6, 7)]
+        assert pack_markers(faces.astype(numpy.int64)).unpack() == \
+            [(0, 1, 2, 3), (4, 5, 6, 7)]
+        unpacked = unpack_markers(pack_markers(faces), 'numpy')
+        assert unpacked.shape == (2, 4)
+        assert (unpacked == faces).all()
+
+    def test_invalid(self):
+        """Test markers which can not be packed"""
+        for faces in [[(1, 2, 3)], array('i', [1, 2]), [(2 ** 40, 0, 0, 0)]]:
+            with pytest.raises(ValueError):
+                pack_markers(faces)
+        for faces in [[(1.5, 0, 0, 0)], [None], 5, GLib.Variant('ai', [])]:
+            with pytest.raises(TypeError):
+                pack_markers(faces)
+
+    def test_packed(self):
+        """Test that packed markers are passed through"""
+        packed = pack_markers([(1, 2, 3, 4)])
+        assert pack_markers(packed) is packed
+
+    def test_unpack(self):
+        """Test unpacking to a flat array"""
+        variant = GLib.Variant('a(iiii)', [(1, 2, 3, 4), (5, 6, 7, 8)])
+        assert unpack_markers(variant) == array('i', range(1, 9))
+        with pytest.raises(ValueError):
+            unpack_markers(variant, 'list')
+
+    def test_decoder(self):
+        """Test decoding the parameters of a marker signal"""
+        decode = marker_decoder('array')
+        parameters = GLib.Variant('(a(iiii))', ([(1, 2, 3, 4)],))
+        assert decode(parameters) == (array('i', [1, 2, 3, 4]),)
+        with pytest.raises(ValueError):
+            marker_decoder('list')
@@ -0,0 +1,174 @@
+"""Unittests for ControllerPool class in pool.py"""
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.pool import ControllerPool, PoolResults
+from gstswitch.exception import ConnectionError, PoolError
+from gstswitch.mainloop import MainLoopThread
+import pytest
+from mock import Mock
+
+ADDRESSES = {
+    'room1': 'unix:abstract=room1',
+    'room2': 'unix:abstract=room2',
+    'room3': 'unix:abstract=room3',
+}
+
+
+def make_pool(outcomes):
+    """ControllerPool whose Controllers reply with outcomes[name], which
+    is either a result or an exception
+    """
+    pool = ControllerPool(ADDRESSES)
+    for name, controller in pool.controllers.items():
+        def call_async(method_name, args, callback, timeout=None,
+                       outcome=outcomes[name]):
+            """mock of Controller.call_async"""
+            if isinstance(outcome, Exception):
+                callback(None, outcome)
+            else:
+                callback(outcome, None)
+        controller.call_async = Mock(side_effect=call_async)
+        controller.is_connected = Mock(return_value=True)
+    return pool
+
+
+class TestControllerPool(object):
+
+    """Unittests for the ControllerPool"""
+
+    def test_addresses(self):
+        """Test the names of the servers"""
+        pool = ControllerPool(ADDRESSES)
+        assert list(pool) == ['room1', 'room2', 'room3']
+        assert len(pool) == 3
+        assert pool['room2'].address == 'unix:abstract=room2'
+        pool = ControllerPool(['unix:abstract=a'])
+        assert list(pool) == ['unix:abstract=a']
+        with pytest.raises(ValueError):
+            ControllerPool([])
+
+    def test_shared_thread(self):
+        """Test that all Controllers share the MainLoopThread"""
+        pool = ControllerPool(ADDRESSES)
+        for name in pool:
+            assert pool[name].main_loop_thread is pool.main_loop_thread
+            assert pool[name].threaded
+
+    def test_call(self):
+        """Test that the results of all servers are collected"""
+        pool = make_pool({'room1': True, 'room2': False, 'room3': True})
+        results = pool.set_composite_mode(1, timeout=100)
+        assert results.results == {'room1': True, 'room2': False,
+                                   'room3': True}
+        assert results.succeeded()
+        args = pool['room1'].call_async.call_args[0]
+        assert args[:2] == ('set_composite_mode', (1,))
+        assert args[3] == 100
+
+    def test_errors(self):
+        """Test that errors are collected per server"""
+        error = ConnectionError('down')
+        pool = make_pool({'room1': 3001, 'room2': error, 'room3': 3001})
+        results = pool.call('get_compose_port')
+        assert results.results == {'room1': 3001, 'room3': 3001}
+        assert results.errors == {'room2': error}
+        with pytest.raises(PoolError) as excinfo:
+            results.raise_errors()
+        assert excinfo.value.errors == {'room2': error}
+
+    def test_start_error(self):
+        """Test that a call which cannot be started is an error too"""
+        pool = make_pool({'room1': 1, 'room2': 1, 'room3': 1})
+        pool['room3'].call_async.side_effect = ConnectionError('down')
+        results = pool.get_composite_mode()
+        assert set(results.results) == set(['room1', 'room2'])
+        assert isinstance(results.errors['room3'], ConnectionError)
+
+    def test_connect_concurrently(self):
+        """Test that a server which cannot be reached does not stall the
+        others and fails after connect_timeout"""
+        pool = make_pool({'room1': 1, 'room2': 2, 'room3': 3})
+        pool.connect_timeout = 0.05
+        stalled = threading.Event()
+        connected = []
+        for name in ('room2', 'room3'):
+            pool[name].is_connected.return_value = False
+        pool['room2'].establish_connection = Mock(
+            side_effect=lambda: stalled.wait(5))
+        pool['room3'].establish_connection = Mock(
+            side_effect=lambda: connected.append(
+                threading.current_thread()))
+        try:
+            results = pool.get_composite_mode()
+        finally:
+            stalled.set()
+        assert results.results == {'room1': 1, 'room3': 3}
+        assert isinstance(results.errors['room2'], ConnectionError)
+        assert connected[0] is not threading.current_thread()
+        assert connected[0] is not pool.main_loop_thread._thread
+        assert not pool['room2'].call_async.called
+
+    def test_connect_error(self):
+        """Test that a failed connection is the outcome of its server"""
+        pool = make_pool({'room1': 1, 'room2': 2, 'room3': 3})
+        pool['room1'].is_connected.return_value = False
+        error = ConnectionError('down')
+        pool['room1'].establish_connection = Mock(side_effect=error)
+        results = pool.get_composite_mode()
+        assert results.errors == {'room1': error}
+        assert results.results == {'room2': 2, 'room3': 3}
+
+    def test_names(self):
+        """Test calling a subset of the servers"""
+        pool = make_pool({'room1': 1, 'room2': 2, 'room3': 3})
+        results = pool.call('get_composite_mode', names=['room2'])
+        assert results.results == {'room2': 2}
+        assert not pool['room1'].call_async.called
+        assert pool.call('get_composite_mode', names=[]).results == {}
+
+    def test_unknown_method(self):
+        """Test that only remote methods can be called"""
+        pool = ControllerPool(ADDRESSES)
+        with pytest.raises(ValueError):
+            pool.call('close')
+        with pytest.raises(AttributeError):
+            getattr(pool, 'foo')
+        with pytest.raises(TypeError):
+            pool.call('get_state', foo=1)
+
+    def test_subscribe(self):
+        """Test that signal callbacks get the name of the server"""
+        pool = ControllerPool(ADDRESSES)
+        test_cb = Mock()
+        subscriptions = pool.subscribe('new_mode_online', test_cb)
+        assert len(subscriptions) == 3
+        pool['room2'].signals.callbacks['new_mode_online'][0](2)
+        test_cb.assert_called_once_with('room2', 2)
+        pool.close()
+        assert not pool.main_loop_thread.is_running()
+
+    def test_close(self):
+        """Test that only a MainLoopThread of the pool is stopped"""
+        thread = Mock(spec=MainLoopThread)
+        pool = ControllerPool(ADDRESSES, main_loop_thread=thread)
+        pool.close()
+        assert not thread.stop.called
+        pool = ControllerPool(ADDRESSES)
+        pool.main_loop_thread = Mock()
+        pool.close()
+        pool.main_loop_thread.stop.assert_called_once_with()
+
+
+class TestPoolResults(object):
+
+    """Unittests for the PoolResults"""
+
+    def test_raise_errors(self):
+        """Test that the results are returned without errors"""
+        results = PoolResults()
+        results.results['a'] = 1
+        assert results.raise_errors() == {'a': 1}
+        assert 'a' in repr(results)
@@ -3,9 +3,11 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
 
-from gstswitch.server import Server
+from gstswitch.server import Isolation, Server
+from gstswitch.serverlog import LogOptions, ServerLog
 import pytest
 from gstswitch.exception import ServerProcessError
+import io
 import subprocess
 from distutils import spawn
 from mock import Mock
@@ -147,6 +149,23 @@ class TestControllerAddress(object):
                 Server(path=PATH, controller_address=controller_address)
 
 
+class TestMarkerRate(object):
+
+    """Test the marker_rate parameter"""
+
+    def test_marker_rate(self):
+        """Test that the marker rate is passed to the server"""
+        def mock_method(arg):
+            """Mocking _start_process"""
+            return arg
+        path = '/usr'
+        serv = Server(path=path, marker_rate=25)
+        serv._start_process = mock_method
+        assert serv._run_process() == "/usr/gst-switch-srv \
+--video-input-port=3000 --audio-input-port=4000 \
+--controller-address=tcp:host=0.0.0.0,port=5000 --marker-rate=25".split()
+
+
 class TestRecordFile(object):
 
     """Test the record_file parameter"""
@@ -295,9 +314,73 @@ class TestRun(object):
         """Test the run method"""
         serv = Server(path='abc')
         serv._run_process = Mock(return_value=MockProcess())
-        serv.run()
+        serv.wait_until_ready = Mock()
+        serv.run(timeout=3)
         assert serv.pid == 1
         assert serv.proc is not None
+        serv.wait_until_ready.assert_called_once_with(3)
+
+    def test_run_not_ready(self):
+        """Test that a server which is not ready is stopped"""
+        serv = Server(path='abc')
+        proc = ExitingProcess()
+        serv._run_process = Mock(return_value=proc)
+        serv.wait_until_ready = Mock(side_effect=ServerProcessError)
+        serv.log = ServerLog()
+        with pytest.raises(ServerProcessError):
+            serv.run(timeout=3)
+        assert proc.returncode == -15
+        assert serv.proc is None
+        assert serv.log.closed
+
+    def test_supervise(self):
+        """Test running the server under a Supervisor"""
+        serv = Server(path='abc')
+        serv._run_process = Mock(return_value=MockProcess())
+        serv.wait_until_ready = Mock()
+        supervisor = serv.supervise(interval=10)
+        try:
+            assert supervisor.running
+            assert supervisor.server is serv
+            assert serv.proc is not None
+        finally:
+            supervisor.stop(terminate=False)
+
+    def test_start_process_log(self, tmpdir, monkeypatch):
+        """Test that the output is read into the log and the log file"""
+        monkeypatch.chdir(tmpdir)
+        serv = Server(path='abc', log_options=LogOptions('server-1.log'))
+        process = MockProcess()
+        process.stdout = io.BytesIO(
+            b'gst-switch-srv/gstswitchserver.c:42:error: failed\n'
+            b'online: composite @123\n')
+        monkeypatch.setattr(subprocess, 'Popen', Mock(return_value=process))
+        serv._start_process('cmd')
+        serv.log.wait(1, timeout=5)
+        serv.log.wait(2, timeout=5)
+        assert serv.tail_log(1) == ['online: composite @123']
+        assert [record.message for record in serv.log_records('WARN')] == \
+            ['failed']
+        assert tmpdir.join('server-1.log').read() == \
+            'gst-switch-srv/gstswitchserver.c:42:error: failed\n' \
+            'online: composite @123\n'
+
+    def test_log_options(self):
+        """Test that without log_to_file the output is echoed only"""
+        serv = Server(path='abc', log_to_file=False,
+                      log_options=LogOptions('server-1.log', size=5))
+        assert serv.log_options == LogOptions(None, 5)
+        assert Server(path='abc').log_options == LogOptions()
+        assert Server(path='abc').isolation == Isolation(False, None)
+
+    def test_working_dir(self, monkeypatch):
+        """Test that the server runs in working_dir"""
+        serv = Server(path='abc', log_to_file=False,
+                      isolation=Isolation(working_dir='/tmp'))
+        popen = Mock(return_value=MockProcess())
+        monkeypatch.setattr(subprocess, 'Popen', popen)
+        serv._start_process('cmd')
+        assert popen.call_args[1]['cwd'] == '/tmp'
 
     def test_run_process(self):
         """Test _run_process method"""
@@ -309,14 +392,14 @@ class TestRun(object):
 
     def test_start_process_error(self, monkeypatch):
         """Test _start_process method"""
-        serv = Server(path='abc')
+        serv = Server(path='abc', log_to_file=False)
         monkeypatch.setattr(subprocess, 'Popen', Mock(side_effect=OSError))
         with pytest.raises(ServerProcessError):
             serv._start_process('cmd')
 
     def test_start_process_normal(self, monkeypatch):
         """Test _start_process normally"""
-        serv = Server(path='abc')
+        serv = Server(path='abc', log_to_file=False)
         monkeypatch.setattr(
             subprocess,
             'Popen',
@@ -331,6 +414,7 @@ class MockProcess(object):
     def __init__(self, mode=True):
         self.mode = mode
         self.pid = 1
+        self.stdout = io.BytesIO()
 
     def terminate(self):
         """Terminate the mock process"""
@@ -351,6 +435,63 @@ class MockProcess(object):
         pass
 
 
+class ExitingProcess(object):
+
+    """A mock process which exits when terminated, unless it ignores it"""
+
+    def __init__(self, ignore_terminate=False):
+        self.pid = 1
+        self.returncode = None
+        self.ignore_terminate = ignore_terminate
+        self.killed = False
+
+    def poll(self):
+        """Get the return code"""
+        return self.returncode
+
+    def terminate(self):
+        """Terminate unless ignoring it"""
+        if not self.ignore_terminate:
+            self.returncode = -15
+
+    def kill(self):
+        """Kill the mock process"""
+        self.killed = True
+        self.returncode = -9
+
+    def wait(self):
+        """Get the return code"""
+        return self.returncode
+
+
+class TestStop(object):
+
+    """Test stopping the server"""
+
+    def test_stop(self):
+        """Test that the process is terminated"""
+        serv = Server(path='abc')
+        serv.proc = ExitingProcess()
+        assert serv.stop() == -15
+        assert serv.proc is None
+        assert serv.stop() is None
+
+    def test_kill(self):
+        """Test that a process ignoring terminate is killed"""
+        serv = Server(path='abc')
+        serv.proc = proc = ExitingProcess(ignore_terminate=True)
+        assert serv.stop(timeout=0.01) == -9
+        assert proc.killed
+
+    def test_exited(self):
+        """Test that an exited process is only reaped"""
+        serv = Server(path='abc')
+        serv.proc = proc = ExitingProcess()
+        proc.returncode = -11
+        assert serv.stop() == -11
+        assert not proc.killed
+
+
 class MockPopen(object):
 
     """Mock Popen method"""
@@ -432,3 +573,163 @@ class TestNormal(object):
         serv = Server(path='abc')
         monkeypatch.setattr(subprocess, 'Popen', MockPopen)
         serv.make_coverage()
+
+
+def running_server(log, poll=None, **kwargs):
+    """A Server whose process is running, or exited with poll, and which
+    logged the lines of log"""
+    serv = Server(path='abc', **kwargs)
+    serv.proc = Mock()
+    serv.proc.poll.return_value = poll
+    serv.log = ServerLog()
+    for line in log.splitlines():
+        serv.log.append(line)
+    return serv
+
+
+class TestFreePorts(object):
+
+    """Test letting the server pick free ports"""
+
+    LOG = ('Video input is listening at port: 41000\n'
+           'Audio input is listening at port: 41005\n'
+           'Controller is listening at: tcp:host=0.0.0.0,port=41010\n'
+           'Compose output is listening at port: 41020\n'
+           'Encode output is listening at port: 41025\n')
+
+    def test_arguments(self):
+        """Test that port 0 is passed to the server"""
+        serv = Server(path='/usr/', isolation=Isolation(free_ports=True))
+        serv._start_process = lambda cmd: cmd
+        assert serv._run_process() == "/usr/gst-switch-srv \
+--video-input-port=0 --audio-input-port=0 \
+--controller-address=tcp:host=0.0.0.0,port=0".split()
+        assert Server(path=PATH, video_port=0).video_port == 0
+
+    def test_bound_ports(self):
+        """Test reading the bound ports from the log"""
+        serv = running_server(self.LOG, video_port=0, audio_port=0)
+        assert serv.bound_video_port == 41000
+        assert serv.bound_audio_port == 41005
+        assert serv.bound_compose_port == 41020
+        assert serv.bound_encode_port == 41025
+        assert serv.discover_address() == 'tcp:host=0.0.0.0,port=41010'
+
+    def test_ready(self):
+        """Test that waiting until ready keeps the bound ports"""
+        serv = running_server(self.LOG)
+        serv.wait_until_ready(timeout=1)
+        serv.log = ServerLog()
+        assert serv.bound_video_port == 41000
+        assert serv.bound_audio_port == 41005
+
+    def test_not_listening(self):
+        """Test that a server which exited has no bound ports"""
+        serv = running_server('starting\n', poll=1)
+        with pytest.raises(ServerProcessError):
+            getattr(serv, 'bound_video_port')
+
+
+class TestDiscoverAddress(object):
+
+    """Test discovering the address of the running server"""
+
+    LOG = ('gst-switch-srv/gstswitchserver.c:42:info: starting\n'
+           'Controller is listening at: unix:abstract=/tmp/dbus-abc,'
+           'guid=123\n')
+
+    def test_discover(self):
+        """Test reading the address from the log"""
+        serv = running_server(self.LOG,
+                              controller_address='unix:tmpdir=/tmp')
+        assert serv.discover_address() == \
+            'unix:abstract=/tmp/dbus-abc,guid=123'
+        assert serv.controller(timeout=100).address == \
+            'unix:abstract=/tmp/dbus-abc,guid=123'
+
+    def test_kept(self):
+        """Test that the address is kept once the line left the log"""
+        serv = running_server('')
+        serv.log = ServerLog(maxlen=2)
+        for line in self.LOG.splitlines():
+            serv.log.append(line)
+        assert serv.discover_address()
+        serv.log.append('online: composite @123')
+        serv.log.append('online: output @124')
+        assert serv.discover_address() == \
+            'unix:abstract=/tmp/dbus-abc,guid=123'
+
+    def test_exited(self):
+        """Test that a server which exited is not waited for"""
+        serv = running_server('starting\n', poll=1)
+        with pytest.raises(ServerProcessError):
+            serv.discover_address()
+
+    def test_timeout(self):
+        """Test that discovering gives up after the timeout"""
+        serv = running_server('starting\n')
+        with pytest.raises(ServerProcessError):
+            serv.discover_address(timeout=0.1)
+
+    def test_not_running(self):
+        """Test that discovering needs a running server"""
+        serv = Server(path='abc', log_to_file=False)
+        with pytest.raises(ServerProcessError):
+            serv.discover_address()
+
+    def test_unix_addresses(self):
+        """Test that unix addresses are validated"""
+        Server(path=PATH, controller_address='unix:abstract=gstswitch')
+        with pytest.raises(ValueError):
+            Server(path=PATH, controller_address='unix:path=')
+        with pytest.raises(ValueError):
+            Server(path=PATH,
+                   controller_address='unix:path=/a,abstract=b')
+
+
+class TestWaitUntilReady(object):
+
+    """Test waiting for the server to listen on all its ports"""
+
+    LOG = ('Video input is listening at port: 3000\n'
+           'Audio input is listening at port: 4000\n'
+           'Controller is listening at: unix:abstract=/tmp/dbus-abc,'
+           'guid=123\n')
+
+    def test_ready(self):
+        """Test that all three listening lines are waited for"""
+        serv = running_server(self.LOG)
+        assert serv.wait_until_ready() == \
+            'unix:abstract=/tmp/dbus-abc,guid=123'
+
+    def test_partial(self):
+        """Test that a server without its audio input is not ready"""
+        serv = running_server('\n'.join(
+            line for line in self.LOG.splitlines()
+            if not line.startswith('Audio')))
+        with pytest.raises(ServerProcessError) as excinfo:
+            serv.wait_until_ready(timeout=0.1)
+        assert 'not ready' in str(excinfo.value)
+
+    def test_late(self):
+        """Test that waiting ends with the line read by the log thread"""
+        video, rest = self.LOG.split('\n', 1)
+        serv = running_server(video)
+        read, write = os.pipe()
+        serv.log.start(os.fdopen(read, 'rb'))
+        with os.fdopen(write, 'wb') as pipe:
+            pipe.write(rest.encode('utf-8'))
+        assert serv.wait_until_ready(timeout=5)
+
+    def test_exited(self):
+        """Test that a server which exited fails right away"""
+        serv = running_server('listen socket: in use\n', poll=255)
+        with pytest.raises(ServerProcessError) as excinfo:
+            serv.wait_until_ready(timeout=10)
+        assert 'code 255' in str(excinfo.value)
+
+    def test_not_running(self):
+        """Test that waiting needs a running server"""
+        serv = Server(path='abc')
+        with pytest.raises(ServerProcessError):
+            serv.wait_until_ready()
@@ -0,0 +1,115 @@
+"""Unittests for serverlog.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import io
+from gstswitch.serverlog import LogRecord, ServerLog, parse_line
+import pytest
+
+
+LINES = [
+    './tools/gstswitchserver.c:873:info: Listening on localhost '
+    '(0.0.0.0:3000)',
+    'online: composite @123',
+    './tools/gstcomposite.c:150:warning: ignore changing mode in transition',
+    './tools/gstswitchserver.c:1567:error: no stream for port 3005 '
+    '(candidate)',
+]
+
+
+class TestParseLine(object):
+
+    """Unittests for parse_line"""
+
+    def test_levels(self):
+        """Test parsing the INFO, WARN and ERROR lines"""
+        assert parse_line(LINES[0], 1.0) == LogRecord(
+            1.0, 'INFO', './tools/gstswitchserver.c', 873,
+            'Listening on localhost (0.0.0.0:3000)', LINES[0])
+        assert parse_line(LINES[2]).level == 'WARN'
+        assert parse_line(LINES[3]).message == \
+            'no stream for port 3005 (candidate)'
+
+    def test_other(self):
+        """Test that other output is kept unparsed"""
+        record = parse_line(LINES[1], 2.0)
+        assert record == LogRecord(2.0, None, None, None, LINES[1],
+                                   LINES[1])
+
+
+class TestServerLog(object):
+
+    """Unittests for the ServerLog"""
+
+    def test_ring(self):
+        """Test that only maxlen lines are kept"""
+        log = ServerLog(maxlen=3)
+        for line in LINES:
+            log.append(line)
+        assert log.count == 4
+        assert log.tail(None) == LINES[1:]
+        assert log.tail(2) == LINES[2:]
+        assert log.tail(0) == []
+        assert log.text() == '\n'.join(LINES[1:])
+        with pytest.raises(ValueError):
+            ServerLog(maxlen=0)
+
+    def test_records(self):
+        """Test querying the lines"""
+        log = ServerLog()
+        for line in LINES:
+            log.append(line)
+        assert len(log.records()) == 4
+        assert [record.level for record in log.records('WARN')] == [
+            'WARN', 'ERROR']
+        assert [record.line for record in log.records(
+            pattern=r'30\d\d')] == [873, 1567]
+        assert log.records(since=log.records()[-1].time + 1) == []
+        with pytest.raises(ValueError):
+            log.records('DEBUG')
+
+    def test_stream(self):
+        """Test reading a stream until its end"""
+        log = ServerLog(io.BytesIO('\n'.join(LINES).encode('utf-8')))
+        while not log.closed:
+            log.wait(log.count, timeout=5)
+        assert log.tail(None) == LINES
+        with pytest.raises(RuntimeError):
+            log.start(io.BytesIO())
+
+    def test_wait(self):
+        """Test that waiting ends with a new line or the timeout"""
+        log = ServerLog()
+        assert log.wait(0, timeout=0.01) == 0
+        log.append(LINES[0])
+        assert log.wait(0, timeout=5) == 1
+
+    def test_close(self):
+        """Test that lines are ignored once closed"""
+        log = ServerLog()
+        log.append(LINES[0])
+        log.close()
+        log.append(LINES[1])
+        assert log.tail() == LINES[:1]
+        assert log.wait(1, timeout=5) == 1
+
+    def test_file(self, tmpdir):
+        """Test writing and rotating the log file"""
+        path = str(tmpdir.join('server.log'))
+        tmpdir.join('server.log').write('previous run\n')
+        log = ServerLog(path=path, max_bytes=100, backups=1)
+        for line in LINES:
+            log.append(line)
+        log.close()
+        assert tmpdir.join('server.log.1').check()
+        assert not tmpdir.join('server.log.2').check()
+        assert 'previous run' not in tmpdir.join('server.log.1').read()
+        assert tmpdir.join('server.log').read().endswith(LINES[-1] + '\n')
+
+    def test_echo(self):
+        """Test echoing the lines"""
+        echo = io.StringIO()
+        log = ServerLog(echo=echo)
+        log.append(LINES[1])
+        assert echo.getvalue() == LINES[1] + '\n'
@@ -0,0 +1,215 @@
+"""Unittests for SignalDispatcher class in signals.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.signals import (CoalescedCallback, DecodingCallback,
+                               SignalDispatcher, SignalSubscription)
+import pytest
+from gi.repository import GLib
+from mock import Mock
+
+
+class TestSignalDispatcher(object):
+
+    """Unittests for the SignalDispatcher"""
+
+    def test_unknown_signal(self):
+        """Test that only known signals can be subscribed"""
+        dispatcher = SignalDispatcher(('foo',))
+        with pytest.raises(ValueError):
+            dispatcher.subscribe('bar', Mock())
+
+    def test_not_callable(self):
+        """Test that callbacks must be callable"""
+        dispatcher = SignalDispatcher(('foo',))
+        for callback in ['', None, [], {}]:
+            with pytest.raises(ValueError):
+                dispatcher.subscribe('foo', callback)
+
+    def test_dispatch(self):
+        """Test that callbacks are called with the unpacked arguments"""
+        dispatcher = SignalDispatcher(('foo', 'bar'))
+        test_cb = Mock()
+        subscription = dispatcher.subscribe('foo', test_cb)
+        assert isinstance(subscription, SignalSubscription)
+        dispatcher.dispatch('foo', GLib.Variant('(ii)', (1, 2)))
+        dispatcher.dispatch('bar', GLib.Variant('(ii)', (3, 4)))
+        test_cb.assert_called_once_with(1, 2)
+
+    def test_no_unpack_without_callbacks(self):
+        """Test that parameters are not unpacked without callbacks"""
+        dispatcher = SignalDispatcher(('foo',))
+        parameters = Mock()
+        dispatcher.dispatch('foo', parameters)
+        dispatcher.dispatch('unknown', parameters)
+        assert not parameters.unpack.called
+
+    def test_unsubscribe(self):
+        """Test that unsubscribed callbacks are not called anymore"""
+        dispatcher = SignalDispatcher(('foo',))
+        test_cb = Mock()
+        subscription = dispatcher.subscribe('foo', test_cb)
+        assert subscription.unsubscribe() is True
+        assert subscription.unsubscribe() is False
+        dispatcher.dispatch('foo', GLib.Variant('(i)', (1,)))
+        assert not test_cb.called
+
+    def test_unsubscribe_while_dispatching(self):
+        """Test that a callback can unsubscribe itself"""
+        dispatcher = SignalDispatcher(('foo',))
+        calls = []
+        subscriptions = []
+
+        def callback(value):
+            """Unsubscribe on first call"""
+            calls.append(value)
+            subscriptions[0].unsubscribe()
+
+        subscriptions.append(dispatcher.subscribe('foo', callback))
+        other = Mock()
+        dispatcher.subscribe('foo', other)
+        dispatcher.dispatch('foo', GLib.Variant('(i)', (1,)))
+        dispatcher.dispatch('foo', GLib.Variant('(i)', (2,)))
+        assert calls == [1]
+        assert other.call_count == 2
+
+    def test_bind(self):
+        """Test that only signals with callbacks are subscribed"""
+        dispatcher = SignalDispatcher(('foo', 'bar'))
+        handler = Mock()
+        dispatcher.subscribe('foo', Mock())
+        connection = Mock()
+        dispatcher.bind(connection, handler)
+        connection.signal_subscribe.assert_called_once_with(
+            handler, member='foo')
+
+    def test_subscribe_while_bound(self):
+        """Test that signals are subscribed with their first callback and
+        unsubscribed with their last one
+        """
+        dispatcher = SignalDispatcher(('foo',))
+        connection = Mock()
+        handler = Mock()
+        dispatcher.bind(connection, handler)
+        first = dispatcher.subscribe('foo', Mock())
+        second = dispatcher.subscribe('foo', Mock())
+        connection.signal_subscribe.assert_called_once_with(
+            handler, member='foo')
+        first.unsubscribe()
+        assert not connection.signal_unsubscribe.called
+        second.unsubscribe()
+        connection.signal_unsubscribe.assert_called_once_with(member='foo')
+
+    def test_unbind(self):
+        """Test that nothing is subscribed after unbind"""
+        dispatcher = SignalDispatcher(('foo',))
+        connection = Mock()
+        dispatcher.bind(connection, Mock())
+        dispatcher.unbind()
+        dispatcher.subscribe('foo', Mock())
+        assert not connection.signal_subscribe.called
+
+
+def run_pending(callback):
+    """Iterate the MainContext until the pending signal was delivered"""
+    context = GLib.MainContext.ref_thread_default()
+    while callback._source is not None:
+        context.iteration(True)
+
+
+class TestCoalescedCallback(object):
+
+    """Unittests for the CoalescedCallback"""
+
+    def test_invalid_rate(self):
+        """Test that the rate must be positive"""
+        for max_rate in [0, -1]:
+            with pytest.raises(ValueError):
+                CoalescedCallback(Mock(), max_rate)
+
+    def test_latest_wins(self):
+        """Test that signals arriving too fast are coalesced"""
+        test_cb = Mock()
+        callback = CoalescedCallback(test_cb, max_rate=50)
+        for i in range(5):
+            callback(i)
+        test_cb.assert_called_once_with(0)
+        run_pending(callback)
+        assert test_cb.call_count == 2
+        test_cb.assert_called_with(4)
+
+    def test_cancel(self):
+        """Test that the pending signal is dropped on cancel"""
+        test_cb = Mock()
+        callback = CoalescedCallback(test_cb, max_rate=50)
+        callback(1)
+        callback(2)
+        callback.cancel()
+        assert callback._source is None
+        callback._flush()
+        test_cb.assert_called_once_with(1)
+
+    def test_delta(self):
+        """Test that only the changed markers are delivered"""
+        test_cb = Mock()
+        callback = CoalescedCallback(test_cb, delta=True)
+        callback([(1, 2, 3, 4), (5, 6, 7, 8)])
+        test_cb.assert_called_once_with([(1, 2, 3, 4), (5, 6, 7, 8)], [])
+        callback([(5, 6, 7, 8), (1, 2, 3, 4)])
+        assert test_cb.call_count == 1
+        callback([(5, 6, 7, 8), (0, 0, 1, 1)])
+        test_cb.assert_called_with([(0, 0, 1, 1)], [(1, 2, 3, 4)])
+
+    def test_subscribe(self):
+        """Test subscribing with a rate limit"""
+        dispatcher = SignalDispatcher(('foo',))
+        test_cb = Mock()
+        subscription = dispatcher.subscribe('foo', test_cb, max_rate=50)
+        assert isinstance(subscription.callback, CoalescedCallback)
+        for i in range(3):
+            dispatcher.dispatch('foo', GLib.Variant('(i)', (i,)))
+        test_cb.assert_called_once_with(0)
+        pending = subscription.callback._source
+        assert pending is not None
+        subscription.unsubscribe()
+        assert pending.is_destroyed()
+        assert test_cb.call_count == 1
+
+
+class TestDecodingCallback(object):
+
+    """Unittests for callbacks decoding the parameters themselves"""
+
+    def test_decode(self):
+        """Test that only callbacks without decode get unpacked values"""
+        dispatcher = SignalDispatcher(('foo',))
+        plain_cb = Mock()
+        decoded_cb = Mock()
+        parameters = GLib.Variant('(ii)', (1, 2))
+        dispatcher.subscribe('foo', decoded_cb,
+                             decode=lambda params: (params.n_children(),))
+        dispatcher.dispatch('foo', parameters)
+        decoded_cb.assert_called_once_with(2)
+
+        dispatcher.subscribe('foo', plain_cb)
+        dispatcher.dispatch('foo', parameters)
+        plain_cb.assert_called_once_with(1, 2)
+        assert decoded_cb.call_count == 2
+
+    def test_coalesced(self):
+        """Test that decode and max_rate are combined"""
+        dispatcher = SignalDispatcher(('foo',))
+        subscription = dispatcher.subscribe('foo', Mock(), max_rate=10,
+                                            decode=tuple)
+        assert isinstance(subscription.callback, DecodingCallback)
+        assert isinstance(subscription.callback.callback, CoalescedCallback)
+        subscription.callback.callback.cancel = Mock()
+        assert subscription.unsubscribe() is True
+        subscription.callback.callback.cancel.assert_called_once_with()
+
+    def test_no_delta(self):
+        """Test that delta compares unpacked values only"""
+        dispatcher = SignalDispatcher(('foo',))
+        with pytest.raises(ValueError):
+            dispatcher.subscribe('foo', Mock(), delta=True, decode=tuple)
@@ -0,0 +1,220 @@
+"""Unittests for ControllerState class in state.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+import threading
+
+from gstswitch.controller import Controller, PreviewPort
+from gstswitch.state import ControllerState, ServerState
+import pytest
+from gi.repository import GLib
+from mock import Mock
+
+
+class MockConnection(object):
+
+    """A class which mocks the Connection class and counts the calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def is_connected(self):
+        """mock of is_connected"""
+        return True
+
+    def reply(self, signature, value):
+        """Count the call and pack the reply"""
+        self.calls += 1
+        return GLib.Variant(signature, (value,))
+
+    def get_state(self, **_):
+        """mock of get_state"""
+        return self.reply('(a{sv})', STATE)
+
+
+STATE = {
+    'compose_port': GLib.Variant('i', 3001),
+    'encode_port': GLib.Variant('i', 3002),
+    'audio_port': GLib.Variant('i', 4000),
+    'composite_mode': GLib.Variant('i', 1),
+    'preview_ports': GLib.Variant('a(iii)', [(3003, 1, 4), (3004, 1, 4)]),
+    'pip': GLib.Variant('(iiii)', (10, 20, 300, 200)),
+    'record_filename': GLib.Variant('s', ''),
+    'unknown_key': GLib.Variant('b', True),
+}
+
+
+def make_controller():
+    """Controller with a mocked connection and the cache enabled"""
+    controller = Controller(address='unix:abstract=abcdef')
+    controller.connection = MockConnection()
+    controller.enable_state_cache()
+    return controller
+
+
+class TestControllerState(object):
+
+    """Unittests for the ControllerState"""
+
+    def test_fetch_once(self):
+        """Test that the values are fetched once and then read locally"""
+        controller = make_controller()
+        state = controller.state
+        assert not state.is_valid()
+        assert state.compose_port == 3001
+        calls = controller.connection.calls
+        assert calls == 1
+        for _ in range(10):
+            assert state.encode_port == 3002
+            assert state.audio_port == 4000
+            assert state.composite_mode == 1
+            assert state.preview_ports == [3003, 3004]
+        assert controller.connection.calls == calls
+
+    def test_enable_twice(self):
+        """Test that enabling the cache twice returns the same state"""
+        controller = make_controller()
+        state = controller.state
+        assert controller.enable_state_cache() is state
+        assert controller.callbacks['new_mode_online'] == [
+            state.cb_new_mode_online]
+
+    def test_disable(self):
+        """Test that disabling the cache removes the callbacks"""
+        controller = make_controller()
+        controller.disable_state_cache()
+        assert controller.state is None
+        assert controller.callbacks['preview_port_added'] == []
+        assert controller.callbacks['preview_port_removed'] == []
+        assert controller.callbacks['new_mode_online'] == []
+
+    def test_signals(self):
+        """Test that signals update the cached values"""
+        controller = make_controller()
+        state = controller.state
+        state.refresh()
+        calls = controller.connection.calls
+
+        controller.cb_signal_handler(
+            None, None, None, None, 'new_mode_online',
+            GLib.Variant('(i)', (3,)), None)
+        controller.cb_signal_handler(
+            None, None, None, None, 'preview_port_added',
+            GLib.Variant('(iii)', (3005, 2, 6)), None)
+        controller.cb_signal_handler(
+            None, None, None, None, 'preview_port_removed',
+            GLib.Variant('(iii)', (3003, 1, 4)), None)
+
+        assert state.composite_mode == 3
+        assert state.preview_ports == [3004, 3005]
+        assert state.preview_port_info[1] == PreviewPort(3005, 2, 6)
+        assert controller.connection.calls == calls
+
+    def test_audio_port(self):
+        """Test that an audio switch changes the audio port and a new
+        audio source makes it fetched again"""
+        controller = make_controller()
+        state = controller.state
+        state.refresh()
+        calls = controller.connection.calls
+        controller.cb_signal_handler(
+            None, None, None, None, 'switch_completed',
+            GLib.Variant('(uiixxb)', (7, Controller.AUDIO_CHANNEL, 4001,
+                                      1, 2, True)), None)
+        assert state.audio_port == 4001
+        controller.cb_signal_handler(
+            None, None, None, None, 'switch_completed',
+            GLib.Variant('(uiixxb)', (8, Controller.VIDEO_CHANNEL_A, 3003,
+                                      1, 2, True)), None)
+        assert state.audio_port == 4001
+        assert controller.connection.calls == calls
+        controller.cb_signal_handler(
+            None, None, None, None, 'preview_port_removed',
+            GLib.Variant('(iii)', (4001, 2, 0)), None)
+        assert state.audio_port == 4000
+        assert controller.connection.calls == calls + 1
+
+    def test_fetch_unlocked(self):
+        """Test that fetching does not hold the lock and is repeated when
+        a signal arrived meanwhile"""
+        controller = Controller(address='unix:abstract=abcdef')
+        state = ControllerState(controller)
+        states = [ServerState(composite_mode=mode, preview_ports=[])
+                  for mode in (0, 1)]
+
+        def get_state(**_):
+            """Signal from another thread while fetching first"""
+            if len(states) == 2:
+                thread = threading.Thread(target=state.cb_new_mode_online,
+                                          args=(1,))
+                thread.start()
+                thread.join(5)
+                assert not thread.is_alive()
+            return states.pop(0)
+        controller.get_state = Mock(side_effect=get_state)
+        state.refresh()
+        assert controller.get_state.call_count == 2
+        assert state.composite_mode == 1
+
+    def test_signals_before_fetch(self):
+        """Test that signals are ignored while nothing is cached"""
+        controller = make_controller()
+        controller.state.cb_new_mode_online(3)
+        assert not controller.state.is_valid()
+        assert controller.state.composite_mode == 1
+
+    def test_invalidate_on_reconnect(self, monkeypatch):
+        """Test that a new connection invalidates the cache"""
+        import gstswitch.controller
+        monkeypatch.setattr(gstswitch.controller, 'Connection', Mock())
+        controller = make_controller()
+        state = controller.state
+        state.refresh()
+        controller.connection.is_connected = Mock(return_value=False)
+        controller.connection.disconnect_dbus = Mock()
+        controller.establish_connection()
+        assert not state.is_valid()
+
+    def test_refresh_arguments(self):
+        """Test that timeout and cancellable are used for fetching"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(return_value=ServerState(
+            compose_port=1, encode_port=2, audio_port=3, composite_mode=0,
+            preview_ports=[]))
+        state = ControllerState(controller)
+        state.refresh(timeout=20)
+        controller.get_state.assert_called_once_with(
+            timeout=20, cancellable=None)
+        assert state.preview_ports == []
+        assert state.audio_port == 3
+
+
+class TestServerState(object):
+
+    """Unittests for the ServerState"""
+
+    def test_from_dict(self):
+        """Test decoding the dict returned by get_state"""
+        state = ServerState.from_dict(GLib.Variant(
+            'a{sv}', STATE).unpack())
+        assert state.compose_port == 3001
+        assert state.preview_ports == [PreviewPort(3003, 1, 4),
+                                       PreviewPort(3004, 1, 4)]
+        assert isinstance(state.preview_ports[0], PreviewPort)
+        assert state.pip == (10, 20, 300, 200)
+        assert state.record_filename == ''
+        assert state.channel_a is None
+
+    def test_unexpected(self):
+        """Test that only known fields can be set"""
+        with pytest.raises(TypeError):
+            ServerState(foo=1)
+        with pytest.raises(AttributeError):
+            ServerState().foo = 1
+
+    def test_equal(self):
+        """Test comparing snapshots"""
+        assert ServerState(inputs=2) == ServerState(inputs=2)
+        assert ServerState(inputs=2) != ServerState(inputs=3)
+        assert 'inputs=2' in repr(ServerState(inputs=2))
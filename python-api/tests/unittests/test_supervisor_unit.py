@@ -0,0 +1,222 @@
+"""Unittests for supervisor.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from time import sleep, time
+from gstswitch.supervisor import RestartEvent, Supervisor
+from gstswitch.exception import ConnectionError, ServerProcessError
+from mock import Mock
+import pytest
+
+
+class MockProcess(object):
+
+    """A process which runs until it is terminated or crashed"""
+
+    def __init__(self, ignore_terminate=False):
+        self.returncode = None
+        self.ignore_terminate = ignore_terminate
+        self.killed = False
+
+    def poll(self):
+        """Get the return code"""
+        return self.returncode
+
+    def terminate(self):
+        """Terminate unless ignoring it"""
+        if not self.ignore_terminate:
+            self.returncode = -15
+
+    def kill(self):
+        """Kill the process"""
+        self.killed = True
+        self.returncode = -9
+
+    def wait(self):
+        """Get the return code"""
+        return self.returncode
+
+
+class MockServer(object):
+
+    """A Server whose run fails as often as told"""
+
+    def __init__(self):
+        self.proc = None
+        self.failures = 0
+        self.runs = 0
+
+    def run(self, timeout=None):
+        """Start a new process"""
+        self.runs += 1
+        self.proc = MockProcess()
+        if self.failures:
+            self.failures -= 1
+            self.proc.returncode = 1
+            raise ServerProcessError('Server exited with code 1 before it '
+                                     'was ready')
+
+    def stop(self, timeout=None):
+        """Terminate the process, killing it after timeout"""
+        proc, self.proc = self.proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        deadline = time() + timeout
+        while proc.poll() is None and time() < deadline:
+            sleep(0.001)
+        if proc.poll() is None:
+            proc.kill()
+
+    @staticmethod
+    def discover_address():
+        """The address of the server"""
+        return 'unix:abstract=abcd'
+
+    def controller(self, **kwargs):
+        """A Controller whose probe passes"""
+        return Mock()
+
+
+def restarted(supervisor, count):
+    """Wait until supervisor reported count restarts"""
+    deadline = time() + 5
+    while supervisor.restarts < count:
+        assert time() < deadline
+        sleep(0.01)
+
+
+class TestRestartEvent(object):
+
+    """Unittests for the RestartEvent"""
+
+    def test_timing(self):
+        """Test the downtime and the startup time"""
+        event = RestartEvent('exited', -11, 1, 10.0, 10.5, 12.0,
+                             'unix:abstract=abcd', None)
+        assert event.ok
+        assert event.downtime == 2
+        assert event.startup == 1.5
+
+    def test_failed(self):
+        """Test that a failed restart has no timing"""
+        event = RestartEvent('unresponsive', None, 2, 10.0, 10.5, None,
+                             None, ServerProcessError())
+        assert not event.ok
+        assert event.downtime is None
+        assert event.startup is None
+
+
+class TestSupervisor(object):
+
+    """Unittests for the Supervisor"""
+
+    def test_arguments(self):
+        """Test that invalid arguments are refused"""
+        with pytest.raises(ValueError):
+            Supervisor(MockServer(), interval=0)
+        with pytest.raises(ValueError):
+            Supervisor(MockServer(), max_failures=0)
+        with pytest.raises(ValueError):
+            Supervisor(MockServer(), probe=1234)
+        with pytest.raises(ValueError):
+            Supervisor(MockServer()).on_restart(1234)
+
+    def test_start_stop(self):
+        """Test that the server is run and terminated"""
+        server = MockServer()
+        supervisor = Supervisor(server, interval=0.01)
+        supervisor.start()
+        assert supervisor.running
+        proc = server.proc
+        with pytest.raises(RuntimeError):
+            supervisor.start()
+        supervisor.stop()
+        assert not supervisor.running
+        assert server.runs == 1
+        assert proc.returncode == -15
+        assert server.proc is None
+
+    def test_crash(self):
+        """Test that an exited server is restarted"""
+        server = MockServer()
+        supervisor = Supervisor(server, interval=0.01, probe=lambda _: True)
+        test_cb = Mock()
+        supervisor.on_restart(test_cb)
+        with supervisor:
+            server.proc.returncode = -11
+            restarted(supervisor, 1)
+        event = test_cb.call_args[0][0]
+        assert event.reason == 'exited'
+        assert event.exit_code == -11
+        assert event.attempt == 1
+        assert event.address == 'unix:abstract=abcd'
+        assert event.downtime >= event.startup >= 0
+        assert list(supervisor.events) == [event]
+        assert server.runs == 2
+
+    def test_hang(self):
+        """Test that a server failing max_failures probes is killed and
+        restarted"""
+        server = MockServer()
+        supervisor = Supervisor(
+            server, interval=0.01, max_failures=2,
+            probe=lambda server: not server.proc.ignore_terminate)
+        supervisor.KILL_TIMEOUT = 0.01
+        with supervisor:
+            hung = server.proc
+            hung.ignore_terminate = True
+            restarted(supervisor, 1)
+        assert hung.killed
+        assert supervisor.events[0].reason == 'unresponsive'
+        assert supervisor.events[0].exit_code is None
+
+    def test_probe_raises(self):
+        """Test that a probe raising counts as failed"""
+        server = MockServer()
+        supervisor = Supervisor(server, interval=0.01, max_failures=1,
+                                probe=Mock(side_effect=ConnectionError))
+        with supervisor:
+            restarted(supervisor, 1)
+        assert supervisor.events[0].reason == 'unresponsive'
+
+    def test_backoff(self):
+        """Test that failed restarts are reported and retried"""
+        server = MockServer()
+        supervisor = Supervisor(server, interval=0.01, backoff=0.01,
+                                backoff_max=0.02, probe=lambda _: True)
+        with supervisor:
+            server.failures = 2
+            server.proc.returncode = 1
+            restarted(supervisor, 3)
+        events = list(supervisor.events)
+        assert [event.attempt for event in events] == [1, 2, 3]
+        assert [event.ok for event in events] == [False, False, True]
+        assert isinstance(events[0].error, ServerProcessError)
+        assert events[2].downtime > events[2].startup
+
+    def test_callback_raises(self):
+        """Test that a raising Callback does not stop the Supervisor"""
+        server = MockServer()
+        supervisor = Supervisor(server, interval=0.01, probe=lambda _: True)
+        supervisor.on_restart(Mock(side_effect=ValueError))
+        with supervisor:
+            server.proc.returncode = -11
+            restarted(supervisor, 1)
+            server.proc.returncode = -11
+            restarted(supervisor, 2)
+
+    def test_default_probe(self):
+        """Test probing with a Controller, reconnecting after a failure"""
+        server = MockServer()
+        controller = Mock()
+        controller.get_compose_port.side_effect = [3001, ConnectionError]
+        server.controller = Mock(return_value=controller)
+        supervisor = Supervisor(server, probe_timeout=500)
+        server.run()
+        assert supervisor.probe(server)
+        server.controller.assert_called_once_with(timeout=500)
+        assert not supervisor.probe(server)
+        controller.close.assert_called_once_with()
+        assert supervisor._controller is None
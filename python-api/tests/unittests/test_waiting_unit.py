@@ -0,0 +1,141 @@
+"""Unittests for waiting.py"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, "../../../")))
+
+from gstswitch.controller import Controller
+from gstswitch.exception import (ConnectionUnknownMethodError,
+                                 WaitTimeoutError)
+from gstswitch.state import PreviewPort, ServerState
+from gi.repository import GLib
+from mock import Mock
+import pytest
+
+
+def signal_later(controller, name, *args):
+    """Dispatch the signal name from the MainContext as if it came from
+    the server"""
+    signature = '({0})'.format('i' * len(args))
+
+    def emit():
+        """Dispatch the signal"""
+        controller.cb_signal_handler(None, None, None, None, name,
+                                     GLib.Variant(signature, args), None)
+        return False
+    GLib.idle_add(emit)
+
+
+class TestWaitForMode(object):
+
+    """Unittests for wait_for_mode"""
+
+    def test_current(self):
+        """Test that the current mode needs no signal"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(return_value=ServerState(
+            composite_mode=1, transition_request=0))
+        assert controller.wait_for_mode(1, timeout=0) is True
+        assert not controller.signals.callbacks['new_mode_online']
+
+    def test_signal(self):
+        """Test waiting for the new_mode_online signal"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(return_value=ServerState(
+            composite_mode=0, transition_request=0))
+        signal_later(controller, 'new_mode_online', 2)
+        signal_later(controller, 'new_mode_online', 3)
+        assert controller.wait_for_mode(3, timeout=5) is True
+
+    def test_pending(self):
+        """Test that a mode which is set but not rendered yet waits for
+        the new_mode_online signal"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(return_value=ServerState(
+            composite_mode=3, transition_request=7))
+        with pytest.raises(WaitTimeoutError):
+            controller.wait_for_mode(3, timeout=0.05)
+        signal_later(controller, 'new_mode_online', 3)
+        assert controller.wait_for_mode(3, timeout=5) is True
+
+    def test_transition_completed(self):
+        """Test that the state is read again once a transition completed"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(side_effect=[
+            ServerState(composite_mode=1, transition_request=7),
+            ServerState(composite_mode=1, transition_request=0)])
+        signal_later(controller, 'transition_completed', 7, 1, 0, 0, 0)
+        assert controller.wait_for_mode(1, timeout=5) is True
+        assert controller.get_state.call_count == 2
+
+    def test_without_get_state(self):
+        """Test that a server without get_state is asked for its
+        composite mode instead"""
+        for error in (ConnectionUnknownMethodError('No such method'),
+                      ValueError("Unknown remote method 'get_state'")):
+            controller = Controller(address='unix:abstract=abcdef')
+            controller.get_state = Mock(side_effect=error)
+            controller.get_composite_mode = Mock(side_effect=[0, 2])
+            signal_later(controller, 'transition_completed', 7, 2, 0, 0, 0)
+            assert controller.wait_for_mode(2, timeout=5) is True
+            assert controller.get_state.call_count == 1
+            assert controller.get_composite_mode.call_count == 2
+
+    def test_timeout(self):
+        """Test that WaitTimeoutError is raised"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_state = Mock(return_value=ServerState(
+            composite_mode=0, transition_request=0))
+        signal_later(controller, 'new_mode_online', 2)
+        with pytest.raises(WaitTimeoutError):
+            controller.wait_for_mode(3, timeout=0.05)
+        assert not controller.signals.callbacks['new_mode_online']
+
+
+class TestWaitForSignal(object):
+
+    """Unittests for wait_for_signal"""
+
+    def test_predicate(self):
+        """Test that only a matching signal ends the wait"""
+        controller = Controller(address='unix:abstract=abcdef')
+        signal_later(controller, 'preview_port_added', 3003, 1, 2)
+        signal_later(controller, 'preview_port_added', 3004, 2, 2)
+        assert controller.wait_for_signal(
+            'preview_port_added', lambda port, serve, _: serve == 2,
+            timeout=5) == (3004, 2, 2)
+
+    def test_timeout(self):
+        """Test that WaitTimeoutError is raised"""
+        controller = Controller(address='unix:abstract=abcdef')
+        with pytest.raises(WaitTimeoutError):
+            controller.wait_for_signal('new_mode_online', timeout=0.01)
+
+
+class TestWaitForPreviewPorts(object):
+
+    """Unittests for wait_for_preview_ports"""
+
+    def test_ports(self):
+        """Test waiting until enough ports are added"""
+        controller = Controller(address='unix:abstract=abcdef')
+        ports = [PreviewPort(3003, 1, 2), PreviewPort(3004, 2, 2)]
+        controller.get_preview_port_info = Mock(
+            side_effect=[ports[:1], ports])
+        signal_later(controller, 'preview_port_added', 3004, 2, 2)
+        assert controller.wait_for_preview_ports(2, timeout=5) == ports
+
+    def test_serve(self):
+        """Test counting the ports serving one type of material"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_preview_port_info = Mock(
+            return_value=[PreviewPort(3003, 1, 2)])
+        assert controller.wait_for_preview_ports(
+            1, timeout=0, serve=1) == [PreviewPort(3003, 1, 2)]
+        with pytest.raises(WaitTimeoutError):
+            controller.wait_for_preview_ports(1, timeout=0.01, serve=2)
+
+    def test_none(self):
+        """Test that zero ports can be waited for"""
+        controller = Controller(address='unix:abstract=abcdef')
+        controller.get_preview_port_info = Mock(return_value=[])
+        assert controller.wait_for_preview_ports(0, timeout=0) == []
@@ -23,6 +23,7 @@
 #include "config.h"
 #endif
 
+#include <stdio.h>
 #include "gstswitchcontroller.h"
 #include "gstswitchserver.h"
 #include "gstswitchclient.h"
@@ -34,6 +35,7 @@ G_DEFINE_TYPE (GstSwitchController, gst_switch_controller, G_TYPE_OBJECT);
 
 static GDBusNodeInfo *introspection_data = NULL;
 gint gst_switch_controller_dbus_timeout = 5000;
+gint gst_switch_controller_marker_rate = 0;
 
 /**
  * @brief Helper function for matching remoting method names.
@@ -315,6 +317,16 @@ gst_switch_controller_init (GstSwitchController * controller)
   g_mutex_init (&controller->clients_lock);
   controller->clients = NULL;
 
+  g_mutex_init (&controller->markers_lock);
+  controller->face_marker.signal_name = "show_face_marker";
+  controller->face_marker.pending = NULL;
+  controller->face_marker.last_emit = 0;
+  controller->face_marker.source = 0;
+  controller->track_marker.signal_name = "show_track_marker";
+  controller->track_marker.pending = NULL;
+  controller->track_marker.last_emit = 0;
+  controller->track_marker.source = 0;
+
   flags |= G_DBUS_SERVER_FLAGS_RUN_IN_THREAD;
   flags |= G_DBUS_SERVER_FLAGS_AUTHENTICATION_ALLOW_ANONYMOUS;
 
@@ -329,8 +341,12 @@ gst_switch_controller_init (GstSwitchController * controller)
 
   g_free (guid);
 
-  INFO ("Controller is listening at: %s",
+  /* Clients read the address from this line, e.g. to learn the socket
+   * of a unix:tmpdir= address, so it is printed even without DEBUG and
+   * flushed right away. */
+  g_print ("Controller is listening at: %s\n",
       g_dbus_server_get_client_address (controller->bus_server));
+  fflush (stdout);
 
   g_signal_connect (controller->bus_server, "new-connection",
       G_CALLBACK (gst_switch_controller_on_new_connection), controller);
@@ -358,6 +374,13 @@ gst_switch_controller_finalize (GstSwitchController * controller)
 
   g_mutex_clear (&controller->clients_lock);
 
+  /* the timeouts hold a reference, so none of them is pending here */
+  if (controller->face_marker.pending)
+    g_variant_unref (controller->face_marker.pending);
+  if (controller->track_marker.pending)
+    g_variant_unref (controller->track_marker.pending);
+  g_mutex_clear (&controller->markers_lock);
+
   if (G_OBJECT_CLASS (gst_switch_controller_parent_class)->finalize)
     (*G_OBJECT_CLASS (gst_switch_controller_parent_class)->finalize)
         (G_OBJECT (controller));
@@ -465,20 +488,178 @@ gst_switch_controller_select_face (GstSwitchController * controller,
   return TRUE;
 }
 
+/**
+ *  @memberof GstSwitchController
+ *  @param controller the GstSwitchController instance
+ *  @param request the id of the switch request
+ *  @param channel the channel switched
+ *  @param port the port switched to
+ *  @param start monotonic time of the request in microseconds
+ *  @param end monotonic time the new streams were online, or the request
+ *         failed
+ *  @param ok TRUE if both streams were switched
+ *
+ *  Tell the clients that a switch request completed.
+ */
+void
+gst_switch_controller_tell_switch_completed (GstSwitchController * controller,
+    guint request, gint channel, gint port, gint64 start, gint64 end,
+    gboolean ok)
+{
+  gst_switch_controller_emit_signal (controller, "switch_completed",
+      g_variant_new ("(uiixxb)", request, channel, port, start, end, ok));
+}
+
+/**
+ *  @memberof GstSwitchController
+ *  @param controller the GstSwitchController instance
+ *  @param request the id of the adjust_pip request
+ *  @param x the new PIP X position
+ *  @param y the new PIP Y position
+ *  @param w the new PIP width
+ *  @param h the new PIP height
+ *  @param start monotonic time of the request in microseconds
+ *  @param end monotonic time the composite applied the PIP
+ *  @param ok TRUE if the PIP was applied
+ *
+ *  Tell the clients that a PIP adjustment completed.
+ */
+void
+gst_switch_controller_tell_pip_adjusted (GstSwitchController * controller,
+    guint request, gint x, gint y, gint w, gint h, gint64 start, gint64 end,
+    gboolean ok)
+{
+  gst_switch_controller_emit_signal (controller, "pip_adjusted",
+      g_variant_new ("(uiiiixxb)", request, x, y, w, h, start, end, ok));
+}
+
+/**
+ *  @memberof GstSwitchController
+ *  @param controller the GstSwitchController instance
+ *  @param request the id of the set_composite_mode request
+ *  @param mode the requested mode
+ *  @param start monotonic time of the request in microseconds
+ *  @param end monotonic time the new mode was online, or the request
+ *         failed
+ *  @param ok TRUE if the mode is online
+ *
+ *  Tell the clients that a composite mode transition completed.
+ */
+void
+gst_switch_controller_tell_transition_completed (GstSwitchController *
+    controller, guint request, gint mode, gint64 start, gint64 end,
+    gboolean ok)
+{
+  gst_switch_controller_emit_signal (controller, "transition_completed",
+      g_variant_new ("(uixxb)", request, mode, start, end, ok));
+}
+
+/**
+ * @brief Emit the pending markers of a marker signal.
+ * @param controller the GstSwitchController instance
+ * @param marker the marker to flush
+ * @return FALSE to remove the timeout source
+ * @memberof GstSwitchController
+ */
+static gboolean
+gst_switch_controller_flush_marker (GstSwitchController * controller,
+    GstSwitchControllerMarker * marker)
+{
+  GVariant *faces;
+
+  g_mutex_lock (&controller->markers_lock);
+  faces = marker->pending;
+  marker->pending = NULL;
+  marker->source = 0;
+  marker->last_emit = g_get_monotonic_time ();
+  g_mutex_unlock (&controller->markers_lock);
+
+  if (faces) {
+    gst_switch_controller_emit_signal (controller, marker->signal_name,
+        g_variant_new_tuple (&faces, 1));
+    g_variant_unref (faces);
+  }
+  return FALSE;
+}
+
+static gboolean
+gst_switch_controller_flush_face_marker (GstSwitchController * controller)
+{
+  return gst_switch_controller_flush_marker (controller,
+      &controller->face_marker);
+}
+
+static gboolean
+gst_switch_controller_flush_track_marker (GstSwitchController * controller)
+{
+  return gst_switch_controller_flush_marker (controller,
+      &controller->track_marker);
+}
+
+/**
+ * @brief Emit a marker signal at most gst_switch_controller_marker_rate
+ *        times per second.
+ * @param controller the GstSwitchController instance
+ * @param marker the marker to emit
+ * @param faces the markers, an array of (x, y, w, h)
+ * @param flush the timeout function flushing @marker
+ * @memberof GstSwitchController
+ *
+ * Markers arriving faster than the rate replace the pending ones, which
+ * are emitted by a timeout once the interval has passed. Clients thus
+ * always get the latest markers and the server does not send markers
+ * which would be outdated on arrival anyway.
+ */
+static void
+gst_switch_controller_emit_marker (GstSwitchController * controller,
+    GstSwitchControllerMarker * marker, GVariant * faces, GSourceFunc flush)
+{
+  gint64 now, wait;
+
+  if (gst_switch_controller_marker_rate <= 0) {
+    gst_switch_controller_emit_signal (controller, marker->signal_name,
+        g_variant_new_tuple (&faces, 1));
+    return;
+  }
+
+  now = g_get_monotonic_time ();
+
+  g_mutex_lock (&controller->markers_lock);
+  wait = marker->last_emit - now +
+      G_USEC_PER_SEC / gst_switch_controller_marker_rate;
+  if (wait <= 0 && marker->source == 0) {
+    marker->last_emit = now;
+    g_mutex_unlock (&controller->markers_lock);
+    gst_switch_controller_emit_signal (controller, marker->signal_name,
+        g_variant_new_tuple (&faces, 1));
+    return;
+  }
+
+  if (marker->pending)
+    g_variant_unref (marker->pending);
+  marker->pending = g_variant_ref_sink (faces);
+  if (marker->source == 0) {
+    marker->source = g_timeout_add_full (G_PRIORITY_DEFAULT,
+        MAX (wait, 0) / 1000 + 1, flush, g_object_ref (controller),
+        g_object_unref);
+  }
+  g_mutex_unlock (&controller->markers_lock);
+}
+
 void
 gst_switch_controller_show_face_marker (GstSwitchController * controller,
     GVariant * faces)
 {
-  gst_switch_controller_emit_signal (controller, "show_face_marker",
-      g_variant_new_tuple (&faces, 1));
+  gst_switch_controller_emit_marker (controller, &controller->face_marker,
+      faces, (GSourceFunc) gst_switch_controller_flush_face_marker);
 }
 
 void
 gst_switch_controller_show_track_marker (GstSwitchController * controller,
     GVariant * faces)
 {
-  gst_switch_controller_emit_signal (controller, "show_track_marker",
-      g_variant_new_tuple (&faces, 1));
+  gst_switch_controller_emit_marker (controller, &controller->track_marker,
+      faces, (GSourceFunc) gst_switch_controller_flush_track_marker);
 }
 
 /**
@@ -573,6 +754,39 @@ gst_switch_controller__get_preview_ports (GstSwitchController * controller,
   return result;
 }
 
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "get_preview_port_info".
+ */
+static GVariant *
+gst_switch_controller__get_preview_port_info (GstSwitchController *
+    controller, GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  if (controller->server) {
+    GArray *serves = NULL, *types = NULL;
+    GArray *ports =
+        gst_switch_server_get_preview_sink_ports (controller->server, &serves,
+        &types);
+    GVariantBuilder builder;
+    int n;
+
+    g_variant_builder_init (&builder, G_VARIANT_TYPE ("a(iii)"));
+    for (n = 0; n < ports->len; ++n) {
+      g_variant_builder_add (&builder, "(iii)",
+          g_array_index (ports, gint, n),
+          g_array_index (serves, gint, n), g_array_index (types, gint, n));
+    }
+    result = g_variant_new ("(a(iii))", &builder);
+
+    g_array_free (ports, TRUE);
+    g_array_free (serves, TRUE);
+    g_array_free (types, TRUE);
+  }
+  return result;
+}
+
 /**
  * @memberof GstSwitchController
  *
@@ -587,12 +801,35 @@ gst_switch_controller__set_composite_mode (GstSwitchController * controller,
   gint mode;
   g_variant_get (parameters, "(i)", &mode);
   if (controller->server) {
-    ok = gst_switch_server_set_composite_mode (controller->server, mode);
+    ok = gst_switch_server_set_composite_mode (controller->server, mode, NULL);
     result = g_variant_new ("(b)", ok);
   }
   return result;
 }
 
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "set_composite_mode_request", replies the id of
+ * the request too, as carried by its transition_completed signal.
+ */
+static GVariant *
+gst_switch_controller__set_composite_mode_request (GstSwitchController *
+    controller, GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  gboolean ok = FALSE;
+  guint request = 0;
+  gint mode;
+  g_variant_get (parameters, "(i)", &mode);
+  if (controller->server) {
+    ok = gst_switch_server_set_composite_mode (controller->server, mode,
+        &request);
+    result = g_variant_new ("(bu)", ok, request);
+  }
+  return result;
+}
+
 /**
  * @memberof GstSwitchController
  *
@@ -611,6 +848,45 @@ gst_switch_controller__get_composite_mode (GstSwitchController * controller,
   return result;
 }
 
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "get_version".
+ */
+static GVariant *
+gst_switch_controller__get_version (GstSwitchController * controller,
+    GDBusConnection * connection, GVariant * parameters)
+{
+  return g_variant_new ("(s)", PACKAGE_VERSION);
+}
+
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "get_state".
+ */
+static GVariant *
+gst_switch_controller__get_state (GstSwitchController * controller,
+    GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  GVariantBuilder builder;
+  gint clients;
+  if (controller->server) {
+    g_variant_builder_init (&builder, G_VARIANT_TYPE ("a{sv}"));
+    gst_switch_server_build_state (controller->server, &builder);
+
+    GST_SWITCH_CONTROLLER_LOCK_CLIENTS (controller);
+    clients = g_list_length (controller->clients);
+    GST_SWITCH_CONTROLLER_UNLOCK_CLIENTS (controller);
+    g_variant_builder_add (&builder, "{sv}", "controller_clients",
+        g_variant_new_int32 (clients));
+
+    result = g_variant_new ("(a{sv})", &builder);
+  }
+  return result;
+}
+
 /**
  * @memberof GstSwitchController
  *
@@ -643,12 +919,35 @@ gst_switch_controller__adjust_pip (GstSwitchController * controller,
   guint res = 0;
   g_variant_get (parameters, "(iiii)", &dx, &dy, &dw, &dh);
   if (controller->server) {
-    res = gst_switch_server_adjust_pip (controller->server, dx, dy, dw, dh);
+    res = gst_switch_server_adjust_pip (controller->server, dx, dy, dw, dh,
+        NULL);
     result = g_variant_new ("(u)", res);
   }
   return result;
 }
 
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "adjust_pip_request", replies the id of the
+ * request too, as carried by its pip_adjusted signal.
+ */
+static GVariant *
+gst_switch_controller__adjust_pip_request (GstSwitchController * controller,
+    GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  gint dx, dy, dw, dh;
+  guint res = 0, request = 0;
+  g_variant_get (parameters, "(iiii)", &dx, &dy, &dw, &dh);
+  if (controller->server) {
+    res = gst_switch_server_adjust_pip (controller->server, dx, dy, dw, dh,
+        &request);
+    result = g_variant_new ("(uu)", res, request);
+  }
+  return result;
+}
+
 /**
  * @memberof GstSwitchController
  *
@@ -663,12 +962,55 @@ gst_switch_controller__switch (GstSwitchController * controller,
   gboolean ok = FALSE;
   g_variant_get (parameters, "(ii)", &channel, &port);
   if (controller->server) {
-    ok = gst_switch_server_switch (controller->server, channel, port);
+    ok = gst_switch_server_switch (controller->server, channel, port, NULL);
     result = g_variant_new ("(b)", ok);
   }
   return result;
 }
 
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "switch_request", replies the id of the request
+ * too, as carried by its switch_completed signal.
+ */
+static GVariant *
+gst_switch_controller__switch_request (GstSwitchController * controller,
+    GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  gint channel, port;
+  gboolean ok = FALSE;
+  guint request = 0;
+  g_variant_get (parameters, "(ii)", &channel, &port);
+  if (controller->server) {
+    ok = gst_switch_server_switch (controller->server, channel, port,
+        &request);
+    result = g_variant_new ("(bu)", ok, request);
+  }
+  return result;
+}
+
+/**
+ * @memberof GstSwitchController
+ *
+ * Remoting method stub of "batch".
+ */
+static GVariant *
+gst_switch_controller__batch (GstSwitchController * controller,
+    GDBusConnection * connection, GVariant * parameters)
+{
+  GVariant *result = NULL;
+  GVariant *operations, *results;
+  g_variant_get (parameters, "(@a(sv))", &operations);
+  if (controller->server) {
+    results = gst_switch_server_batch (controller->server, operations);
+    result = g_variant_new ("(@av)", results);
+  }
+  g_variant_unref (operations);
+  return result;
+}
+
 /**
  * @memberof GstSwitchController
  *
@@ -730,16 +1072,26 @@ static MethodTableEntry gst_switch_controller_method_table[] = {
   {"get_audio_port", (MethodFunc) gst_switch_controller__get_audio_port},
   {"get_preview_ports",
       (MethodFunc) gst_switch_controller__get_preview_ports},
+  {"get_preview_port_info",
+      (MethodFunc) gst_switch_controller__get_preview_port_info},
   {"set_composite_mode",
       (MethodFunc) gst_switch_controller__set_composite_mode},
+  {"set_composite_mode_request",
+      (MethodFunc) gst_switch_controller__set_composite_mode_request},
   {"get_composite_mode",
       (MethodFunc) gst_switch_controller__get_composite_mode},
+  {"get_state", (MethodFunc) gst_switch_controller__get_state},
+  {"get_version", (MethodFunc) gst_switch_controller__get_version},
   {"new_record", (MethodFunc) gst_switch_controller__new_record},
   {"adjust_pip", (MethodFunc) gst_switch_controller__adjust_pip},
+  {"adjust_pip_request",
+      (MethodFunc) gst_switch_controller__adjust_pip_request},
   {"click_video", (MethodFunc) gst_switch_controller__click_video},
   {"mark_face", (MethodFunc) gst_switch_controller__mark_face},
   {"mark_tracking", (MethodFunc) gst_switch_controller__mark_tracking},
   {"switch", (MethodFunc) gst_switch_controller__switch},
+  {"switch_request", (MethodFunc) gst_switch_controller__switch_request},
+  {"batch", (MethodFunc) gst_switch_controller__batch},
   {NULL, NULL}
 };
 
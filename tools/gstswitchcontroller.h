@@ -40,6 +40,7 @@ typedef struct _GstSwitchControllerClass GstSwitchControllerClass;
 
 typedef GVariant *(*MethodFunc) (GObject *, GDBusConnection *, GVariant *);
 typedef struct _MethodTableEntry MethodTableEntry;
+typedef struct _GstSwitchControllerMarker GstSwitchControllerMarker;
 
 /**
  *  @brief Remote method table entry.
@@ -50,6 +51,21 @@ struct _MethodTableEntry
   MethodFunc func;              /*!< the bound function */
 };
 
+/**
+ *  @brief Rate limiting state of a marker signal.
+ *
+ *  When a marker rate is set, a marker signal is emitted at most that many
+ *  times per second. Markers arriving in between replace the pending one,
+ *  so the clients always get the latest markers.
+ */
+struct _GstSwitchControllerMarker
+{
+  const gchar *signal_name;     /*!< the signal to emit */
+  GVariant *pending;            /*!< the latest markers not yet emitted */
+  gint64 last_emit;             /*!< monotonic time of the last emission */
+  guint source;                 /*!< the timeout emitting %pending, or 0 */
+};
+
 /**
  *  @class GstSwitchController
  *  @struct _GstSwitchController
@@ -62,6 +78,9 @@ typedef struct _GstSwitchController
   GDBusServer *bus_server;      /*!< the dbus server instance */
   GMutex clients_lock;          /*!< the lock for %clients */
   GList *clients;               /*!< the client list */
+  GMutex markers_lock;          /*!< the lock for the markers */
+  GstSwitchControllerMarker face_marker;        /*!< show_face_marker state */
+  GstSwitchControllerMarker track_marker;       /*!< show_track_marker state */
 } GstSwitchController;
 
 /**
@@ -86,6 +105,14 @@ void gst_switch_controller_tell_new_mode_onlne (GstSwitchController *,
     gint mode);
 gboolean gst_switch_controller_select_face (GstSwitchController * controller,
     gint x, gint y);
+void gst_switch_controller_tell_switch_completed (GstSwitchController *,
+    guint request, gint channel, gint port, gint64 start, gint64 end,
+    gboolean ok);
+void gst_switch_controller_tell_pip_adjusted (GstSwitchController *,
+    guint request, gint x, gint y, gint w, gint h, gint64 start, gint64 end,
+    gboolean ok);
+void gst_switch_controller_tell_transition_completed (GstSwitchController *,
+    guint request, gint mode, gint64 start, gint64 end, gboolean ok);
 void gst_switch_controller_show_face_marker (GstSwitchController * controller,
     GVariant * faces);
 void gst_switch_controller_show_track_marker (GstSwitchController * controller,
@@ -93,5 +120,6 @@ void gst_switch_controller_show_track_marker (GstSwitchController * controller,
 
 extern const gchar gstswitchcontroller_introspection_xml[];
 extern gint gst_switch_controller_dbus_timeout;
+extern gint gst_switch_controller_marker_rate;
 
 #endif //__GST_SWITCH_CONTROLLER_H__
@@ -41,13 +41,27 @@ const gchar gstswitchcontroller_introspection_xml[] =
     "    <method name='get_preview_ports'>"
     "      <arg type='s' name='ports' direction='out'/>"
     "    </method>"
+    "    <method name='get_preview_port_info'>"
+    "      <arg type='a(iii)' name='ports' direction='out'/>"
+    "    </method>"
     "    <method name='set_composite_mode'>"
     "      <arg type='i' name='channel' direction='in'/>"
     "      <arg type='b' name='result' direction='out'/>"
     "    </method>"
+    "    <method name='set_composite_mode_request'>"
+    "      <arg type='i' name='channel' direction='in'/>"
+    "      <arg type='b' name='result' direction='out'/>"
+    "      <arg type='u' name='request' direction='out'/>"
+    "    </method>"
     "    <method name='get_composite_mode'>"
     "      <arg type='i' name='result' direction='out'/>"
     "    </method>"
+    "    <method name='get_state'>"
+    "      <arg type='a{sv}' name='state' direction='out'/>"
+    "    </method>"
+    "    <method name='get_version'>"
+    "      <arg type='s' name='version' direction='out'/>"
+    "    </method>"
     "    <method name='set_encode_mode'>"
     "      <arg type='i' name='channel' direction='in'/>"
     "      <arg type='b' name='result' direction='out'/>"
@@ -62,11 +76,29 @@ const gchar gstswitchcontroller_introspection_xml[] =
     "      <arg type='i' name='dh' direction='in'/>"
     "      <arg type='u' name='result' direction='out'/>"
     "    </method>"
+    "    <method name='adjust_pip_request'>"
+    "      <arg type='i' name='dx' direction='in'/>"
+    "      <arg type='i' name='dy' direction='in'/>"
+    "      <arg type='i' name='dw' direction='in'/>"
+    "      <arg type='i' name='dh' direction='in'/>"
+    "      <arg type='u' name='result' direction='out'/>"
+    "      <arg type='u' name='request' direction='out'/>"
+    "    </method>"
     "    <method name='switch'>"
     "      <arg type='i' name='channel' direction='in'/>"
     "      <arg type='i' name='port' direction='in'/>"
     "      <arg type='b' name='result' direction='out'/>"
     "    </method>"
+    "    <method name='switch_request'>"
+    "      <arg type='i' name='channel' direction='in'/>"
+    "      <arg type='i' name='port' direction='in'/>"
+    "      <arg type='b' name='result' direction='out'/>"
+    "      <arg type='u' name='request' direction='out'/>"
+    "    </method>"
+    "    <method name='batch'>"
+    "      <arg type='a(sv)' name='operations' direction='in'/>"
+    "      <arg type='av' name='results' direction='out'/>"
+    "    </method>"
     "    <method name='click_video'>"
     "      <arg type='i' name='x' direction='in'/>"
     "      <arg type='i' name='y' direction='in'/>"
@@ -104,6 +136,31 @@ const gchar gstswitchcontroller_introspection_xml[] =
     "      <arg type='i' name='x'/>"
     "      <arg type='i' name='y'/>"
     "    </signal>"
+    "    <signal name='switch_completed'>"
+    "      <arg type='u' name='request'/>"
+    "      <arg type='i' name='channel'/>"
+    "      <arg type='i' name='port'/>"
+    "      <arg type='x' name='start'/>"
+    "      <arg type='x' name='end'/>"
+    "      <arg type='b' name='ok'/>"
+    "    </signal>"
+    "    <signal name='pip_adjusted'>"
+    "      <arg type='u' name='request'/>"
+    "      <arg type='i' name='x'/>"
+    "      <arg type='i' name='y'/>"
+    "      <arg type='i' name='w'/>"
+    "      <arg type='i' name='h'/>"
+    "      <arg type='x' name='start'/>"
+    "      <arg type='x' name='end'/>"
+    "      <arg type='b' name='ok'/>"
+    "    </signal>"
+    "    <signal name='transition_completed'>"
+    "      <arg type='u' name='request'/>"
+    "      <arg type='i' name='mode'/>"
+    "      <arg type='x' name='start'/>"
+    "      <arg type='x' name='end'/>"
+    "      <arg type='b' name='ok'/>"
+    "    </signal>"
     "  </interface>"
     "</node>";
 /* *INDENT-ON* */
@@ -63,11 +63,41 @@
 #define GST_SWITCH_SERVER_UNLOCK_SERVE(srv) (g_mutex_unlock (&(srv)->serve_lock))
 #define GST_SWITCH_SERVER_LOCK_PIP(srv) (g_mutex_lock (&(srv)->pip_lock))
 #define GST_SWITCH_SERVER_UNLOCK_PIP(srv) (g_mutex_unlock (&(srv)->pip_lock))
+#define GST_SWITCH_SERVER_LOCK_REQUESTS(srv) (g_mutex_lock (&(srv)->requests_lock))
+#define GST_SWITCH_SERVER_UNLOCK_REQUESTS(srv) (g_mutex_unlock (&(srv)->requests_lock))
 #define GST_SWITCH_SERVER_LOCK_RECORDER(srv) (g_mutex_lock (&(srv)->recorder_lock))
 #define GST_SWITCH_SERVER_UNLOCK_RECORDER(srv) (g_mutex_unlock (&(srv)->recorder_lock))
 #define GST_SWITCH_SERVER_LOCK_CLOCK(srv) (g_mutex_lock (&(srv)->clock_lock))
 #define GST_SWITCH_SERVER_UNLOCK_CLOCK(srv) (g_mutex_unlock (&(srv)->clock_lock))
 
+#define GST_SWITCH_SERVER_SWITCH_DATA "gst-switch-server-switch"
+
+/**
+ *  GstSwitchServerSwitch:
+ *  @param srv the GstSwitchServer instance
+ *  @param request the id of the switch request
+ *  @param channel the channel switched
+ *  @param port the port switched to
+ *  @param start monotonic time of the request in microseconds
+ *  @param pending the number of new workers not online yet
+ *  @param ok FALSE once one of the new workers failed
+ *
+ *  A switch request waiting for its new workers to come online.
+ */
+typedef struct _GstSwitchServerSwitch
+{
+  GstSwitchServer *srv;
+  guint request;
+  gint channel;
+  gint port;
+  gint64 start;
+  gint pending;
+  gint ok;
+} GstSwitchServerSwitch;
+
+static void gst_switch_server_switch_done (GstWorker *, gboolean);
+static GSocket *gst_switch_server_listen (GstSwitchServer *, gint, gint *);
+
 #define gst_switch_server_parent_class parent_class
 G_DEFINE_TYPE (GstSwitchServer, gst_switch_server, G_TYPE_OBJECT);
 
@@ -210,6 +240,10 @@ static GOptionEntry entries[] = {
   {"dbus-timeout", 'd', 0, G_OPTION_ARG_INT,
         &gst_switch_controller_dbus_timeout,
       "DBus timeout in msec (default 5000)"},
+  {"marker-rate", 'm', 0, G_OPTION_ARG_INT,
+        &gst_switch_controller_marker_rate,
+      "Emit face and track markers at most RATE times per second, "
+        "the latest markers win (default 0, unlimited)", "RATE"},
   {"record", 'r', G_OPTION_FLAG_OPTIONAL_ARG, G_OPTION_ARG_CALLBACK,
         (gpointer) gparse_record_filename,
       "Enable recorder and record into the specified FILENAME"},
@@ -219,9 +253,9 @@ static GOptionEntry entries[] = {
         (gpointer) gparse_video_format,
       "Specify the video format to use (shortcuts supported)"},
   {"video-input-port", 'p', 0, G_OPTION_ARG_INT, &opts.video_input_port,
-      "Specify the video input listen port.", "NUM"},
+      "Specify the video input listen port, 0 picks a free one.", "NUM"},
   {"audio-input-port", 'a', 0, G_OPTION_ARG_INT, &opts.audio_input_port,
-      "Specify the audio input listen port.", "NUM"},
+      "Specify the audio input listen port, 0 picks a free one.", "NUM"},
   {"controller-address", 'c', 0, G_OPTION_ARG_STRING, &opts.controller_address,
       "Specify DBus-Address for remote control, defaults to "
         GST_SWITCH_SERVER_DEFAULT_CONTROLLER_ADDRESS ".", "ADDRESS"},
@@ -277,12 +311,17 @@ gst_switch_server_init (GstSwitchServer * srv)
   srv->cases = NULL;
   srv->composite = NULL;
   srv->alloc_port_count = 0;
+  srv->output_clients = 0;
 
   srv->pip_x = 0;
   srv->pip_y = 0;
   srv->pip_w = 0;
   srv->pip_h = 0;
 
+  srv->request_count = 0;
+  srv->transition_request = 0;
+  srv->adjust_request = 0;
+
   srv->clock = gst_system_clock_obtain ();
 
   g_mutex_init (&srv->main_loop_lock);
@@ -292,6 +331,7 @@ gst_switch_server_init (GstSwitchServer * srv)
   g_mutex_init (&srv->cases_lock);
   g_mutex_init (&srv->alloc_port_lock);
   g_mutex_init (&srv->pip_lock);
+  g_mutex_init (&srv->requests_lock);
   g_mutex_init (&srv->recorder_lock);
   g_mutex_init (&srv->clock_lock);
 }
@@ -359,6 +399,7 @@ gst_switch_server_finalize (GstSwitchServer * srv)
   g_mutex_clear (&srv->cases_lock);
   g_mutex_clear (&srv->alloc_port_lock);
   g_mutex_clear (&srv->pip_lock);
+  g_mutex_clear (&srv->requests_lock);
   g_mutex_clear (&srv->recorder_lock);
   g_mutex_clear (&srv->clock_lock);
 
@@ -395,12 +436,26 @@ gst_switch_server_quit (GstSwitchServer * srv, gint exit_code)
 /**
  * gst_switch_server_alloc_port:
  *
- * Allocate a new port number.
+ * Allocate a new port number. When the video input port was 0, the system
+ * picks a free port as for the inputs, the probing socket is closed again
+ * for the output worker to listen on it. Otherwise the ports next to the
+ * video input port are used.
  */
 static gint
 gst_switch_server_alloc_port (GstSwitchServer * srv)
 {
+  GSocket *socket;
   gint port;
+
+  if (opts.video_input_port == 0) {
+    socket = gst_switch_server_listen (srv, 0, &port);
+    if (socket) {
+      g_socket_close (socket, NULL);
+      g_object_unref (socket);
+      return port;
+    }
+  }
+
   g_mutex_lock (&srv->alloc_port_lock);
   srv->alloc_port_count += 1;
   port = srv->video_acceptor_port + srv->alloc_port_count;
@@ -438,6 +493,9 @@ gst_switch_server_end_case (GstCase * cas, GstSwitchServer * srv)
   gint caseport = 0;
   GList *item;
 
+  /* a new case of a switch ending before it was online */
+  gst_switch_server_switch_done (GST_WORKER (cas), FALSE);
+
   GST_SWITCH_SERVER_LOCK_CASES (srv);
 
   switch (cas->type) {
@@ -873,6 +931,43 @@ socket_listen_failed:
   }
 }
 
+/**
+ * gst_switch_server_listen_inputs:
+ * @return TRUE if both input sockets are listening.
+ *
+ * Listen on the video and audio input ports. A port of 0 lets the system
+ * pick a free one, the bound port replaces it. Done before the composite
+ * is prepared, which allocates the first of the output ports.
+ */
+static gboolean
+gst_switch_server_listen_inputs (GstSwitchServer * srv)
+{
+  gint bound_port;
+
+  srv->video_acceptor_socket = gst_switch_server_listen (srv,
+      srv->video_acceptor_port, &bound_port);
+  if (!srv->video_acceptor_socket)
+    return FALSE;
+
+  g_mutex_lock (&srv->alloc_port_lock);
+  srv->video_acceptor_port = bound_port;
+  g_mutex_unlock (&srv->alloc_port_lock);
+
+  /* always logged, clients wait for it to know the server is ready and
+     to learn the port picked for port 0 */
+  g_print ("Video input is listening at port: %d\n", bound_port);
+
+  srv->audio_acceptor_socket = gst_switch_server_listen (srv,
+      srv->audio_acceptor_port, &bound_port);
+  if (!srv->audio_acceptor_socket)
+    return FALSE;
+
+  srv->audio_acceptor_port = bound_port;
+  g_print ("Audio input is listening at port: %d\n", bound_port);
+  fflush (stdout);
+  return TRUE;
+}
+
 /**
  * gst_switch_server_video_acceptor:
  *
@@ -883,14 +978,6 @@ gst_switch_server_video_acceptor (GstSwitchServer * srv)
 {
   GSocket *socket;
   GError *error;
-  gint bound_port;
-
-  srv->video_acceptor_socket = gst_switch_server_listen (srv,
-      srv->video_acceptor_port, &bound_port);
-  if (!srv->video_acceptor_socket) {
-    gst_switch_server_quit (srv, -__LINE__);
-    return NULL;
-  }
 
   while (srv->video_acceptor && srv->video_acceptor_socket && srv->cancellable) {
     socket =
@@ -920,14 +1007,6 @@ gst_switch_server_audio_acceptor (GstSwitchServer * srv)
 {
   GSocket *socket;
   GError *error;
-  gint bound_port;
-
-  srv->audio_acceptor_socket = gst_switch_server_listen (srv,
-      srv->audio_acceptor_port, &bound_port);
-  if (!srv->audio_acceptor_socket) {
-    gst_switch_server_quit (srv, -__LINE__);
-    return NULL;
-  }
 
   while (srv->audio_acceptor && srv->audio_acceptor_socket && srv->cancellable) {
     socket =
@@ -1073,17 +1152,99 @@ gst_switch_server_get_preview_sink_ports (GstSwitchServer * srv,
   return a;
 }
 
+/**
+ * gst_switch_server_new_request:
+ *  @return: the id of a new request, counting from 1
+ *
+ *  Number the switch, set_composite_mode and adjust_pip requests, so
+ *  clients can tell their completion signals apart.
+ */
+static guint
+gst_switch_server_new_request (GstSwitchServer * srv)
+{
+  return (guint) g_atomic_int_add ((gint *) & srv->request_count, 1) + 1;
+}
+
+/**
+ * gst_switch_server_tell_switch:
+ *
+ *  Tell the clients that a switch request completed now.
+ */
+static void
+gst_switch_server_tell_switch (GstSwitchServer * srv, guint request,
+    gint channel, gint port, gint64 start, gboolean ok)
+{
+  gint64 end = g_get_monotonic_time ();
+
+  GST_SWITCH_SERVER_LOCK_CONTROLLER (srv);
+  if (srv->controller) {
+    gst_switch_controller_tell_switch_completed (srv->controller, request,
+        channel, port, start, end, ok);
+  }
+  GST_SWITCH_SERVER_UNLOCK_CONTROLLER (srv);
+}
+
+/**
+ * gst_switch_server_tell_pip:
+ *
+ *  Tell the clients that a PIP adjustment completed now.
+ */
+static void
+gst_switch_server_tell_pip (GstSwitchServer * srv, guint request,
+    gint x, gint y, gint w, gint h, gint64 start, gboolean ok)
+{
+  gint64 end = g_get_monotonic_time ();
+
+  GST_SWITCH_SERVER_LOCK_CONTROLLER (srv);
+  if (srv->controller) {
+    gst_switch_controller_tell_pip_adjusted (srv->controller, request,
+        x, y, w, h, start, end, ok);
+  }
+  GST_SWITCH_SERVER_UNLOCK_CONTROLLER (srv);
+}
+
+/**
+ * gst_switch_server_tell_transition:
+ *
+ *  Tell the clients that a composite mode request completed now.
+ */
+static void
+gst_switch_server_tell_transition (GstSwitchServer * srv, guint request,
+    gint mode, gint64 start, gboolean ok)
+{
+  gint64 end = g_get_monotonic_time ();
+
+  GST_SWITCH_SERVER_LOCK_CONTROLLER (srv);
+  if (srv->controller) {
+    gst_switch_controller_tell_transition_completed (srv->controller,
+        request, mode, start, end, ok);
+  }
+  GST_SWITCH_SERVER_UNLOCK_CONTROLLER (srv);
+}
+
 /**
  * gst_switch_server_set_composite_mode:
+ *  @request: (out) (allow-none): the id of the request
  *  @return: TRUE if succeeded.
  *
- *  Change a composite mode.
+ *  Change a composite mode. The transition_completed signal follows once
+ *  the new mode is online, or right away if the mode was not changed or
+ *  no transition could be started.
  *
  */
 gboolean
-gst_switch_server_set_composite_mode (GstSwitchServer * srv, gint mode)
+gst_switch_server_set_composite_mode (GstSwitchServer * srv, gint mode,
+    guint * request_out)
 {
+  guint request = gst_switch_server_new_request (srv);
+  gint64 start = g_get_monotonic_time ();
+  guint previous_request;
+  gint64 previous_start;
   gboolean result = FALSE;
+  gboolean stalled = FALSE;
+
+  if (request_out)
+    *request_out = request;
 
   GST_SWITCH_SERVER_LOCK_PIP (srv);
 
@@ -1092,6 +1253,14 @@ gst_switch_server_set_composite_mode (GstSwitchServer * srv, gint mode)
     goto end;
   }
 
+  /* pending before the transition starts, it may end at any time */
+  GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+  previous_request = srv->transition_request;
+  previous_start = srv->transition_start;
+  srv->transition_request = request;
+  srv->transition_start = start;
+  GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+
   g_object_set (srv->composite, "mode", mode, NULL);
 
   result = (mode == srv->composite->mode);
@@ -1101,10 +1270,34 @@ gst_switch_server_set_composite_mode (GstSwitchServer * srv, gint mode)
     srv->pip_y = srv->composite->b_y;
     srv->pip_w = srv->composite->b_width;
     srv->pip_h = srv->composite->b_height;
+
+    /* a composite which is not running starts no transition, so nothing
+       would ever end this one */
+    g_mutex_lock (&srv->composite->transition_lock);
+    if (!srv->composite->transition) {
+      GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+      if (srv->transition_request == request) {
+        srv->transition_request = 0;
+        stalled = TRUE;
+      }
+      GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+    }
+    g_mutex_unlock (&srv->composite->transition_lock);
+  } else {
+    /* refused, e.g. during another transition, which stays pending */
+    GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+    if (srv->transition_request == request) {
+      srv->transition_request = previous_request;
+      srv->transition_start = previous_start;
+    }
+    GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
   }
 
 end:
   GST_SWITCH_SERVER_UNLOCK_PIP (srv);
+
+  if (!result || stalled)
+    gst_switch_server_tell_transition (srv, request, mode, start, FALSE);
   return result;
 }
 
@@ -1114,6 +1307,127 @@ gst_switch_server_get_composite_mode (GstSwitchServer * srv)
   return srv->composite->mode;
 }
 
+/**
+ * gst_switch_server_get_record_location:
+ *  @return: the file the recorder is writing to, needs freeing, or NULL
+ */
+static gchar *
+gst_switch_server_get_record_location (GstSwitchServer * srv)
+{
+  GstElement *sink = NULL;
+  gchar *location = NULL;
+
+  GST_SWITCH_SERVER_LOCK_RECORDER (srv);
+  if (srv->recorder && GST_WORKER (srv->recorder)->pipeline) {
+    sink = gst_worker_get_element (GST_WORKER (srv->recorder), "disk_sink");
+    if (sink) {
+      g_object_get (sink, "location", &location, NULL);
+      gst_object_unref (sink);
+    }
+  }
+  GST_SWITCH_SERVER_UNLOCK_RECORDER (srv);
+  return location;
+}
+
+/**
+ * gst_switch_server_build_state:
+ *  @builder: a GVariantBuilder of type a{sv}
+ *
+ *  Add a snapshot of the server state to builder: the compose, encode and
+ *  audio ports, the preview ports, the composite mode, the id of the
+ *  pending mode change, the PIP geometry, the ports routed to the A, B
+ *  and audio channels, the number of inputs and output clients and the
+ *  file currently being recorded.
+ *
+ */
+void
+gst_switch_server_build_state (GstSwitchServer * srv,
+    GVariantBuilder * builder)
+{
+  GArray *ports, *serves = NULL, *types = NULL;
+  GVariantBuilder previews;
+  gint channel_a = 0, channel_b = 0, channel_audio = 0, inputs = 0;
+  guint transition;
+  gchar *location;
+  GList *item;
+  int n;
+
+  g_variant_builder_add (builder, "{sv}", "compose_port",
+      g_variant_new_int32 (gst_switch_server_get_composite_sink_port (srv)));
+  g_variant_builder_add (builder, "{sv}", "encode_port",
+      g_variant_new_int32 (gst_switch_server_get_encode_sink_port (srv)));
+
+  ports = gst_switch_server_get_preview_sink_ports (srv, &serves, &types);
+  g_variant_builder_init (&previews, G_VARIANT_TYPE ("a(iii)"));
+  for (n = 0; n < ports->len; ++n) {
+    g_variant_builder_add (&previews, "(iii)",
+        g_array_index (ports, gint, n),
+        g_array_index (serves, gint, n), g_array_index (types, gint, n));
+  }
+  g_variant_builder_add (builder, "{sv}", "preview_ports",
+      g_variant_builder_end (&previews));
+  g_array_free (ports, TRUE);
+  g_array_free (serves, TRUE);
+  g_array_free (types, TRUE);
+
+  GST_SWITCH_SERVER_LOCK_CASES (srv);
+  for (item = srv->cases; item; item = g_list_next (item)) {
+    GstCase *cas = GST_CASE (item->data);
+    switch (cas->type) {
+      case GST_CASE_COMPOSITE_VIDEO_A:
+        channel_a = cas->sink_port;
+        break;
+      case GST_CASE_COMPOSITE_VIDEO_B:
+        channel_b = cas->sink_port;
+        break;
+      case GST_CASE_COMPOSITE_AUDIO:
+        channel_audio = cas->sink_port;
+        break;
+      case GST_CASE_INPUT_AUDIO:
+      case GST_CASE_INPUT_VIDEO:
+        ++inputs;
+        break;
+      default:
+        break;
+    }
+  }
+  GST_SWITCH_SERVER_UNLOCK_CASES (srv);
+
+  g_variant_builder_add (builder, "{sv}", "audio_port",
+      g_variant_new_int32 (channel_audio));
+  g_variant_builder_add (builder, "{sv}", "channel_a",
+      g_variant_new_int32 (channel_a));
+  g_variant_builder_add (builder, "{sv}", "channel_b",
+      g_variant_new_int32 (channel_b));
+  g_variant_builder_add (builder, "{sv}", "inputs",
+      g_variant_new_int32 (inputs));
+  g_variant_builder_add (builder, "{sv}", "output_clients",
+      g_variant_new_int32 (g_atomic_int_get (&srv->output_clients)));
+
+  if (srv->composite) {
+    g_variant_builder_add (builder, "{sv}", "composite_mode",
+        g_variant_new_int32 (gst_switch_server_get_composite_mode (srv)));
+  }
+
+  /* read after the mode, which is set after its request is pending */
+  GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+  transition = srv->transition_request;
+  GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+  g_variant_builder_add (builder, "{sv}", "transition_request",
+      g_variant_new_uint32 (transition));
+
+  GST_SWITCH_SERVER_LOCK_PIP (srv);
+  g_variant_builder_add (builder, "{sv}", "pip",
+      g_variant_new ("(iiii)", srv->pip_x, srv->pip_y, srv->pip_w,
+          srv->pip_h));
+  GST_SWITCH_SERVER_UNLOCK_PIP (srv);
+
+  location = gst_switch_server_get_record_location (srv);
+  g_variant_builder_add (builder, "{sv}", "record_filename",
+      g_variant_new_string (location ? location : ""));
+  g_free (location);
+}
+
 static void
 gst_switch_server_start_audio (GstCase * cas, GstSwitchServer * srv)
 {
@@ -1158,18 +1472,28 @@ gst_switch_server_new_record (GstSwitchServer * srv)
 
 /**
  * gst_switch_server_adjust_pip:
+ *  @request: (out) (allow-none): the id of the request
  *  @return: a unsigned number of indicating which component (x,y,w,h) has
  *           been changed
  *
- *  Adjust the PIP position and size.
+ *  Adjust the PIP position and size. The pip_adjusted signal follows
+ *  once the composite runs with the new size, or right away if only the
+ *  position changed.
  *
  */
 guint
 gst_switch_server_adjust_pip (GstSwitchServer * srv,
-    gint dx, gint dy, gint dw, gint dh)
+    gint dx, gint dy, gint dw, gint dh, guint * request_out)
 {
+  guint request = gst_switch_server_new_request (srv);
+  gint64 start = g_get_monotonic_time ();
+  gboolean applied, restart;
+  gint x, y, w, h;
   guint result = 0;
 
+  if (request_out)
+    *request_out = request;
+
   g_return_val_if_fail (GST_IS_COMPOSITE (srv->composite), 0);
 
   GST_SWITCH_SERVER_LOCK_PIP (srv);
@@ -1183,8 +1507,13 @@ gst_switch_server_adjust_pip (GstSwitchServer * srv,
   srv->pip_w = gst_check_composite_min_pip_width (srv->pip_w);
   srv->pip_h = gst_check_composite_min_pip_height (srv->pip_h);
 
-  result = gst_composite_adjust_pip (srv->composite,
+  /* the composite is restarted for a new size */
+  restart = (srv->pip_w != srv->composite->b_width
+      || srv->pip_h != srv->composite->b_height);
+
+  applied = gst_composite_adjust_pip (srv->composite,
       srv->pip_x, srv->pip_y, srv->pip_w, srv->pip_h);
+  result = applied;
 
   if (dx != 0)
     result |= (1 << 0);
@@ -1195,7 +1524,19 @@ gst_switch_server_adjust_pip (GstSwitchServer * srv,
   if (dh != 0)
     result |= (1 << 3);
 
+  x = srv->pip_x, y = srv->pip_y;
+  w = srv->pip_w, h = srv->pip_h;
+  if (applied && restart) {
+    GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+    srv->adjust_request = request;
+    srv->adjust_start = start;
+    GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+  }
+
   GST_SWITCH_SERVER_UNLOCK_PIP (srv);
+
+  if (!applied || !restart)
+    gst_switch_server_tell_pip (srv, request, x, y, w, h, start, applied);
   return result;
 }
 
@@ -1203,15 +1544,68 @@ static void gst_switch_server_worker_start (GstWorker *, GstSwitchServer *);
 static void gst_switch_server_worker_null (GstWorker *, GstSwitchServer *);
 
 /**
- * gst_switch_server_switch:
+ * gst_switch_server_switch_release:
+ *
+ *  One new worker of a switch is done. The switch_completed signal is sent
+ *  and the switch freed once both are.
+ */
+static void
+gst_switch_server_switch_release (GstSwitchServerSwitch * sw, gboolean ok)
+{
+  if (!ok)
+    g_atomic_int_set (&sw->ok, FALSE);
+
+  if (g_atomic_int_dec_and_test (&sw->pending)) {
+    gst_switch_server_tell_switch (sw->srv, sw->request, sw->channel,
+        sw->port, sw->start, g_atomic_int_get (&sw->ok));
+    g_slice_free (GstSwitchServerSwitch, sw);
+  }
+}
+
+/**
+ * gst_switch_server_switch_abandoned:
+ *
+ *  A new worker of a switch was finalized without coming online or
+ *  ending, which counts as failed.
+ */
+static void
+gst_switch_server_switch_abandoned (gpointer data)
+{
+  gst_switch_server_switch_release ((GstSwitchServerSwitch *) data, FALSE);
+}
+
+/**
+ * gst_switch_server_switch_done:
+ *
+ *  A new worker of a switch came online, or failed.
+ */
+static void
+gst_switch_server_switch_done (GstWorker * worker, gboolean ok)
+{
+  GstSwitchServerSwitch *sw;
+
+  sw = g_object_steal_data (G_OBJECT (worker), GST_SWITCH_SERVER_SWITCH_DATA);
+  if (sw == NULL)
+    return;
+
+  gst_switch_server_switch_release (sw, ok);
+}
+
+/**
+ * gst_switch_server_switch_unlocked:
  *  @return: TRUE if succeeded.
  *
- *  Switch the channel to the specific port.
+ *  Switch the channel to the specific port, the caller must be holding
+ *  the cases lock.
  *
  */
-gboolean
-gst_switch_server_switch (GstSwitchServer * srv, gint channel, gint port)
+static gboolean
+gst_switch_server_switch_unlocked (GstSwitchServer * srv, gint channel,
+    gint port, guint * request_out)
 {
+  guint request = gst_switch_server_new_request (srv);
+  gint64 start = g_get_monotonic_time ();
+  GstSwitchServerSwitch *sw;
   GList *item;
   gboolean result = FALSE;
   GstCase *compose_case, *candidate_case;
@@ -1222,7 +1616,8 @@ gst_switch_server_switch (GstSwitchServer * srv, gint channel, gint port)
   compose_case = NULL;
   candidate_case = NULL;
 
-  GST_SWITCH_SERVER_LOCK_CASES (srv);
+  if (request_out)
+    *request_out = request;
 
   for (item = srv->cases; item; item = g_list_next (item)) {
     GstCase *cas = GST_CASE (item->data);
@@ -1340,6 +1735,19 @@ gst_switch_server_switch (GstSwitchServer * srv, gint channel, gint port)
   g_signal_connect (work1, "end-worker", callback, srv);
   g_signal_connect (work2, "end-worker", callback, srv);
 
+  sw = g_slice_new0 (GstSwitchServerSwitch);
+  sw->srv = srv;
+  sw->request = request;
+  sw->channel = channel;
+  sw->port = port;
+  sw->start = start;
+  sw->pending = 2;
+  sw->ok = TRUE;
+  g_object_set_data_full (G_OBJECT (work1), GST_SWITCH_SERVER_SWITCH_DATA, sw,
+      gst_switch_server_switch_abandoned);
+  g_object_set_data_full (G_OBJECT (work2), GST_SWITCH_SERVER_SWITCH_DATA, sw,
+      gst_switch_server_switch_abandoned);
+
   if (!gst_worker_start (GST_WORKER (work1)))
     goto error_start_work;
   if (!gst_worker_start (GST_WORKER (work2)))
@@ -1354,19 +1762,98 @@ gst_switch_server_switch (GstSwitchServer * srv, gint channel, gint port)
       GST_WORKER (work1)->name, GST_WORKER (work2)->name);
 
 end:
-  GST_SWITCH_SERVER_UNLOCK_CASES (srv);
+  if (!result)
+    gst_switch_server_tell_switch (srv, request, channel, port, start, FALSE);
   return result;
 
 error_start_work:
   {
     ERROR ("failed to start works");
+    gst_switch_server_switch_done (GST_WORKER (work1), FALSE);
+    gst_switch_server_switch_done (GST_WORKER (work2), FALSE);
     g_object_unref (work1);
     g_object_unref (work2);
-    GST_SWITCH_SERVER_UNLOCK_CASES (srv);
     return result;
   }
 }
 
+/**
+ * gst_switch_server_switch:
+ *  @request: (out) (allow-none): the id of the request
+ *  @return: TRUE if succeeded.
+ *
+ *  Switch the channel to the specific port.
+ *
+ */
+gboolean
+gst_switch_server_switch (GstSwitchServer * srv, gint channel, gint port,
+    guint * request)
+{
+  gboolean result = FALSE;
+
+  GST_SWITCH_SERVER_LOCK_CASES (srv);
+  result = gst_switch_server_switch_unlocked (srv, channel, port, request);
+  GST_SWITCH_SERVER_UNLOCK_CASES (srv);
+  return result;
+}
+
+/**
+ * gst_switch_server_batch:
+ *  @operations: an array of (method name, arguments) tuples, typed a(sv)
+ *  @return: an array of the results of each operation, typed av
+ *
+ *  Apply a list of switch, set_composite_mode and adjust_pip operations
+ *  at once. The cases lock is held during the whole batch, so no stream
+ *  can be switched by anybody else in between. Unknown operations or
+ *  operations with mismatching arguments yield FALSE and do not abort
+ *  the batch.
+ *
+ */
+GVariant *
+gst_switch_server_batch (GstSwitchServer * srv, GVariant * operations)
+{
+  GVariantBuilder results;
+  GVariantIter iter;
+  GVariant *args;
+  const gchar *name;
+  gint channel, port, mode;
+  gint dx, dy, dw, dh;
+  gboolean ok;
+  guint res;
+
+  g_variant_builder_init (&results, G_VARIANT_TYPE ("av"));
+
+  GST_SWITCH_SERVER_LOCK_CASES (srv);
+
+  g_variant_iter_init (&iter, operations);
+  while (g_variant_iter_loop (&iter, "(&sv)", &name, &args)) {
+    if (g_strcmp0 (name, "switch") == 0
+        && g_variant_is_of_type (args, G_VARIANT_TYPE ("(ii)"))) {
+      g_variant_get (args, "(ii)", &channel, &port);
+      ok = gst_switch_server_switch_unlocked (srv, channel, port, NULL);
+      g_variant_builder_add (&results, "v", g_variant_new_boolean (ok));
+    } else if (g_strcmp0 (name, "set_composite_mode") == 0
+        && g_variant_is_of_type (args, G_VARIANT_TYPE ("(i)"))) {
+      g_variant_get (args, "(i)", &mode);
+      ok = gst_switch_server_set_composite_mode (srv, mode, NULL);
+      g_variant_builder_add (&results, "v", g_variant_new_boolean (ok));
+    } else if (g_strcmp0 (name, "adjust_pip") == 0
+        && g_variant_is_of_type (args, G_VARIANT_TYPE ("(iiii)"))) {
+      g_variant_get (args, "(iiii)", &dx, &dy, &dw, &dh);
+      res = gst_switch_server_adjust_pip (srv, dx, dy, dw, dh, NULL);
+      g_variant_builder_add (&results, "v", g_variant_new_uint32 (res));
+    } else {
+      WARN ("unsupported batch operation %s%s", name,
+          g_variant_get_type_string (args));
+      g_variant_builder_add (&results, "v", g_variant_new_boolean (FALSE));
+    }
+  }
+
+  GST_SWITCH_SERVER_UNLOCK_CASES (srv);
+
+  return g_variant_builder_end (&results);
+}
+
 gboolean
 gst_switch_server_click_video (GstSwitchServer * srv,
     gint avx, gint avy, gint avw, gint avh)
@@ -1479,6 +1966,25 @@ gst_switch_server_worker_start (GstWorker * worker, GstSwitchServer * srv)
   GST_SWITCH_SERVER_UNLOCK_CLOCK (srv);
 
   g_print ("online: %s @%lld\n", worker->name, (long long int) t);
+
+  gst_switch_server_switch_done (worker, TRUE);
+
+  if (srv->composite && worker == GST_WORKER (srv->composite)) {
+    guint request;
+    gint64 start;
+
+    GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+    request = srv->adjust_request;
+    start = srv->adjust_start;
+    srv->adjust_request = 0;
+    GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+
+    if (request) {
+      gst_switch_server_tell_pip (srv, request, srv->composite->b_x,
+          srv->composite->b_y, srv->composite->b_width,
+          srv->composite->b_height, start, TRUE);
+    }
+  }
 }
 
 /**
@@ -1530,12 +2036,25 @@ gst_switch_server_start_recorder (GstWorker * worker, GstSwitchServer * srv)
 static void
 gst_switch_server_end_transition (GstWorker * worker, GstSwitchServer * srv)
 {
+  guint request;
+  gint64 start;
+
   g_return_if_fail (GST_IS_WORKER (worker));
 
+  GST_SWITCH_SERVER_LOCK_REQUESTS (srv);
+  request = srv->transition_request;
+  start = srv->transition_start;
+  srv->transition_request = 0;
+  GST_SWITCH_SERVER_UNLOCK_REQUESTS (srv);
+
   GST_SWITCH_SERVER_LOCK_CONTROLLER (srv);
   if (srv->controller) {
     gint mode = srv->composite->mode;
     gst_switch_controller_tell_new_mode_onlne (srv->controller, mode);
+    if (request) {
+      gst_switch_controller_tell_transition_completed (srv->controller,
+          request, mode, start, g_get_monotonic_time (), TRUE);
+    }
   }
   GST_SWITCH_SERVER_UNLOCK_CONTROLLER (srv);
 }
@@ -1551,6 +2070,7 @@ gst_switch_server_output_client_socket_added (GstElement * element,
 {
   g_return_if_fail (G_IS_SOCKET (socket));
 
+  g_atomic_int_inc (&srv->output_clients);
   //INFO ("client-socket-added: %d", g_socket_get_fd (socket));
 }
 
@@ -1568,6 +2088,7 @@ gst_switch_server_output_client_socket_removed (GstElement * element,
 
   //INFO ("client-socket-removed: %d", g_socket_get_fd (socket));
 
+  g_atomic_int_add (&srv->output_clients, -1);
   g_socket_close (socket, NULL);
 }
 
@@ -1621,6 +2142,10 @@ gst_switch_server_prepare_composite (GstSwitchServer * srv,
   if (!gst_worker_start (GST_WORKER (srv->composite)))
     goto error_start_composite;
 
+  /* always logged, like the input ports */
+  g_print ("Compose output is listening at port: %d\n", port);
+  g_print ("Encode output is listening at port: %d\n", encode);
+  fflush (stdout);
   return TRUE;
 
 error_start_composite:
@@ -1760,6 +2285,9 @@ gst_switch_server_run (GstSwitchServer * srv)
 
   //g_timeout_add_seconds (15, &timeout, srv);
 
+  if (!gst_switch_server_listen_inputs (srv))
+    goto error_listen_inputs;
+
   if (!gst_switch_server_prepare_composite (srv, DEFAULT_COMPOSE_MODE))
     goto error_prepare_composite;
 
@@ -1793,6 +2321,12 @@ gst_switch_server_run (GstSwitchServer * srv)
   return;
 
   /* Errors Handling */
+error_listen_inputs:
+  {
+    ERROR ("error listening for inputs");
+    srv->exit_code = -__LINE__;
+    return;
+  }
 error_prepare_composite:
   {
     ERROR ("error preparing server");
@@ -85,6 +85,7 @@ struct _GstSwitchServerOpts
  *  @param controller the controller instance
  *  @param alloc_port_lock the lock for %alloc_port_count
  *  @param alloc_port_count port allocation counter
+ *  @param output_clients the number of clients of the output port
  *  @param serve_lock the lock for serving new inputs
  *  @param cases_lock the lock for the %cases
  *  @param cases the case list
@@ -98,6 +99,12 @@ struct _GstSwitchServerOpts
  *  @param pip_y the PIP Y position
  *  @param pip_w the PIP width
  *  @param pip_h the PIP height
+ *  @param request_count the number of requests made, for their ids
+ *  @param requests_lock the lock for the pending requests below
+ *  @param transition_request the id of the pending mode change, or 0
+ *  @param transition_start the monotonic time the mode change was made
+ *  @param adjust_request the id of the pending PIP adjustment, or 0
+ *  @param adjust_start the monotonic time the PIP adjustment was made
  *  @param clock_lock the lock for %clock
  *  @param clock a system clock
  */
@@ -127,6 +134,7 @@ struct _GstSwitchServer
 
   GMutex alloc_port_lock;
   gint alloc_port_count;
+  gint output_clients;
 
   GMutex serve_lock;
   GMutex cases_lock;
@@ -143,6 +151,13 @@ struct _GstSwitchServer
   GMutex pip_lock;
   gint pip_x, pip_y, pip_w, pip_h;
 
+  guint request_count;
+  GMutex requests_lock;
+  guint transition_request;
+  gint64 transition_start;
+  guint adjust_request;
+  gint64 adjust_start;
+
   GMutex clock_lock;
   GstClock *clock;
 };
@@ -163,16 +178,20 @@ gint gst_switch_server_get_audio_sink_port (GstSwitchServer * srv);
 GArray *gst_switch_server_get_preview_sink_ports (GstSwitchServer * srv,
     GArray ** serves, GArray ** types);
 gboolean gst_switch_server_set_composite_mode (GstSwitchServer * srv,
-    gint mode);
+    gint mode, guint * request);
 gint gst_switch_server_get_composite_mode (GstSwitchServer * srv);
+void gst_switch_server_build_state (GstSwitchServer * srv,
+    GVariantBuilder * builder);
 gboolean gst_switch_server_switch (GstSwitchServer * srv, gint channel,
-    gint port);
+    gint port, guint * request);
+GVariant *gst_switch_server_batch (GstSwitchServer * srv,
+    GVariant * operations);
 gboolean gst_switch_server_click_video (GstSwitchServer * srv,
     gint x, gint y, gint fw, gint fh);
 void gst_switch_server_mark_face (GstSwitchServer * srv,
     GVariant * faces, gboolean tracking);
 guint gst_switch_server_adjust_pip (GstSwitchServer * srv, gint dx, gint dy,
-    gint dw, gint dh);
+    gint dw, gint dh, guint * request);
 gboolean gst_switch_server_new_record (GstSwitchServer * srv);
 
 GstCaps *gst_switch_server_getcaps (void);